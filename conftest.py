@@ -0,0 +1,10 @@
+import pytest
+
+import src.app.client_pool as client_pool
+
+
+@pytest.fixture(autouse=True)
+def fresh_client_pool():
+    """Tests patch the client classes, so no pooled client may outlive a test."""
+    yield
+    client_pool.POOL.close_all()
@@ -1,6 +1,16 @@
+import asyncio
+import copy
+import heapq
+import math
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
 import src.app.models as models
 import src.app.llm_base as llm_base
-import src.app.llm_clients as llm_clients
+import src.app.llm_cache as llm_cache
+import src.app.client_pool as client_pool
 import src.app.prompt_builder as prompt_builder
 import src.app.constants as constants
 
@@ -37,43 +47,264 @@ def validate_rpt_inputs(mro_name, scores_dict):
 
     return msg, success
 
+
+def validate_rpt_batch(mro_names, marks):
+    """
+    Vectorized validate_rpt_inputs for a bulk import.  Also flags names that appear more than once in the batch.
+
+    Args:
+        mro_names (list): The Marines' names.
+        marks (np.ndarray): (k, 14) marks from models.letters_to_marks (-1 = missing/invalid letter).
+
+    Returns:
+        list: (User Message String, Success Boolean) per row.
+    """
+    names = np.array([name or "" for name in mro_names], dtype=object)
+    marks = np.asarray(marks).reshape(len(names), len(constants.USMC_CATEGORIES))
+    lengths = np.array([len(name) for name in names], dtype=int)
+
+    # first occurrence of each name wins
+    _, first_idx = np.unique(names.astype(str), return_index=True)
+    repeated = np.ones(len(names), dtype=bool)
+    repeated[first_idx] = False
+
+    # checked in the same order as validate_rpt_inputs - first failing check gives the message
+    checks = [
+        (lengths == 0, "Must input a name"),
+        (lengths > 25, "Name too long (Max 25 characters)"),
+        (repeated, "Name appears more than once"),
+        ((marks < 0).any(axis=1), "Must mark all scores (14 letters A-H)"),
+        ((marks == 0).all(axis=1), "Can't have all scores be 'H'"),
+    ]
+    failed = np.stack([mask for mask, _ in checks]) if len(names) else np.zeros((len(checks), 0), dtype=bool)
+    first_fail = np.argmax(failed, axis=0)
+    any_fail = failed.any(axis=0)
+
+    return [(checks[first_fail[idx]][1], False) if any_fail[idx] else ("Valid", True) for idx in range(len(names))]
+
 ####################################################################################
 ################################  Profile Calcs  ###################################
 ####################################################################################
 # These are needed to turn rounded profile values entered by user to un-rounded values
 # otherwise, precision of calculations are off.  This is used for the high and low values.
 # We are able to do this because there are only so many ways to get these values.
-# Each rpt typically has 13-14 marks, each mark between 1-7.  We can build a table of possible rpt averages
-# given that range, then build a look-up table using rounded versions as keys.
-# If we could import the user's entire RS profile, we could just calculate un-rounded values
-# from scratch, but that is not an option right now.
+# Each rpt has 1-14 observed marks ('H' marks are not counted), each mark between 1-7.  We can build a table of
+# every possible rpt average given that range, sorted by its rounded value, and look values up with searchsorted.
+# Some rounded values have more than one possible unrounded value (e.g. from 13 and 14 observed marks), so the
+# index keeps all of them.
+# If the user has the RS's entire per-report history, importer.import_history calculates the exact values
+# from scratch instead.
 
-def _build_unrounded_dict():
-    """
-    Builds a map of rounded score -> unrounded score, based on 13 or 14 scores in the rpt
-    Allows expanding of rounded scores in OMPF for more precise calculations
+MAX_OBSERVED_MARKS = len(constants.USMC_CATEGORIES)
+
+
+def _build_unround_index():
     """
-    num_scores = [13, 14]
-    scores = [1, 2, 3, 4, 5, 6, 7]
-    scores_dict = {}  # { rounded : unrounded }
+    Builds the unrounding index.  Runs once, at import.
 
-    for num in num_scores:
-        min_sum = scores[0] * num
-        max_sum = scores[-1] * num
-        for score_sum in range(min_sum, max_sum + 1):
+    Returns:
+        tuple: Read-only numpy arrays (keys, values, sums, counts), one entry per (mark sum, num observed) pair,
+               sorted by key.  keys are the rounded averages in hundredths (4.08 -> 408).
+    """
+    rows = []
+    for num in range(1, MAX_OBSERVED_MARKS + 1):
+        for score_sum in range(num, 7 * num + 1):
             avg = score_sum / num
-            scores_dict[round(avg, 2)] = avg
+            rows.append((round(round(avg, 2) * 100), avg, score_sum, num))
+    rows.sort()
+
+    columns = [np.array(col) for col in zip(*rows)]
+    for col in columns:
+        col.flags.writeable = False
+    return tuple(columns)
 
-    return scores_dict
+
+_UNROUND_KEYS, _UNROUND_VALUES, _UNROUND_SUMS, _UNROUND_COUNTS = _build_unround_index()
+
+
+def _unround_slice(rounded_score):
+    """Returns the index range holding every entry that rounds to rounded_score."""
+    key = round(rounded_score * 100)
+    lo = np.searchsorted(_UNROUND_KEYS, key, side='left')
+    hi = np.searchsorted(_UNROUND_KEYS, key, side='right')
+    return slice(lo, hi)
+
+
+def unround_candidates(rounded_score):
+    """
+    Returns every rpt average that rounds to rounded_score, as a sorted tuple (empty if none are possible).
+    """
+    return tuple(float(val) for val in np.unique(_UNROUND_VALUES[_unround_slice(rounded_score)]))
 
 
 def unround_score(rounded_score):
     """
-    Unrounds score based on 13 or 14 scores.
+    Unrounds a score (e.g. a profile high/low from the OMPF).
+
+    If more than one rpt average rounds to the score, prefers the one with the most observed marks, since most
+    rpts have 13-14 marks.  Returns the rounded score unchanged if no rpt average can produce it.
+    """
+    idx = _unround_slice(rounded_score)
+    if idx.start == idx.stop:
+        return rounded_score
+
+    best = idx.start + int(np.argmax(_UNROUND_COUNTS[idx]))
+    return float(_UNROUND_VALUES[best])
+
+
+# The OMPF avg is rounded too, and unlike the high/low it is a sum over the whole profile, so it can't be looked
+# up.  What we can do is work out every total that num_rpts reports could add up to, given the (unrounded) high
+# and low, and keep the ones that round to the OMPF avg.  A report with d observed marks adds (mark sum) / d, and
+# any mark sum from d * low to d * high is possible, so in units of 1 / lcm(d) one report adds one of a fixed set
+# of values.  The reachable totals are kept as bits of a python int (bit i = total of i units), and adding a
+# report is a handful of shift-ORs.
+# Once the reachable totals hold an unbroken run at least as long as the widest gap between those values, the
+# run only grows: each report stretches it by the smallest value at the bottom and the largest at the top.  If
+# the run left after the remaining reports covers every total that rounds to the OMPF avg, those are the bounds
+# and the DP stops there - a few steps in for any realistic profile, instead of one step per report.
+# Most reports have 13 or 14 observed marks, but 'H' marks can leave any count from 1 to 14, and a single short
+# report moves the reachable totals - so by default every count is allowed.  The early stop keeps that fast; a
+# narrower denominators gives a tighter bracket that can miss the true avg.
+
+def _shift_or_run(bits, step, count):
+    """OR of bits shifted by 0, step, 2 * step, ... (count - 1) * step, in O(log count) operations."""
+    res, shift = 0, 0
+    block, block_len = bits, 1
+    while count:
+        if count & 1:
+            res |= block << shift
+            shift += block_len * step
+        count >>= 1
+        if count:
+            block |= block << (block_len * step)
+            block_len *= 2
+    return res
+
+
+def _run_around(bits, pos):
+    """(first, last) bit of the unbroken run of set bits through pos, or None if pos isn't set."""
+    above = bits >> pos
+    if not above & 1:
+        return None
+    last = pos + (~above & (above + 1)).bit_length() - 2
+    gaps = ~bits & ((1 << pos) - 1)
+    return gaps.bit_length(), last
+
+
+def _candidates(rounded, denominators):
+    """
+    Exact rpt averages that round to rounded, from reports with an allowed number of observed marks (any number if
+    none fit).  Filters on the mark count itself - 4.5 from 14 marks (63 / 14) reduces to 9 / 2.
+    """
+    idx = _unround_slice(rounded)
+    pairs = [(Fraction(int(score_sum), int(num)), int(num))
+             for score_sum, num in zip(_UNROUND_SUMS[idx], _UNROUND_COUNTS[idx])]
+    allowed = {frac for frac, num in pairs if num in denominators}
+    return sorted(allowed or {frac for frac, _ in pairs})
+
+
+@lru_cache(maxsize=256)
+def feasible_sum_range(high, low, avg, num_rpts, denominators=tuple(range(1, MAX_OBSERVED_MARKS + 1))):
+    """
+    Finds the smallest and largest possible total of all rpt averages in a profile, given OMPF values.
+
+    Args:
+        high, low, avg (float): Profile values rounded to 2 decimals, as shown on the OMPF.
+        num_rpts (int): Number of reports in the profile.
+        denominators (tuple): Observed mark counts allowed for reports other than the high and low.
+
+    Returns:
+        tuple: (min total, max total) as Fractions, or None if no combination of reports fits the inputs.
+    """
+    if num_rpts == 0:
+        return Fraction(0), Fraction(0)
+
+    # s / d is also 2s / 2d, so a mark count with a multiple in denominators adds nothing new
+    add_denoms = [denom for denom in denominators if not any(m != denom and m % denom == 0 for m in denominators)]
+
+    results = []
+    for high_frac in _candidates(high, denominators):
+        for low_frac in _candidates(low, denominators):
+            if low_frac > high_frac or (num_rpts == 1 and low_frac != high_frac):
+                continue
+            unit = math.lcm(*denominators, high_frac.denominator, low_frac.denominator)
+
+            # what one more report can add, in units; bits count in multiples of their gcd from the high + low
+            adds = sorted({score_sum * (unit // denom) for denom in add_denoms
+                           for score_sum in range(math.ceil(low_frac * denom), math.floor(high_frac * denom) + 1)})
+            if not adds and num_rpts > 2:
+                continue
+            gcd = math.gcd(*adds) or 1
+            adds = [val // gcd for val in adds]
+            widest_gap = max((b - a for a, b in zip(adds, adds[1:])), default=1)
+
+            # the high and low reports, then num_rpts - 2 others in [low, high]
+            base = (high_frac if num_rpts == 1 else high_frac + low_frac) * unit
+
+            # keep the totals that round to the OMPF avg (profiles under 3 reports show no avg)
+            if num_rpts >= 3:
+                avg_frac = Fraction(str(round(avg, 2)))
+                lo = max(math.ceil(((avg_frac - Fraction(1, 200)) * num_rpts * unit - base) / gcd), 0)
+                hi = math.floor(((avg_frac + Fraction(1, 200)) * num_rpts * unit - base) / gcd)
+            else:
+                lo, hi = 0, 0
+
+            bits, offset = 1, 0     # bit i = a total of offset + i
+            for done in range(num_rpts - 2):
+                run = _run_around(bits, ((bits & -bits).bit_length() + bits.bit_length()) // 2 - 1)
+                remaining = num_rpts - 2 - done
+                if run and run[1] - run[0] + 1 >= widest_gap and \
+                        offset + run[0] + remaining * adds[0] <= lo and offset + run[1] + remaining * adds[-1] >= hi:
+                    bits, offset = (1 << (hi - lo + 1)) - 1, lo
+                    break
+                new_bits = 0
+                for denom in add_denoms:
+                    min_sum, max_sum = math.ceil(low_frac * denom), math.floor(high_frac * denom)
+                    if min_sum > max_sum:
+                        continue
+                    step = unit // denom
+                    new_bits |= _shift_or_run(bits << (min_sum * step // gcd), step // gcd, max_sum - min_sum + 1)
+
+                # drop totals the reports still to come can't bring into [lo, hi] - keeps the ints short
+                rest = remaining - 1
+                top = hi - rest * adds[0] - offset
+                bits = new_bits
+                if top < bits.bit_length() - 1:
+                    bits &= (1 << (top + 1)) - 1 if top >= 0 else 0
+                bottom = lo - rest * adds[-1] - offset
+                if bottom > 0:
+                    bits >>= bottom
+                    offset += bottom
+                if not bits:
+                    break
+
+            if num_rpts >= 3:
+                bits = (bits >> (lo - offset)) & ((1 << (hi - lo + 1)) - 1) if hi >= lo else 0
+
+            if bits:
+                lowest = (bits & -bits).bit_length() - 1
+                highest = bits.bit_length() - 1
+                results.append(((base + (lo + lowest) * gcd) / unit, (base + (lo + highest) * gcd) / unit))
+
+    if not results:
+        return None
+    return min(res[0] for res in results), max(res[1] for res in results)
+
+
+def infer_avg_bounds(high, low, avg, num_rpts):
     """
-    unrounded_scores_dict = _build_unrounded_dict()
+    Tightest bracket on the true profile average, for RankProfile(low_avg=..., high_avg=...).
 
-    return unrounded_scores_dict.get(rounded_score, rounded_score)
+    Falls back to avg +/- 0.005 if the OMPF values can't be matched (no mix of reports gives that high, low and
+    avg - e.g. a typo).
+
+    Returns:
+        tuple: (low_avg, high_avg)
+    """
+    sum_range = feasible_sum_range(round(high, 2), round(low, 2), round(avg, 2), num_rpts)
+    if num_rpts == 0 or sum_range is None:
+        return avg - 0.005, avg + 0.005
+    return float(sum_range[0] / num_rpts), float(sum_range[1] / num_rpts)
 
 
 ####################################################################################
@@ -107,6 +338,57 @@ def _rv_eq(rpt_avg, num_rpts, high, avg):
     return max(80., val)
 
 
+def _rv_eq_vec(rpt_avgs, num_rpts, high, avg):
+    """
+    Vectorized _rv_eq.  All arguments broadcast against each other, so the profile values can be scalars
+    (e.g. final profile for RV Cum) or one entry per report (running profile for RV Proc).
+
+    Same constraints as _rv_eq: 0 if profile size < 3, 90 if High == Avg, floor of 80.
+    """
+    rpt_avgs, num_rpts, high, avg = np.broadcast_arrays(np.asarray(rpt_avgs, dtype=float), num_rpts,
+                                                        np.asarray(high, dtype=float), np.asarray(avg, dtype=float))
+    denominator = high - avg
+    flat = (high == avg) | (np.abs(denominator) < 0.0001)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        val = 90. + 10. * ((rpt_avgs - avg) / denominator)
+
+    rvs = np.where(flat, 90., np.maximum(80., val))
+    return np.where(num_rpts < 3, 0., rvs)
+
+
+def _set_proc_rvs(db, name, working_prof):
+    """
+    Sets 'RV Proc' on a report.  Must be called right after the report is added to the working profile.
+
+    Returns:
+        tuple: (rv_proc_min, rv_proc_max)
+    """
+    rpt = db.rpts_dict[name]
+    rv_from_high = _rv_eq(rpt.rpt_avg, working_prof.num_rpts, working_prof.high, working_prof.high_avg)  # working_prof.avg) working_prof.get_average())
+    rv_from_low = _rv_eq(rpt.rpt_avg, working_prof.num_rpts, working_prof.high, working_prof.low_avg)  # working_prof.avg) working_prof.get_average())
+
+    rv_proc = (min(rv_from_high, rv_from_low), max(rv_from_high, rv_from_low))
+    db.set_rvs(name, rv_proc=rv_proc)
+    return rv_proc
+
+
+def _set_cum_rvs(working_prof, db):
+    """
+    Sets 'RV Cum' on every report, based on the final profile values.
+    """
+    final_high = working_prof.high
+    final_avg_low = working_prof.low_avg   # working_prof.avg working_prof.get_average()
+    final_avg_high = working_prof.high_avg
+    final_num_rpts = working_prof.num_rpts
+    for name in db.name_list:
+        rpt = db.rpts_dict[name]
+        rv_cum_from_high = _rv_eq(rpt.rpt_avg, final_num_rpts, final_high, final_avg_high)
+        rv_cum_from_low = _rv_eq(rpt.rpt_avg, final_num_rpts, final_high, final_avg_low)
+
+        db.set_rvs(name, rv_cum=(min(rv_cum_from_low, rv_cum_from_high), max(rv_cum_from_low, rv_cum_from_high)))
+
+
 def _update_profile(orig_prof, working_prof, db):
     """
     Recalculates statistics for a profile based on a list of reports.
@@ -116,46 +398,338 @@ def _update_profile(orig_prof, working_prof, db):
     2. Cumulative Pass: Calculates 'RV Cum' (RV based on final profile stats).
     """
     # reset working profile values to original as entered by user
-    working_prof.set_values(orig_prof.high, orig_prof.low, orig_prof.avg, orig_prof.num_rpts)
+    working_prof.set_values(orig_prof.high, orig_prof.low, orig_prof.avg, orig_prof.num_rpts,
+                            low_avg=orig_prof.low_avg, high_avg=orig_prof.high_avg)
 
     # iterate through reports in order they were entered and update as we go
     # NOTE: This assumes that reports are processed in the order they are received.  This is why order is important in
     # the rpt_db.  All RV @ proc are calculated in the order the user enters the reports.
     for name in db.name_list:
-        rpt = db.rpts_dict[name]
-        working_prof.update_with_rpt(rpt)
+        working_prof.update_with_rpt(db.rpts_dict[name])
+        _set_proc_rvs(db, name, working_prof)
 
-        rv_from_high = _rv_eq(rpt.rpt_avg, working_prof.num_rpts, working_prof.high, working_prof.high_avg)  # working_prof.avg) working_prof.get_average())
-        rv_from_low = _rv_eq(rpt.rpt_avg, working_prof.num_rpts, working_prof.high, working_prof.low_avg)  # working_prof.avg) working_prof.get_average())
+    # have to go back through and update cumulative rvs based on the final profile values
+    _set_cum_rvs(working_prof, db)
 
-        rpt.rv_proc_min = min(rv_from_high, rv_from_low)
-        rpt.rv_proc_max = max(rv_from_high, rv_from_low)
 
-    # have to go back through and update cumulative rvs based on the final profile values
-    final_high = working_prof.high
-    final_avg_low = working_prof.low_avg   # working_prof.avg working_prof.get_average()
-    final_avg_high = working_prof.high_avg
-    final_num_rpts = working_prof.num_rpts
-    for name in db.name_list:
-        rpt = db.rpts_dict[name]
-        rv_cum_from_high = _rv_eq(rpt.rpt_avg, final_num_rpts, final_high, final_avg_high)
-        rv_cum_from_low = _rv_eq(rpt.rpt_avg, final_num_rpts, final_high, final_avg_low)
+class RVEngine:
+    """
+    Incremental version of _update_profile, meant to live in session state between reruns.
 
-        rpt.rv_cum_min = min(rv_cum_from_low, rv_cum_from_high)
-        rpt.rv_cum_max = max(rv_cum_from_low, rv_cum_from_high)
+    Keeps a checkpoint of the working profile after each report.  When report k changes, the profile is restored
+    from checkpoint k-1 and only reports k..n are replayed.  Appending a report replays just that report.  The
+    cumulative pass always runs, since every RV Cum depends on the final profile values.
 
+    Results match _update_profile exactly - the replay uses the same profile updates in the same order.
+    """
+    def __init__(self):
+        self.base_state = None  # state of the original profile the checkpoints were built from
+        self.rpt_avgs = []      # rpt_avg of each report at the time it was replayed
+        self.checkpoints = []   # working profile state after each report
+        self.proc_rvs = []      # (rv_proc_min, rv_proc_max) of each report
+
+    def reset(self):
+        """Drops all checkpoints.  The next update replays every report."""
+        self.base_state = None
+        self.rpt_avgs = []
+        self.checkpoints = []
+        self.proc_rvs = []
+
+    def _first_changed(self, db):
+        """Returns the position of the first report that differs from the last replay."""
+        for idx, (old_avg, name) in enumerate(zip(self.rpt_avgs, db.name_list)):
+            if old_avg != db.rpts_dict[name].rpt_avg:
+                return idx
+        return min(len(self.rpt_avgs), db.get_num_reports())
+
+    def update(self, orig_prof, working_prof, db, start=None):
+        """
+        Same contract as _update_profile: sets RV Proc/Cum on every report in db and leaves working_prof at the
+        final profile values.
+
+        Args:
+            start (int): Optional lowest changed position, as returned by the ReportDB methods.  Skips the scan
+                         for the first changed report.  Only valid if the engine's last update was on this db,
+                         before the change.
+
+        Returns:
+            int: Position of the first report that had to be replayed.
+        """
+        base_state = orig_prof.get_state()
+        if base_state != self.base_state:
+            # original profile changed (or first run) - every checkpoint is stale
+            self.reset()
+            self.base_state = base_state
+
+        if start is None:
+            start = self._first_changed(db)
+        start = min(start, len(self.rpt_avgs))
+
+        # drop checkpoints at and after the first changed report
+        del self.rpt_avgs[start:]
+        del self.checkpoints[start:]
+        del self.proc_rvs[start:]
+
+        if start == 0:
+            working_prof.set_values(orig_prof.high, orig_prof.low, orig_prof.avg, orig_prof.num_rpts,
+                                    low_avg=orig_prof.low_avg, high_avg=orig_prof.high_avg)
+        else:
+            working_prof.set_state(self.checkpoints[start - 1])
+
+        for idx, name in enumerate(db.name_list):
+            if idx < start:
+                # unchanged prefix - copy RV Proc from the last replay
+                db.set_rvs(name, rv_proc=self.proc_rvs[idx])
+                continue
+
+            working_prof.update_with_rpt(db.rpts_dict[name])
+            rv_proc = _set_proc_rvs(db, name, working_prof)
+
+            self.rpt_avgs.append(db.rpts_dict[name].rpt_avg)
+            self.checkpoints.append(working_prof.get_state())
+            self.proc_rvs.append(rv_proc)
+
+        _set_cum_rvs(working_prof, db)
+
+        return start
+
+
+def update_profile_batch(orig_prof, working_prof, cols):
+    """
+    Vectorized version of _update_profile over a models.ReportColumns.
 
-def update_calcs(display_rpt_db, orig_profile, working_profile, mro_rank, mro_name, scores_dict):
+    The running profile after each report comes from cumulative sums (averages) and running maxima/minima
+    (high/low), so both passes are a handful of array expressions instead of a Python loop per report.
+    Fills the RV vectors on cols and leaves working_prof at the final profile values.
+
+    NOTE: Averages are built from cumulative sums rather than step-by-step (Welford) updates, so results can
+    differ from _update_profile in the last few bits.
+    """
+    n0 = orig_prof.num_rpts
+    avgs = cols.rpt_avgs
+    num_rpts = n0 + np.arange(1, len(cols) + 1)
+    running_sums = np.cumsum(avgs)
+
+    # high/low - a profile low of 0 means there is no low yet, so the first report sets it
+    start_low = orig_prof.low if orig_prof.low != 0 else np.inf
+    highs = np.maximum.accumulate(np.concatenate(([orig_prof.high], avgs)))[1:]
+    lows = np.minimum.accumulate(np.concatenate(([start_low], avgs)))[1:]
+
+    # running average, bracketed the same way as RankProfile
+    avg_lows = (orig_prof.low_avg * n0 + running_sums) / num_rpts
+    avg_highs = (orig_prof.high_avg * n0 + running_sums) / num_rpts
+
+    rv_from_high = _rv_eq_vec(avgs, num_rpts, highs, avg_highs)
+    rv_from_low = _rv_eq_vec(avgs, num_rpts, highs, avg_lows)
+    cols.rv_proc_min = np.minimum(rv_from_high, rv_from_low)
+    cols.rv_proc_max = np.maximum(rv_from_high, rv_from_low)
+
+    working_prof.set_values(orig_prof.high, orig_prof.low, orig_prof.avg, n0,
+                            low_avg=orig_prof.low_avg, high_avg=orig_prof.high_avg)
+    if not len(cols):
+        return cols
+
+    score_sum = orig_prof.avg * n0 + float(running_sums[-1])
+    working_prof.set_state((float(highs[-1]), float(lows[-1]), score_sum / int(num_rpts[-1]),
+                            float(avg_lows[-1]), float(avg_highs[-1]), int(num_rpts[-1]), score_sum))
+
+    rv_cum_from_high = _rv_eq_vec(avgs, num_rpts[-1], highs[-1], avg_highs[-1])
+    rv_cum_from_low = _rv_eq_vec(avgs, num_rpts[-1], highs[-1], avg_lows[-1])
+    cols.rv_cum_min = np.minimum(rv_cum_from_high, rv_cum_from_low)
+    cols.rv_cum_max = np.maximum(rv_cum_from_high, rv_cum_from_low)
+
+    return cols
+
+
+class RVLattice:
+    """
+    RV of every reachable rpt average, for a report added to the end of a fixed profile.
+
+    There are only a few hundred possible rpt averages (mark sums of 1-7 over 1-14 observed marks), so the RV of
+    the next report can be precomputed for all of them.  Changing a mark then costs one lookup.  For the newest
+    report, RV Proc and RV Cum are the same, so one interval covers both.
+
+    Only valid for the profile it was built from - see matches() / get_rv_lattice().
+    """
+    def __init__(self, profile):
+        """
+        Args:
+            profile (RankProfile): Profile the next report will be added to (e.g. the active profile).
+        """
+        self.fingerprint = profile.get_state()
+        self.avgs = np.unique(_UNROUND_VALUES)
+
+        # add each possible average to the profile - same steps as RankProfile.update_with_rpt
+        num_rpts = profile.num_rpts + 1
+        highs = np.maximum(profile.high, self.avgs)
+        low_avgs = profile.low_avg + ((self.avgs - profile.low_avg) / num_rpts)
+        high_avgs = profile.high_avg + ((self.avgs - profile.high_avg) / num_rpts)
+
+        rv_from_high = _rv_eq_vec(self.avgs, num_rpts, highs, high_avgs)
+        rv_from_low = _rv_eq_vec(self.avgs, num_rpts, highs, low_avgs)
+        self.rv_min = np.minimum(rv_from_high, rv_from_low)
+        self.rv_max = np.maximum(rv_from_high, rv_from_low)
+        self.raises_high = self.avgs > profile.high
+
+    def matches(self, profile):
+        """True if the lattice was built from this profile's current values."""
+        return profile.get_state() == self.fingerprint
+
+    def lookup(self, rpt_avg):
+        """
+        Returns:
+            tuple: (rv_min, rv_max) for a report with this average.
+
+        Raises:
+            KeyError: If no combination of marks produces rpt_avg.
+        """
+        idx = int(np.searchsorted(self.avgs, rpt_avg))
+        if idx == len(self.avgs) or self.avgs[idx] != rpt_avg:
+            raise KeyError(f"Not a reachable rpt average: {rpt_avg}")
+        return float(self.rv_min[idx]), float(self.rv_max[idx])
+
+    def lookup_many(self, rpt_avgs):
+        """
+        Vectorized lookup.
+
+        Returns:
+            tuple: (rv_min, rv_max, raises_high) arrays shaped like rpt_avgs.  Unreachable averages get nan RVs.
+        """
+        rpt_avgs = np.asarray(rpt_avgs, dtype=float)
+        idx = np.minimum(np.searchsorted(self.avgs, rpt_avgs), len(self.avgs) - 1)
+        found = self.avgs[idx] == rpt_avgs
+        rv_min = np.where(found, self.rv_min[idx], np.nan)
+        rv_max = np.where(found, self.rv_max[idx], np.nan)
+        return rv_min, rv_max, found & self.raises_high[idx]
+
+    def required_avgs(self, rv_targets=range(100, 79, -1)):
+        """
+        Returns the lowest reachable rpt average whose min RV meets each target.
+
+        Returns:
+            dict: {target RV: required rpt average}.  Targets that can't be reached are left out.
+        """
+        res = {}
+        for target in rv_targets:
+            reached = np.nonzero(self.rv_min >= target)[0]
+            if len(reached):
+                res[target] = float(self.avgs[reached[0]])
+        return res
+
+
+def get_rv_lattice(profile, lattice=None):
+    """
+    Returns lattice if it was built from profile's current values, otherwise builds a new one.
+    Lets the UI keep one lattice in session state and rebuild it only when the profile or reports change.
+    """
+    if lattice is not None and lattice.matches(profile):
+        return lattice
+    return RVLattice(profile)
+
+
+class SensitivityGrid:
+    """
+    RV change from every single-mark change (14 categories x 8 letters) to the report being edited.
+
+    All 112 rpt averages are computed in one pass and looked up in RV lattices, so it's cheap enough to rebuild on
+    every rerun.  RV Proc comes from the profile as it was just before the report, RV Cum from the profile with
+    every other report in it (see get_sensitivity_lattices).  For a new report at the end both are the same.
+    Deltas are of the min RVs.
+    """
+    def __init__(self, scores_dict, proc_lattice, cum_lattice=None):
+        """
+        Args:
+            scores_dict (dict): Current {Attribute: Letter} of the report.  Missing/None count as 'H'.
+            proc_lattice (RVLattice): Lattice of the profile just before the report.
+            cum_lattice (RVLattice): Lattice of the profile with every other report.  Default: proc_lattice.
+        """
+        cum_lattice = cum_lattice or proc_lattice
+        self.categories = list(constants.USMC_CATEGORIES)
+        self.letters = list(constants.SCORE_LETTER_VALS)
+
+        marks = np.array([constants.SCORE_MAP[scores_dict.get(cat) or "H"] for cat in self.categories])
+        letter_marks = np.array([constants.SCORE_MAP[letter] for letter in self.letters])
+        base_sum, base_num = int(marks.sum()), int(np.count_nonzero(marks))
+
+        # (14, 8): swap one category's mark for each letter
+        sums = base_sum - marks[:, None] + letter_marks[None, :]
+        nums = base_num - (marks > 0)[:, None] + (letter_marks > 0)[None, :]
+        self.valid = nums > 0   # all 'H' isn't a valid report
+        self.rpt_avgs = np.zeros(sums.shape)
+        np.divide(sums, nums, out=self.rpt_avgs, where=self.valid)
+        self.current = marks[:, None] == letter_marks[None, :]
+
+        base_avg = base_sum / base_num if base_num else 0.
+        self.base_rv_proc = float(proc_lattice.lookup_many(base_avg)[0]) if base_num else np.nan
+        self.base_rv_cum = float(cum_lattice.lookup_many(base_avg)[0]) if base_num else np.nan
+
+        rv_proc, _, _ = proc_lattice.lookup_many(self.rpt_avgs)
+        rv_cum, _, self.raises_high = cum_lattice.lookup_many(self.rpt_avgs)
+        self.rv_proc_delta = np.where(self.valid, rv_proc - self.base_rv_proc, np.nan)
+        self.rv_cum_delta = np.where(self.valid, rv_cum - self.base_rv_cum, np.nan)
+        self.raises_high &= self.valid
+
+    def best_change(self):
+        """
+        Returns:
+            tuple: (category, letter, RV Cum delta) of the single change that raises RV Cum the most, or None.
+        """
+        deltas = np.where(self.current | ~self.valid, -np.inf, np.nan_to_num(self.rv_cum_delta, nan=-np.inf))
+        cat_idx, letter_idx = np.unravel_index(np.argmax(deltas), deltas.shape)
+        if not np.isfinite(deltas[cat_idx, letter_idx]) or deltas[cat_idx, letter_idx] <= 0:
+            return None
+        return self.categories[cat_idx], self.letters[letter_idx], float(deltas[cat_idx, letter_idx])
+
+
+def get_sensitivity_lattices(orig_profile, active_profile, rpt_db, name, lattice=None):
+    """
+    RV lattices for a SensitivityGrid of a report.
+
+    Args:
+        orig_profile: The baseline profile.
+        active_profile: Profile with every saved report in rpt_db.
+        rpt_db: The saved reports.
+        name: Report being edited.  If it isn't in rpt_db it's a new report at the end.
+        lattice: Optional cached lattice of active_profile (see get_rv_lattice).
+
+    Returns:
+        tuple: (proc lattice, cum lattice)
+    """
+    if not rpt_db.is_name_in_db(name):
+        lattice = get_rv_lattice(active_profile, lattice)
+        return lattice, lattice
+
+    # RV Proc - replay the reports before this one
+    before = copy.copy(orig_profile)
+    for prev in rpt_db.name_list[:rpt_db.get_position(name)]:
+        before.update_with_rpt(rpt_db.rpts_dict[prev])
+
+    # RV Cum - the final profile without this report; adding it back at the end gives the same high/avg
+    others = copy.copy(active_profile)
+    others.remove_rpt(rpt_db.get_report_by_name(name), models.AvgMultiset.from_profile(orig_profile, rpt_db))
+    return RVLattice(before), RVLattice(others)
+
+
+def update_calcs(display_rpt_db, orig_profile, working_profile, mro_rank, mro_name, scores_dict, engine=None,
+                 lattice=None):
     """
     Orchestrator for the "What-If" Shadow Calculation.
 
+    A new report goes at the end, so with a lattice of the profile it's added to, its RV is one lookup and the
+    profile takes one update - only the RV Cum pass runs over the other reports.  Edits to a saved report replay
+    from that report on (see recalc_db).
+
     Args:
-        display_rpt_db: A COPY of the report DB (not the original), safe to mutate.
+        display_rpt_db: A shadow (ReportDB.shadow) or copy of the report DB, not the original.
         orig_profile: The baseline profile (immutable reference).
         working_profile: A reusable profile object for calculation (mutable).
         mro_rank: Rank of the Marine.
         mro_name: Name of the Marine.
         scores_dict: The raw inputs from the UI.
+        engine: Optional RVEngine.  If given, only reports from the first changed one onward are replayed.
+        lattice: Optional RVLattice (see get_rv_lattice).  Only used if it was built from working_profile as
+                 passed in, which then has to hold the final values of display_rpt_db (e.g. a copy of the active
+                 profile).
 
     Returns:
         tuple: (Updated DB copy, Updated Profile, The New Report Object)
@@ -164,19 +738,401 @@ def update_calcs(display_rpt_db, orig_profile, working_profile, mro_rank, mro_na
 
     if display_rpt_db.is_name_in_db(mro_name):
         display_rpt_db.replace_rpt(working_rpt)
+    elif lattice is not None and lattice.matches(working_profile):
+        display_rpt_db.add_report(working_rpt)
+        working_profile.update_with_rpt(working_rpt)
+        display_rpt_db.set_rvs(mro_name, rv_proc=lattice.lookup(working_rpt.rpt_avg))
+        _set_cum_rvs(working_profile, display_rpt_db)
+        return display_rpt_db, working_profile, working_rpt
     else:
         display_rpt_db.add_report(working_rpt)
 
-    _update_profile(orig_profile, working_profile, display_rpt_db)
+    recalc_db(display_rpt_db, orig_profile, working_profile, engine)
 
     return display_rpt_db, working_profile, working_rpt
 
 
+def add_reports_batch(rpt_db, orig_profile, working_profile, mro_rank, rows, engine=None):
+    """
+    Bulk version of update_calcs.  Validates every row at once, adds (or replaces) the valid reports and
+    recalculates the profile once at the end.  Bad rows are reported, the rest are still added.
+
+    Args:
+        rpt_db: The report DB to add to (mutated) - a shadow if it might be thrown away.
+        orig_profile: The baseline profile (immutable reference).
+        working_profile: Profile object to hold the final values (mutable).
+        mro_rank: Rank of the Marines.
+        rows: List of (name, mark letters), e.g. ("SMITH", "CCCCCCCCCCCCCH").  Spaces in the letters are ignored.
+        engine: Optional RVEngine.
+
+    Returns:
+        list: (User Message String, Success Boolean) per row.
+    """
+    names = [(name or "").strip() for name, _ in rows]
+    letter_rows = ["".join(str(letters).split()).upper() for _, letters in rows]
+    results = validate_rpt_batch(names, models.letters_to_marks(letter_rows))
+
+    for name, letters, (_, success) in zip(names, letter_rows, results):
+        if not success:
+            continue
+        rpt = models.Report(mro_rank, name, dict(zip(constants.USMC_CATEGORIES, letters)))
+        if rpt_db.is_name_in_db(name):
+            rpt_db.replace_rpt(rpt)
+        else:
+            rpt_db.add_report(rpt)
+
+    if any(success for _, success in results):
+        recalc_db(rpt_db, orig_profile, working_profile, engine)
+    return results
+
+
+def recalc_db(rpt_db, orig_profile, working_profile, engine=None, start=None):
+    """
+    Recalculates every RV in rpt_db after the reports were changed or reordered.
+
+    Args:
+        rpt_db: The report DB to update (mutated).
+        orig_profile: The baseline profile (immutable reference).
+        working_profile: Profile object to hold the final values (mutable).
+        engine: Optional RVEngine.  If given, only reports from the first changed one onward are replayed.
+        start: Optional lowest changed position (from the ReportDB method that changed it), passed to the engine.
+    """
+    if engine is not None:
+        engine.update(orig_profile, working_profile, rpt_db, start)
+    else:
+        _update_profile(orig_profile, working_profile, rpt_db)
+
+
+def withdraw_report(orig_profile, working_profile, rpt_db, name, engine=None):
+    """
+    Removes a withdrawn/adverse report from the session.
+
+    Every report processed after the withdrawn one gets a new RV Proc, and every RV Cum can change, so the
+    profile is recalculated (see recalc_db).  With an engine only the reports from the withdrawn position on are
+    replayed.
+
+    Args:
+        orig_profile: The baseline profile (immutable reference).
+        working_profile: Profile holding the current values, including the report (mutated).
+        rpt_db: The report DB (mutated).
+        name: Report to withdraw.
+        engine: Optional RVEngine.
+
+    Returns:
+        int: Position the report had.
+    """
+    pos = rpt_db.delete_report(name)
+    recalc_db(rpt_db, orig_profile, working_profile, engine, start=pos)
+    return pos
+
+
+def solve_for_rv(lattice, scores_dict, rv_low, rv_high=100., keep_high=False, limit=10):
+    """
+    Inverse of update_calcs: finds the mark changes that put a report's min RV in [rv_low, rv_high].
+
+    Only the average matters for RV, so the search runs over mark sums: the lattice gives the acceptable sums,
+    and a best-first search picks marks attribute by attribute.  The remaining cost from any (attribute, sum so
+    far) state is memoized, which makes the search exact and stops it from visiting dead ends.
+    'H' (not observed) marks are left alone.
+
+    Args:
+        lattice (RVLattice): Built from the profile the report is added to.
+        scores_dict (dict): Current {Attribute: Letter} selections.
+        rv_low (float): Lowest acceptable min RV (e.g. 93.34).
+        rv_high (float): Highest acceptable min RV.
+        keep_high (bool): If True, the report average can't exceed the profile high.
+        limit (int): Max number of results.
+
+    Returns:
+        list: Dicts with 'scores' (new scores_dict), 'rpt_avg', 'rv_min', 'rv_max', 'changes' (# attributes
+              changed) and 'distance' (total letter steps), sorted by changes then distance.
+    """
+    cats = [cat for cat in constants.USMC_CATEGORIES if scores_dict.get(cat) not in (None, "H")]
+    current = [constants.SCORE_MAP[scores_dict[cat]] for cat in cats]
+    num_marks = len(cats)
+    if not num_marks:
+        return []
+
+    # acceptable mark sums for this many observed marks
+    sums = np.arange(num_marks, 7 * num_marks + 1)
+    idx = np.searchsorted(lattice.avgs, sums / num_marks)
+    ok = (lattice.rv_min[idx] >= rv_low) & (lattice.rv_min[idx] <= rv_high)
+    if keep_high:
+        ok &= ~lattice.raises_high[idx]
+    targets = frozenset(int(val) for val in sums[ok])
+    if not targets:
+        return []
+
+    no_path = (num_marks + 1, 0)
+
+    @lru_cache(maxsize=None)
+    def rest_cost(pos, partial_sum):
+        """Cheapest (changes, distance) for marks pos.. to land on an acceptable sum."""
+        if pos == num_marks:
+            return (0, 0) if partial_sum in targets else no_path
+        best = no_path
+        for val in range(1, 8):
+            cost = rest_cost(pos + 1, partial_sum + val)
+            if cost == no_path:
+                continue
+            step = abs(val - current[pos])
+            best = min(best, (cost[0] + (step > 0), cost[1] + step))
+        return best
+
+    if rest_cost(0, 0) == no_path:
+        return []
+
+    # best-first search - rest_cost is exact, so complete assignments come off the heap in cost order.
+    # Ties go to the deepest partial assignment, so the search dives to a result instead of fanning out.
+    heap = [(rest_cost(0, 0), 0, (0, 0), ())]
+    results = []
+    while heap and len(results) < limit:
+        _, _, spent, marks = heapq.heappop(heap)
+        pos = len(marks)
+        if pos == num_marks:
+            new_scores = dict(scores_dict)
+            for cat, val in zip(cats, marks):
+                new_scores[cat] = constants.SCORE_LETTER_VALS[val - 1]
+            rv_min, rv_max = lattice.lookup(sum(marks) / num_marks)
+            results.append({"scores": new_scores, "rpt_avg": sum(marks) / num_marks, "rv_min": rv_min,
+                            "rv_max": rv_max, "changes": spent[0], "distance": spent[1]})
+            continue
+
+        for val in range(1, 8):
+            cost = rest_cost(pos + 1, sum(marks) + val)
+            if cost == no_path:
+                continue
+            step = abs(val - current[pos])
+            new_spent = (spent[0] + (step > 0), spent[1] + step)
+            heapq.heappush(heap, ((new_spent[0] + cost[0], new_spent[1] + cost[1]), -(pos + 1), new_spent, marks + (val,)))
+
+    return results
+
+
+def optimize_order(orig_prof, rpt_db, objective="total", beam_width=2000):
+    """
+    Finds the processing order of the reports in rpt_db that maximizes RV Proc.
+
+    RV Cum only depends on the final profile (high, sum, count), which doesn't depend on order, so reordering
+    only moves RV Proc.  The RV Proc of the next report only depends on WHICH reports were processed before it,
+    not their order, so the search is a DP over subsets: each layer adds one report to every kept subset, and
+    subsets reached more than one way keep only their best score.  Reports with the same average are
+    interchangeable and are always placed in db order, which collapses duplicate subsets.
+
+    For "balance" one best score per subset isn't enough: the sum tie-break only matters when the reports still
+    to come set the lowest RV, so a subset keeps every (lowest so far, sum so far) pair that no other pair
+    beats on both.  That keeps the lexicographic result exact too.
+
+    If a layer has more than beam_width subsets, only the most promising are kept (beam search).  Each one is
+    scored by finishing it with its remaining reports in ascending order - a real order, so the best of those is
+    kept as the result to beat.  Subsets that couldn't beat it even at RV 100 for every remaining report are
+    dropped for free; the result is only flagged inexact if the beam dropped one that could have.  The entered,
+    ascending and descending orders are always compared too.
+
+    Args:
+        orig_prof (RankProfile): Profile before any of the reports are processed.
+        rpt_db (ReportDB): Reports to order.
+        objective (str): "total" maximizes the sum of min RV Proc.  "balance" maximizes the lowest min RV Proc
+                         (ties broken by the sum).
+        beam_width (int): Max subsets (pairs, for "balance") kept per layer.
+
+    Returns:
+        tuple: (list of names in the best order, best score, exact (bool))
+               Score is the sum of min RV Proc for "total", or (lowest, sum) for "balance".
+    """
+    if objective not in ("total", "balance"):
+        raise ValueError(f"Unknown objective '{objective}'. Allowed: ['balance', 'total']")
+
+    names = list(rpt_db.name_list)
+    num = len(names)
+    if num == 0:
+        return [], (0. if objective == "total" else (0., 0.)), True
+
+    avgs = np.array([rpt_db.rpts_dict[name].rpt_avg for name in names])
+    asc = np.argsort(avgs, kind='stable')
+
+    def _score(order_idx):
+        rv = _proc_rvs_in_order(orig_prof, avgs[list(order_idx)])
+        return float(rv.sum()) if objective == "total" else (round(float(rv.min()), 9), float(rv.sum()))
+
+    # subsets are bitsets over as many 64 bit words as it takes
+    word_of = np.arange(num) // 64
+    bits = np.left_shift(np.uint64(1), (np.arange(num) % 64).astype(np.uint64))
+
+    # identical averages are placed in db order - each report needs the previous one with its average placed
+    prev_idx = np.full(num, -1)
+    last_seen = {}
+    for idx, avg in enumerate(avgs):
+        if avg in last_seen:
+            prev_idx[idx] = last_seen[avg]
+        last_seen[avg] = idx
+
+    n0 = orig_prof.num_rpts
+    low_sum0 = orig_prof.low_avg * n0
+    high_sum0 = orig_prof.high_avg * n0
+
+    # the orders to beat - the search only replaces them with something better
+    best_idx = list(range(num))
+    best = _score(best_idx)
+    for candidate in (list(asc), list(asc[::-1])):
+        if _score(candidate) > best:
+            best_idx, best = candidate, _score(candidate)
+
+    # layer state, one entry per kept subset
+    masks = np.zeros((1, word_of[-1] + 1), dtype=np.uint64)
+    highs = np.array([orig_prof.high])
+    sums = np.zeros(1)
+    totals = np.zeros(1)
+    lowest = np.full(1, np.inf)
+    history = []  # (parent index, report index) per layer, to rebuild the order
+    exact = True
+
+    for layer in range(num):
+        # every (subset, next report) pair that is allowed
+        placed = (masks[:, word_of] & bits[None, :]) != 0
+        ready = (prev_idx < 0)[None, :] | placed[:, np.maximum(prev_idx, 0)]
+        parent, nxt = np.nonzero(~placed & ready)
+
+        new_highs = np.maximum(highs[parent], avgs[nxt])
+        new_sums = sums[parent] + avgs[nxt]
+        num_rpts = n0 + layer + 1
+        rv_from_high = _rv_eq_vec(avgs[nxt], num_rpts, new_highs, (high_sum0 + new_sums) / num_rpts)
+        rv_from_low = _rv_eq_vec(avgs[nxt], num_rpts, new_highs, (low_sum0 + new_sums) / num_rpts)
+        rv = np.minimum(rv_from_high, rv_from_low)
+
+        new_masks = masks[parent]
+        new_masks[np.arange(len(nxt)), word_of[nxt]] |= bits[nxt]
+        new_totals = totals[parent] + rv
+        # rounded, so the same lowest RV reached in a different order ties instead of differing by float noise
+        new_lowest = np.round(np.minimum(lowest[parent], rv), 9)
+
+        # subset ids - rows of the mask words, compared as raw bytes
+        rows = np.ascontiguousarray(new_masks).view(np.dtype((np.void, new_masks.shape[1] * 8))).ravel()
+        _, subset = np.unique(rows, return_inverse=True)
+        subset = subset.ravel()
+
+        if objective == "total":
+            # best first, then keep the first (best) entry for each subset
+            order = np.argsort(-new_totals, kind='stable')
+            _, first = np.unique(subset[order], return_index=True)
+            keep = order[np.sort(first)]
+        else:
+            keep = _pareto_keep(subset, new_lowest, new_totals)
+
+        if len(keep) > beam_width and layer < num - 1:
+            # rank by the score of finishing in ascending order - a real order, so the best one is a candidate
+            placed = (new_masks[keep][:, word_of] & bits[None, :]) != 0
+            rest_total, rest_low = _ascending_rollout(orig_prof, avgs, asc, placed, layer + 1,
+                                                      new_highs[keep], new_sums[keep])
+            roll_total = new_totals[keep] + rest_total
+            max_total = new_totals[keep] + 100. * (num - layer - 1)    # RV never goes over 100
+            if objective == "total":
+                rank = np.argsort(-roll_total, kind='stable')
+                top = float(roll_total[rank[0]])
+            else:
+                roll_low = np.minimum(new_lowest[keep], rest_low)
+                rank = np.lexsort((-roll_total, -roll_low))
+                top = (float(roll_low[rank[0]]), float(roll_total[rank[0]]))
+            if top > best:
+                entry = keep[rank[0]]
+                prefix = _walk_back(history, int(parent[entry])) + [int(nxt[entry])]
+                placed_idx = set(prefix)
+                best_idx, best = prefix + [int(idx) for idx in asc if idx not in placed_idx], top
+
+            # entries that can't beat the best order even at RV 100 for the rest are dropped for free
+            if objective == "total":
+                can_beat = max_total > best
+            else:
+                can_beat = (new_lowest[keep] > best[0]) | ((new_lowest[keep] == best[0]) & (max_total > best[1]))
+            rank = rank[can_beat[rank]]
+            exact &= len(rank) <= beam_width
+            keep = keep[rank[:beam_width]]
+            if len(keep) == 0:
+                break       # nothing left can beat the best order - it's the answer
+        elif objective == "balance":
+            keep = keep[np.lexsort((-new_totals[keep], -new_lowest[keep]))]     # best entry first
+
+        masks, highs, sums = new_masks[keep], new_highs[keep], new_sums[keep]
+        totals, lowest = new_totals[keep], new_lowest[keep]
+        history.append((parent[keep], nxt[keep]))
+
+    # last layer holds one subset (everything), best entry first - walk the back pointers
+    if len(history) == num:
+        order_idx = _walk_back(history, 0)
+        if _score(order_idx) >= best:
+            best_idx = order_idx
+    best = _score(best_idx)
+    return [names[idx] for idx in best_idx], best, exact
+
+
+def _walk_back(history, state):
+    """Report indices of the partial order ending at entry state of the last layer in history."""
+    order_idx = []
+    for parents, picks in reversed(history):
+        order_idx.append(int(picks[state]))
+        state = int(parents[state])
+    return order_idx[::-1]
+
+
+def _ascending_rollout(orig_prof, avgs, asc, placed, count, highs, sums):
+    """
+    RVs of the reports not yet placed, when each partial order is finished in ascending average order.
+
+    With the rest added smallest first, each one's high is max(high so far, its own average), so every
+    remaining RV comes out of cumulative sums - no loop over the remaining reports.
+
+    Returns:
+        tuple: (sum, lowest) of those RVs per entry.
+    """
+    n0 = orig_prof.num_rpts
+    asc_avgs = avgs[asc]
+    total, low = np.zeros(len(highs)), np.full(len(highs), np.inf)
+    block = max(1, 2_000_000 // len(asc))      # rows per block - keeps the temporaries to a few tens of MB
+    for start in range(0, len(highs), block):
+        part = slice(start, start + block)
+        remaining = ~placed[part][:, asc]
+        num_rpts = n0 + count + np.cumsum(remaining, axis=1)
+        run_sums = sums[part, None] + np.cumsum(remaining * asc_avgs, axis=1)
+        run_highs = np.maximum(highs[part, None], asc_avgs[None, :])
+        rv = np.minimum(_rv_eq_vec(asc_avgs, num_rpts, run_highs, (orig_prof.high_avg * n0 + run_sums) / num_rpts),
+                        _rv_eq_vec(asc_avgs, num_rpts, run_highs, (orig_prof.low_avg * n0 + run_sums) / num_rpts))
+        total[part] = np.where(remaining, rv, 0.).sum(axis=1)
+        low[part] = np.where(remaining, rv, np.inf).min(axis=1)
+    return total, np.round(low, 9)
+
+
+def _pareto_keep(masks, lowest, totals):
+    """
+    Indices of the entries no other entry of the same subset beats (or ties) on both lowest and total.
+    """
+    order = np.lexsort((-totals, -lowest, masks))       # by subset, then lowest desc, then total desc
+    sorted_masks = masks[order]
+    group = np.concatenate(([0], np.cumsum(sorted_masks[1:] != sorted_masks[:-1])))
+    # running max of the total within each subset: offset each subset above every total of the ones before it
+    offset = group * (np.abs(totals).max() * 2 + 1.)
+    shifted = totals[order] + offset
+    best_before = np.concatenate(([-np.inf], np.maximum.accumulate(shifted)[:-1]))
+    # entries come in falling lowest order, so one is kept only if its total beats every earlier one
+    return order[shifted > best_before]
+
+
+def _proc_rvs_in_order(orig_prof, avgs):
+    """Min RV Proc of each report average, processed in the given order.  Same math as optimize_order."""
+    n0 = orig_prof.num_rpts
+    num_rpts = n0 + np.arange(1, len(avgs) + 1)
+    highs = np.maximum.accumulate(np.concatenate(([orig_prof.high], avgs)))[1:]
+    sums = np.cumsum(avgs)
+    rv_from_high = _rv_eq_vec(avgs, num_rpts, highs, (orig_prof.high_avg * n0 + sums) / num_rpts)
+    rv_from_low = _rv_eq_vec(avgs, num_rpts, highs, (orig_prof.low_avg * n0 + sums) / num_rpts)
+    return np.minimum(rv_from_high, rv_from_low)
+
+
 def gen_prompt(rpt, example_data):
     """
     Hack fix to add prompt to report model.
+    Seeded like query_foundation, so the prompt shown is the one that gets sent.
     """
-    s, u = prompt_builder.build_foundation_prompt(example_data, rpt)
+    s, u = prompt_builder.build_foundation_prompt(example_data, rpt, prompt_builder.prompt_rng(rpt))
     return s, u
 
 
@@ -205,22 +1161,20 @@ def build_prompts_for_export(rpt_db):
     return final_prompts
 
 
-def query_open(curr_rpt, example_data, model=constants.OPEN_WEIGHT_MODELS[constants.DEFAULT_OPEN_MODEL]):
-    """
-    Queries HuggingFace Open Weights (Qwen/Mixtral).
-    Requires HF_API_TOKEN environment variable.
+def _with_cache(client, cache, refresh):
+    """Wraps client in the response cache, if one is given."""
+    return llm_cache.CachedLLMClient(client, cache, refresh) if cache is not None else client
 
-    Args:
-        model: Model config dict with 'model_id' and 'reasoning' keys.
-               Defaults to OPEN_WEIGHT_MODELS entry for DEFAULT_OPEN_MODEL.
-    """
-    model_id = model["model_id"]
+
+def _open_request(curr_rpt, example_data, model):
+    """LLMRequest for a HuggingFace open weight model."""
     is_reasoning = model.get("reasoning", False)
     max_tokens = constants.REASONING_MAX_TOKENS if is_reasoning else constants.OPEN_MAX_TOKENS
 
-    s_prompt, u_prompt = prompt_builder.build_open_weights_prompt(example_data, curr_rpt)
+    s_prompt, u_prompt = prompt_builder.build_open_weights_prompt(example_data, curr_rpt,
+                                                                  prompt_builder.prompt_rng(curr_rpt))
 
-    request = llm_base.LLMRequest(
+    return llm_base.LLMRequest(
         system_prompt=s_prompt,
         user_prompt=u_prompt,
         max_tokens=max_tokens,
@@ -228,8 +1182,24 @@ def query_open(curr_rpt, example_data, model=constants.OPEN_WEIGHT_MODELS[consta
         reasoning=is_reasoning,
     )
 
+
+def query_open(curr_rpt, example_data, model=constants.OPEN_WEIGHT_MODELS[constants.DEFAULT_OPEN_MODEL], cache=None,
+               refresh=False):
+    """
+    Queries HuggingFace Open Weights (Qwen/Mixtral).
+    Requires HF_API_TOKEN environment variable.
+
+    Args:
+        model: Model config dict with 'model_id' and 'reasoning' keys.
+               Defaults to OPEN_WEIGHT_MODELS entry for DEFAULT_OPEN_MODEL.
+        cache: Optional llm_cache.LLMCache - checked first, the response is stored on a miss.  Token counts are
+               None on a hit.
+        refresh: Skip the cache lookup (e.g. after Reset Lock) - the new response replaces the cached one.
+    """
+    request = _open_request(curr_rpt, example_data, model)
+
     try:
-        client = llm_clients.HuggingFaceClient(model_id)
+        client = _with_cache(client_pool.get_client("open", model["model_id"]), cache, refresh)
 
         response = client.generate(request)
         return response.text, response.model, response.prompt_tokens, response.completion_tokens
@@ -240,21 +1210,14 @@ def query_open(curr_rpt, example_data, model=constants.OPEN_WEIGHT_MODELS[consta
         return f"HuggingFace Error: {str(e)}", "Error", None, None
 
 
-def query_local(curr_rpt, example_data, model=constants.LOCAL_MODELS[constants.DEFAULT_LOCAL_MODEL]):
-    """
-    Queries a local Ollama instance.
-
-    Args:
-        model: Model config dict with 'model_id' and 'reasoning' keys.
-               Defaults to LOCAL_MODELS entry for DEFAULT_LOCAL_MODEL.
-    """
-    model_id = model["model_id"]
+def _local_request(curr_rpt, example_data, model):
+    """LLMRequest for a local Ollama model - one combined prompt."""
     is_reasoning = model.get("reasoning", False)
     max_tokens = constants.REASONING_MAX_TOKENS if is_reasoning else constants.LOCAL_MAX_TOKENS
 
-    prompt = prompt_builder.build_local_prompt(example_data, curr_rpt)
+    prompt = prompt_builder.build_local_prompt(example_data, curr_rpt, prompt_builder.prompt_rng(curr_rpt))
 
-    request = llm_base.LLMRequest(
+    return llm_base.LLMRequest(
         system_prompt="",
         user_prompt=prompt,
         max_tokens=max_tokens,
@@ -262,8 +1225,21 @@ def query_local(curr_rpt, example_data, model=constants.LOCAL_MODELS[constants.D
         reasoning=is_reasoning,
     )
 
+
+def query_local(curr_rpt, example_data, model=constants.LOCAL_MODELS[constants.DEFAULT_LOCAL_MODEL], cache=None,
+                refresh=False):
+    """
+    Queries a local Ollama instance - the server API, or the CLI if the server isn't running.
+
+    Args:
+        model: Model config dict with 'model_id' and 'reasoning' keys.
+               Defaults to LOCAL_MODELS entry for DEFAULT_LOCAL_MODEL.
+        cache, refresh: See query_open.
+    """
+    request = _local_request(curr_rpt, example_data, model)
+
     try:
-        client = llm_clients.LocalModelClient(constants.OLLAMA_PATH, model_id)
+        client = _with_cache(client_pool.get_client("local", model["model_id"]), cache, refresh)
         response = client.generate(request)
         return response.text, response.model, response.prompt_tokens, response.completion_tokens
 
@@ -278,7 +1254,25 @@ def query_manual():
     return "Type section I comments here...", "Manual", None, None
 
 
-def query_foundation(curr_rpt, example_data, model=constants.FRONTIER_MODELS[constants.DEFAULT_FRONTIER_MODEL]):
+def _foundation_request(curr_rpt, example_data, model):
+    """LLMRequest for an OpenAI frontier model."""
+    is_reasoning = model.get("reasoning", False)
+    max_tokens = constants.REASONING_MAX_TOKENS if is_reasoning else constants.FOUNDATION_MAX_TOKENS
+
+    s_prompt, u_prompt = prompt_builder.build_foundation_prompt(example_data, curr_rpt,
+                                                                prompt_builder.prompt_rng(curr_rpt))
+
+    return llm_base.LLMRequest(
+        system_prompt=s_prompt,
+        user_prompt=u_prompt,
+        max_tokens=max_tokens,
+        temperature=constants.FOUNDATION_TEMP,
+        reasoning=is_reasoning,
+    )
+
+
+def query_foundation(curr_rpt, example_data, model=constants.FRONTIER_MODELS[constants.DEFAULT_FRONTIER_MODEL],
+                     cache=None, refresh=False):
     """
     Queries OpenAI via Responses API.
     Requires OPENAI_API_KEY environment variable.
@@ -287,24 +1281,11 @@ def query_foundation(curr_rpt, example_data, model=constants.FRONTIER_MODELS[con
     Args:
         model: Model config dict with 'model_id' and 'reasoning' keys.
                Defaults to FRONTIER_MODELS entry for DEFAULT_FRONTIER_MODEL.
+        cache, refresh: See query_open.
     """
-    model_id = model["model_id"]
-    is_reasoning = model.get("reasoning", False)
-    max_tokens = constants.REASONING_MAX_TOKENS if is_reasoning else constants.FOUNDATION_MAX_TOKENS
-
     try:
-        llm = llm_clients.OpenAIClient(model=model_id)
-
-        s_prompt, u_prompt = prompt_builder.build_foundation_prompt(example_data, curr_rpt)
-
-        request = llm_base.LLMRequest(
-            system_prompt=s_prompt,
-            user_prompt=u_prompt,
-            max_tokens=max_tokens,
-            temperature=constants.FOUNDATION_TEMP,
-            reasoning=is_reasoning,
-        )
-
+        llm = _with_cache(client_pool.get_client("foundation", model["model_id"]), cache, refresh)
+        request = _foundation_request(curr_rpt, example_data, model)
         response = llm.generate(request)
 
         return response.text, response.model, response.prompt_tokens, response.completion_tokens
@@ -313,6 +1294,109 @@ def query_foundation(curr_rpt, example_data, model=constants.FRONTIER_MODELS[con
         return f"API Error: {str(e)}", "Error", None, None
 
 
+# provider -> (request builder, error prefix) - same prompts and errors as query_*
+_PROVIDERS = {
+    "open": (_open_request, "HuggingFace Error"),
+    "local": (_local_request, "Local Inference Error"),
+    "foundation": (_foundation_request, "API Error"),
+}
+
+
+def query_stream(curr_rpt, example_data, provider, model, cache=None, refresh=False):
+    """
+    Streaming version of query_open / query_local / query_foundation.
+
+    Args:
+        provider (str): "open", "local" or "foundation".
+        model: Model config dict with 'model_id' and 'reasoning' keys.
+        cache, refresh: See query_open.
+
+    Returns:
+        llm_base.LLMStream: Iterate it (e.g. st.write_stream) for the text, then read .response for the text,
+                            token counts, time to first token and tokens/sec.  Errors are raised - ValueError for
+                            configuration, RuntimeError while streaming - see query_error.
+    """
+    if provider not in _PROVIDERS:
+        raise ValueError(f"Unknown provider '{provider}'. Allowed: {list(_PROVIDERS)}")
+    build_request, _ = _PROVIDERS[provider]
+    client = _with_cache(client_pool.get_client(provider, model["model_id"]), cache, refresh)
+    return client.stream(build_request(curr_rpt, example_data, model))
+
+
+def query_error(provider, error):
+    """Error text for a failed query_stream, worded like the query_* results."""
+    if isinstance(error, ValueError):
+        return f"Configuration Error: {str(error)}"
+    return f"{_PROVIDERS[provider][1]}: {str(error)}"
+
+
+####################################################################################
+###########################  Batch Section I Generation  ###########################
+####################################################################################
+# Section I for every report at once.  Requests go out concurrently through the clients' async agenerate (native
+# async for OpenAI / HuggingFace, a worker thread per call for Ollama), at most max_concurrency in flight, and each
+# result is handed to on_result as soon as it arrives - so the UI can save it into the report right away.  A
+# failed report gets the same error result query_* would give; it doesn't stop the others.
+
+async def agenerate_batch(rpts, example_data, provider, model, max_concurrency=constants.BATCH_MAX_CONCURRENCY,
+                          cache=None, on_result=None):
+    """
+    Generates Section I for several reports concurrently.
+
+    Args:
+        rpts (list): Reports to generate for.
+        example_data: Example comments for the prompts (see prompt_builder).
+        provider (str): "open", "local" or "foundation".
+        model (dict): Model config dict with 'model_id' and 'reasoning' keys.
+        max_concurrency (int): Max requests in flight.
+        cache: Optional llm_cache.LLMCache, as in query_open.
+        on_result (callable): Called with (name, result) as each report finishes, in completion order.
+
+    Returns:
+        dict: name -> (text, model, prompt_tokens, completion_tokens), same as query_*.
+    """
+    if provider not in _PROVIDERS:
+        raise ValueError(f"Unknown provider '{provider}'. Allowed: {list(_PROVIDERS)}")
+    build_request, _ = _PROVIDERS[provider]
+
+    results = {}
+    try:
+        client = _with_cache(client_pool.get_client(provider, model["model_id"]), cache, False)
+    except ValueError as ve:
+        for rpt in rpts:
+            results[rpt.name] = (query_error(provider, ve), "Error", None, None)
+            if on_result is not None:
+                on_result(rpt.name, results[rpt.name])
+        return results
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _one(rpt):
+        async with semaphore:
+            try:
+                response = await client.agenerate(build_request(rpt, example_data, model))
+                return rpt.name, (response.text, response.model, response.prompt_tokens, response.completion_tokens)
+            except Exception as e:
+                return rpt.name, (query_error(provider, e), "Error", None, None)
+
+    try:
+        for next_done in asyncio.as_completed([_one(rpt) for rpt in rpts]):
+            name, result = await next_done
+            results[name] = result
+            if on_result is not None:
+                on_result(name, result)
+    finally:
+        # the pooled client outlives this loop - close the connections made on it while the loop still runs
+        await client.aclose()
+    return results
+
+
+def generate_batch(rpts, example_data, provider, model, max_concurrency=constants.BATCH_MAX_CONCURRENCY, cache=None,
+                   on_result=None):
+    """Blocking agenerate_batch, for callers without an event loop (e.g. a streamlit script run)."""
+    return asyncio.run(agenerate_batch(rpts, example_data, provider, model, max_concurrency, cache, on_result))
+
+
 ####################################################################################
 #######################  Printing / Cosmetics  #####################################
 ####################################################################################
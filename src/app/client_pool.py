@@ -0,0 +1,103 @@
+import atexit
+import hashlib
+import os
+import threading
+
+import src.app.llm_clients as llm_clients
+import src.app.constants as constants
+
+####################################################################################
+##############################  Provider Client Pool  ##############################
+####################################################################################
+# Long-lived LLM clients, shared by every streamlit session in the process.  A client built per request throws
+# away its connection pool, so every generation paid for a new TCP + TLS handshake (and for building the SDK
+# client).  Clients are keyed by provider, model and a hash of the credentials / endpoint they were built with,
+# so a new API key in the environment gets a new client instead of the old one (which is closed, since nothing will
+# ask for it again).  The OpenAI (httpx), HuggingFace
+# and requests clients are thread-safe, and their pools are capped at constants.LLM_POOL_MAX_CONNECTIONS.
+# Everything is closed at interpreter exit - each client's close() also closes the async clients it keeps per
+# event loop (see llm_clients._PerLoop).
+
+PROVIDERS = ("open", "local", "foundation")
+
+
+def _credentials(provider):
+    """Environment a provider's client is built from - a change means a different client."""
+    if provider == "foundation":
+        return (os.environ.get("OPENAI_API_KEY") or os.environ.get("OPENAI_DEFAULT_API_KEY"),
+                os.environ.get("OPENAI_BASE_URL"))
+    if provider == "open":
+        return (os.environ.get("HF_API_TOKEN"),)
+    return constants.OLLAMA_HOST, constants.OLLAMA_PATH
+
+
+def _new_client(provider, model_id):
+    if provider == "foundation":
+        return llm_clients.OpenAIClient(model=model_id)
+    if provider == "open":
+        return llm_clients.HuggingFaceClient(model_id)
+    return llm_clients.make_local_client(model_id, constants.OLLAMA_HOST, constants.OLLAMA_PATH)
+
+
+def _close(client):
+    """Closes a client that's being dropped, if it has anything to close."""
+    close = getattr(client, "close", None)
+    if close is None:
+        return
+    try:
+        close()
+    except Exception:
+        pass    # dropping it anyway - a client that fails to close has nothing left to release
+
+
+class ClientPool:
+    """
+    Thread-safe registry of LLM clients by (provider, model, credentials).
+    """
+    def __init__(self):
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider, model_id):
+        """
+        Shared client for a provider and model, built on first use.
+
+        Raises:
+            ValueError: Unknown provider, or the client's own configuration errors (e.g. a missing API key) -
+                        nothing is stored then.
+        """
+        if provider not in PROVIDERS:
+            raise ValueError(f"Unknown provider '{provider}'. Allowed: {list(PROVIDERS)}")
+        # the key holds a hash, not the credentials themselves
+        secret = hashlib.sha256(repr(_credentials(provider)).encode()).hexdigest()
+        key = (provider, model_id, secret)
+        replaced = []
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = _new_client(provider, model_id)
+                # the same provider and model under old credentials won't be asked for again
+                replaced = [self._clients.pop(old) for old in list(self._clients)
+                            if old[:2] == key[:2] and old != key]
+        for old_client in replaced:
+            _close(old_client)
+        return client
+
+    def close_all(self):
+        """Closes and forgets every client, async clients included.  The next get() builds a new one."""
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            _close(client)
+
+    def __len__(self):
+        return len(self._clients)
+
+
+POOL = ClientPool()
+atexit.register(POOL.close_all)
+
+
+def get_client(provider, model_id):
+    """Shared client from the process-wide pool - see ClientPool.get."""
+    return POOL.get(provider, model_id)
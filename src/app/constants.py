@@ -1,4 +1,6 @@
+import os
 import shutil
+from pathlib import Path
 
 # App version - single source of truth
 APP_VERSION = "0.4.3"
@@ -71,6 +73,9 @@ LOCAL_MAX_TOKENS = 500
 OPEN_MAX_TOKENS = 500
 REASONING_MAX_TOKENS = 5000  # reasoning models need more for chain-of-thought
 
+BATCH_MAX_CONCURRENCY = 4     # requests in flight at once when generating Section I for every report
+LLM_POOL_MAX_CONNECTIONS = 8  # open connections per shared client (src/app/client_pool.py) - at least the above
+
 MIN_ACCOMPLISHMENTS_LENGTH = 50
 MAX_ACCOMPLISHMENTS_LENGTH = 1500
 MAX_USER_CONTEXT_LENGTH = 800
@@ -86,6 +91,18 @@ OLLAMA_PATH = shutil.which("ollama")
 # if that doesn't work, set path explicitly
 # OLLAMA_PATH = r"C:\Users\nicho\AppData\Local\Programs\Ollama\ollama.exe"
 
+# Ollama server API - used first, the CLI above is the fallback when the server isn't running
+OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = "30m"       # how long the server keeps the model loaded after a request
+OLLAMA_CONNECT_TIMEOUT = 2      # seconds - a server that isn't running refuses at once
+OLLAMA_READ_TIMEOUT = 300       # seconds without output, including loading the model
+
+
+# LLM response cache (src/app/llm_cache.py) - shared by every session on this machine
+LLM_CACHE_PATH = Path(os.environ.get("FITREP_LLM_CACHE", Path.home() / ".fitrep_calculator" / "llm_cache.sqlite3"))
+LLM_CACHE_MAX_BYTES = 50 * 1024 * 1024
+LLM_CACHE_MAX_AGE_DAYS = 30
+
 
 # other
 CATEGORIES_YAML = ["performance", "proficiency", "individual_character", "effectiveness_under_stress", "initiative",
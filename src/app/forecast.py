@@ -0,0 +1,188 @@
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+import src.app.calc_eng as calc_eng
+
+####################################################################################
+###########################  Monte Carlo RV Forecast  ##############################
+####################################################################################
+# RV Cum keeps moving after a report is written: every report the RS writes later changes the profile high and
+# average.  This simulates future reporting periods to show how far the RV Cum of the current reports may drift.
+# Future rpt averages are random draws, and each trajectory follows RankProfile.update_with_rpt: the high is a
+# running max, the average is the running sum / count.  Trajectories are simulated in chunks, one numpy array
+# per chunk.  Each chunk has its own seed spawned from the run seed, so results are the same no matter how many
+# workers run them.
+# A chunk only returns each trajectory's profile (high, avg) at the end of each period - every report's RV Cum
+# follows from those, so the (trajectories x periods x reports) RVs are never held at once: they're worked out
+# and reduced to percentiles a block of reports at a time.
+# The random draws are the expensive part.  Runs with fewer than PARALLEL_MIN_DRAWS of them take less time than
+# starting worker processes (each one imports calc_eng and with it the LLM clients), so they run in this process.
+# Bigger runs (e.g. 20 periods of 10+ reports) use the process pool, which is started once and kept for the whole
+# process.
+
+DISTRIBUTIONS = ("normal", "empirical")
+PARALLEL_MIN_DRAWS = 2_000_000      # trajectories x periods x reports per period
+BAND_BLOCK_CELLS = 4_000_000        # RVs worked out at once when reducing to percentiles
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers):
+    """The shared process pool, (re)started if it doesn't have max_workers workers."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = ProcessPoolExecutor(max_workers=max_workers)
+            _pool_workers = max_workers
+        return _pool
+
+
+def shutdown_pool():
+    """Stops the shared process pool (also runs at exit)."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool, _pool_workers = None, None
+
+
+atexit.register(shutdown_pool)
+
+
+@dataclass
+class ForecastResult:
+    """
+    Percentile bands of future RV Cum.
+
+    Attributes:
+        names (list): Report names, in db order.
+        percentiles (tuple): Percentiles in each band (e.g. 5, 50, 95).
+        bands (np.ndarray): (num reports, num periods, num percentiles) min RV Cum at the end of each period.
+        seed (int): Seed used for the run.
+    """
+    names: list
+    percentiles: tuple
+    bands: np.ndarray
+    seed: int
+
+    def band(self, name, period=-1):
+        """Returns {percentile: RV Cum} for one report at the end of a period (default: last period)."""
+        row = self.bands[self.names.index(name), period]
+        return dict(zip(self.percentiles, (float(val) for val in row)))
+
+
+def fit_history(rpt_db, profile=None):
+    """
+    Fits a normal distribution to the RS's rpt averages.
+
+    Uses the reports in rpt_db.  The OMPF profile only gives us a high/low/avg, so it is used as a fallback:
+    mean = profile avg, std = a quarter of the high-low spread.
+
+    Returns:
+        tuple: (mean, std)
+    """
+    avgs = np.array([rpt_db.rpts_dict[name].rpt_avg for name in rpt_db.name_list])
+    if len(avgs) >= 2:
+        return float(avgs.mean()), float(avgs.std(ddof=1))
+    if profile is not None:
+        return float(profile.avg), float(profile.high - profile.low) / 4
+    raise ValueError("Need at least 2 reports or a profile to fit a distribution")
+
+
+def _simulate_chunk(args):
+    """
+    Simulates one chunk of trajectories.  Module level so the process pool can pickle it.
+
+    Returns:
+        tuple: (highs, avgs), each (num trajectories, num periods) - the profile at the end of each period.
+    """
+    (seed_seq, num_traj, periods, rpts_per_period, dist, params, high, high_avg, num_rpts) = args
+    rng = np.random.default_rng(seed_seq)
+    num_draws = periods * rpts_per_period
+
+    if dist == "normal":
+        mean, std = params
+        draws = np.clip(rng.normal(mean, std, size=(num_traj, num_draws)), 1., 7.)
+    else:
+        draws = rng.choice(np.asarray(params), size=(num_traj, num_draws))
+
+    # profile values at the end of each period
+    period_ends = np.arange(1, periods + 1) * rpts_per_period - 1
+    sums = np.cumsum(draws, axis=1)[:, period_ends]
+    highs = np.maximum(high, np.maximum.accumulate(draws, axis=1)[:, period_ends])
+    counts = num_rpts + period_ends + 1
+    avgs = (high_avg * num_rpts + sums) / counts
+    return highs, avgs
+
+
+def forecast_rv_cum(profile, rpt_db, periods=4, rpts_per_period=3, num_trajectories=20000, dist="normal",
+                    params=None, seed=0, percentiles=(5, 25, 50, 75, 95), chunk_size=2500, max_workers=None):
+    """
+    Forecasts the min RV Cum of every report in rpt_db over future reporting periods.
+
+    Args:
+        profile (RankProfile): Current profile, including the reports in rpt_db (e.g. the active profile).
+        rpt_db (ReportDB): Reports to track.
+        periods (int): Number of future reporting periods.
+        rpts_per_period (int): Reports written each period.
+        num_trajectories (int): Number of simulated futures.
+        dist (str): "normal" (params = (mean, std), default: fit_history) or
+                    "empirical" (params = rpt averages to resample, default: the averages in rpt_db).
+        params: Distribution parameters, see dist.
+        seed (int): Run seed.  Same seed + same inputs = same result.
+        percentiles (tuple): Percentiles to report.
+        chunk_size (int): Trajectories per chunk (unit of work for a process).
+        max_workers (int): None = in this process, or the shared pool with one worker per CPU for runs of at
+                           least PARALLEL_MIN_DRAWS.  0 = always in this process.  n = always the pool, n workers.
+
+    Returns:
+        ForecastResult
+    """
+    if dist not in DISTRIBUTIONS:
+        raise ValueError(f"Unknown distribution '{dist}'. Allowed: {list(DISTRIBUTIONS)}")
+
+    if params is None:
+        if dist == "normal":
+            params = fit_history(rpt_db, profile)
+        else:
+            params = [rpt_db.rpts_dict[name].rpt_avg for name in rpt_db.name_list]
+    if dist == "empirical" and not len(params):
+        raise ValueError("Empirical forecast needs at least one rpt average to resample")
+
+    rpt_avgs = np.array([rpt_db.rpts_dict[name].rpt_avg for name in rpt_db.name_list])
+
+    # chunking depends only on the inputs (not the number of workers), which keeps runs reproducible
+    chunk_sizes = [chunk_size] * (num_trajectories // chunk_size)
+    if num_trajectories % chunk_size:
+        chunk_sizes.append(num_trajectories % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    jobs = [(seed_seq, size, periods, rpts_per_period, dist, params, profile.high, profile.high_avg, profile.num_rpts)
+            for seed_seq, size in zip(seeds, chunk_sizes)]
+
+    num_draws = num_trajectories * periods * rpts_per_period
+    if max_workers == 0 or (max_workers is None and num_draws < PARALLEL_MIN_DRAWS):
+        chunks = [_simulate_chunk(job) for job in jobs]
+    else:
+        chunks = list(_get_pool(max_workers).map(_simulate_chunk, jobs))
+
+    highs = np.concatenate([chunk[0] for chunk in chunks])     # (trajectories, periods)
+    avgs = np.concatenate([chunk[1] for chunk in chunks])
+    counts = profile.num_rpts + np.arange(1, periods + 1) * rpts_per_period
+
+    # (reports, periods, percentiles), a block of reports at a time
+    bands = np.empty((len(rpt_avgs), periods, len(percentiles)))
+    block = max(1, BAND_BLOCK_CELLS // (num_trajectories * periods))
+    for start in range(0, len(rpt_avgs), block):
+        part = rpt_avgs[start:start + block]
+        rvs = calc_eng._rv_eq_vec(part[:, None, None], counts[None, None, :], highs[None], avgs[None])
+        bands[start:start + block] = np.percentile(rvs, percentiles, axis=1).transpose(1, 2, 0)
+
+    return ForecastResult(names=list(rpt_db.name_list), percentiles=tuple(percentiles), bands=bands, seed=seed)
@@ -0,0 +1,168 @@
+import copy
+from dataclasses import dataclass, field
+
+import src.app.models as models
+import src.app.calc_eng as calc_eng
+
+####################################################################################
+############################  Versioned Session History  ###########################
+####################################################################################
+# Named "what-if" versions of the report db, for branching, side by side comparison and roll back.
+# Each version only stores what changed since its parent: the reports whose marks changed (core copies - the
+# narrative is shared), the names that were removed, and the names appended to the processing order.  A full
+# reorder stores the whole order.  Every snapshot_every versions down a branch a full snapshot is stored, so
+# rebuilding a version never walks more than snapshot_every deltas.
+# RVs are not stored.  They depend on every report, so they would make every delta the size of the db.  They are
+# recalculated from the original profile (the same for every version) when a version is checked out or diffed.
+
+
+@dataclass
+class Version:
+    """
+    One saved version of the report db.
+
+    Attributes:
+        version_id (int): Position in SessionHistory.versions.
+        label (str): Name of the scenario.
+        parent (int): version_id of the parent version, None for a root.
+        depth (int): Deltas since the last full snapshot (0 = this is a snapshot).
+        changed (dict): {name: Report} added or changed since the parent (all reports for a snapshot).
+        removed (tuple): Names removed since the parent.
+        appended (tuple): Names appended to the parent's order, if order is None.
+        order (tuple): Full processing order, if it isn't the parent's order plus appended.
+    """
+    version_id: int
+    label: str
+    parent: int
+    depth: int
+    changed: dict = field(default_factory=dict)
+    removed: tuple = ()
+    appended: tuple = ()
+    order: tuple = None
+
+
+class SessionHistory:
+    """
+    Versions of the report db for one session.  All versions share the session's original profile.
+    """
+    def __init__(self, orig_profile, snapshot_every=32):
+        """
+        Args:
+            orig_profile (RankProfile): Profile as entered from the OMPF, before any session reports.
+            snapshot_every (int): Max deltas between full snapshots.
+        """
+        self.orig_profile = copy.copy(orig_profile)
+        self.snapshot_every = snapshot_every
+        self.versions = []
+
+    def _resolve(self, version_id):
+        """Returns (order tuple, {name: Report}) of a version."""
+        chain = []
+        ver = self.versions[version_id]
+        while ver.depth:
+            chain.append(ver)
+            ver = self.versions[ver.parent]
+
+        # start at the snapshot and apply the deltas, oldest first
+        order = ver.order
+        rpts = dict(ver.changed)
+        for ver in reversed(chain):
+            for name in ver.removed:
+                del rpts[name]
+            rpts.update(ver.changed)
+            if ver.order is not None:
+                order = ver.order
+            else:
+                removed = set(ver.removed)
+                order = tuple(name for name in order if name not in removed) + ver.appended
+        return order, rpts
+
+    def commit(self, db, label="", parent=None):
+        """
+        Saves db as a new version.
+
+        Args:
+            db (ReportDB): Reports to save.  Only reports that differ from the parent are copied.
+            label (str): Scenario name.
+            parent (int): Version to branch from.  Default: the latest version.
+
+        Returns:
+            int: The new version_id.
+        """
+        if parent is None and self.versions:
+            parent = len(self.versions) - 1
+        version_id = len(self.versions)
+        new_order = tuple(db.name_list)
+        parent_order, parent_rpts = self._resolve(parent) if parent is not None else ((), {})
+
+        changed = {}
+        for name in new_order:
+            rpt, old = db.rpts_dict[name], parent_rpts.get(name)
+            if old is None or (rpt.rank, rpt.packed_marks) != (old.rank, old.packed_marks):
+                changed[name] = copy.deepcopy(rpt)
+
+        if parent is None or self.versions[parent].depth + 1 >= self.snapshot_every:
+            # snapshot - unchanged reports are still shared with the parent
+            rpts = {name: changed.get(name) or parent_rpts[name] for name in new_order}
+            self.versions.append(Version(version_id, label, parent, 0, changed=rpts, order=new_order))
+            return version_id
+
+        removed = tuple(name for name in parent_order if name not in db.rpts_dict)
+
+        # store only the appended names if the old reports kept their order
+        kept = tuple(name for name in parent_order if name in db.rpts_dict)
+        order, appended = None, new_order[len(kept):]
+        if new_order[:len(kept)] != kept:
+            order, appended = new_order, ()
+
+        self.versions.append(Version(version_id, label, parent, self.versions[parent].depth + 1,
+                                     changed=changed, removed=removed, appended=appended, order=order))
+        return version_id
+
+    def _build_db(self, version_id):
+        """ReportDB holding the stored Report objects of a version.  Only for reading - see checkout()."""
+        order, rpts = self._resolve(version_id)
+        db = models.ReportDB()
+        db.name_list = list(order)
+        db.rpts_dict = rpts
+        return db
+
+    def checkout(self, version_id):
+        """
+        Rebuilds a version, with RVs recalculated.
+
+        Returns:
+            tuple: (ReportDB, RankProfile) - the db is a shadow, so changing it never changes the history.
+        """
+        db = self._build_db(version_id).shadow()
+
+        profile = copy.copy(self.orig_profile)
+        profile.label = "Active"
+        calc_eng.recalc_db(db, self.orig_profile, profile)
+        return db, profile
+
+    def _rvs(self, version_id):
+        """{name: (rv_proc_min, rv_cum_min)} of a version, from the batch calculation."""
+        cols = models.ReportColumns.from_db(self._build_db(version_id))
+        calc_eng.update_profile_batch(self.orig_profile, copy.copy(self.orig_profile), cols)
+        return {name: (float(cols.rv_proc_min[idx]), float(cols.rv_cum_min[idx])) for idx, name in enumerate(cols.names)}
+
+    def diff(self, version_a, version_b, include_unchanged=False):
+        """
+        Per report RV changes from version_a to version_b.
+
+        Returns:
+            dict: {name: {"rv_proc_min": (a, b), "rv_cum_min": (a, b)}}.  A report missing from a version has
+                  None for that side.  Unchanged reports are left out unless include_unchanged is True.
+        """
+        rvs_a, rvs_b = self._rvs(version_a), self._rvs(version_b)
+        res = {}
+        for name in list(rvs_a) + [name for name in rvs_b if name not in rvs_a]:
+            proc_a, cum_a = rvs_a.get(name, (None, None))
+            proc_b, cum_b = rvs_b.get(name, (None, None))
+            if include_unchanged or (proc_a, cum_a) != (proc_b, cum_b):
+                res[name] = {"rv_proc_min": (proc_a, proc_b), "rv_cum_min": (cum_a, cum_b)}
+        return res
+
+    def __len__(self):
+        return len(self.versions)
@@ -0,0 +1,325 @@
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from fractions import Fraction
+from pathlib import Path
+
+import numpy as np
+
+import src.app.models as models
+import src.app.constants as constants
+
+####################################################################################
+##############################  Profile History Import  ############################
+####################################################################################
+# Builds the RS's original profile from the full per-report history, instead of the rounded OMPF values.
+# Every report avg is a whole number of models.AVG_UNITS, so high, low and sum are exact integers - no unrounding
+# and no +/- 0.005 bracket.  The file is read in chunks: each chunk is parsed into a marks matrix / units vector
+# and folded into HistoryStats with a few numpy reductions, then dropped, so memory doesn't grow with the number
+# of reports (unless keep_columns is set).
+#
+# Accepted rows (CSV with a header, or JSON lines), one per report:
+#   rank    - optional, rows of other ranks are skipped
+#   name    - optional
+#   marks   - the 14 category columns (letters), or a "scores" column/key in the scores_as_str format
+#             ("CC CCC CCCCC CCC H"), or a JSON dict of {category: letter}
+#   avg     - instead of marks: the unrounded rpt avg ("53/13" or "4.0769230769").  Rounded averages can't be
+#             made exact and are rejected.
+
+FORMATS = ("csv", "jsonl")
+NUM_MARKS = len(constants.USMC_CATEGORIES)
+
+# AVG_UNITS per mark, by number of observed marks (0 observed is never valid)
+_UNITS_PER_MARK = np.array([0] + [models.AVG_UNITS // num for num in range(1, NUM_MARKS + 1)], dtype=np.int64)
+
+
+class HistoryStats:
+    """
+    Exact running high/low/sum of rpt avgs, in models.AVG_UNITS.  Memory use is constant.
+    """
+    def __init__(self):
+        self.high_units = 0
+        self.low_units = 0
+        self.sum_units = 0
+        self.num_rpts = 0
+
+    def update(self, units):
+        """Adds a vector of rpt avgs (in AVG_UNITS)."""
+        if not len(units):
+            return
+        chunk_high, chunk_low = int(units.max()), int(units.min())
+        self.high_units = max(self.high_units, chunk_high)
+        self.low_units = chunk_low if not self.num_rpts else min(self.low_units, chunk_low)
+        self.sum_units += int(units.sum())
+        self.num_rpts += len(units)
+
+    def to_profile(self, label, rank):
+        """RankProfile with the exact values.  The avg bracket has zero width."""
+        if not self.num_rpts:
+            return models.RankProfile(label, rank, 0, 0, 0, 0)
+        avg = self.sum_units / (self.num_rpts * models.AVG_UNITS)
+        return models.RankProfile(label, rank, self.high_units / models.AVG_UNITS, self.low_units / models.AVG_UNITS,
+                                  avg, self.num_rpts, low_avg=avg, high_avg=avg)
+
+
+@dataclass
+class HistoryImport:
+    """
+    Result of import_history.
+
+    Attributes:
+        profile (RankProfile): Original profile, exact.
+        columns (ReportColumns): Reports that had marks, if keep_columns was set.
+        num_skipped (int): Rows of other ranks.
+        num_errors (int): Rows that couldn't be read.
+        errors (list): (line number, message) of the first max_errors bad rows.
+    """
+    profile: models.RankProfile
+    columns: models.ReportColumns = None
+    num_skipped: int = 0
+    num_errors: int = 0
+    errors: list = field(default_factory=list)
+
+
+def _open_text(source):
+    """Returns (text file, close when done) for a path or a (binary or text) file object."""
+    if isinstance(source, (str, Path)):
+        return open(source, newline="", encoding="utf-8"), True
+    if isinstance(source, io.TextIOBase):
+        return source, False
+    return io.TextIOWrapper(source, encoding="utf-8", newline=""), False
+
+
+def _guess_format(source):
+    name = str(source) if isinstance(source, (str, Path)) else getattr(source, "name", "")
+    return "jsonl" if name.lower().endswith((".jsonl", ".json", ".ndjson")) else "csv"
+
+
+def _iter_records(text_file, fmt):
+    """Yields (line number, record dict) - CSV rows or JSON lines.  Unreadable JSON lines give None."""
+    if fmt == "csv":
+        reader = csv.DictReader(text_file)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_num, line in enumerate(text_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            yield line_num, record if isinstance(record, dict) else None
+
+
+def _record_marks(record):
+    """14 mark letters of a record as a string, or None if it has no marks."""
+    scores = record.get("scores")
+    if isinstance(scores, dict):
+        return "".join(str(scores.get(cat) or "?") for cat in constants.USMC_CATEGORIES).upper()
+    if scores:
+        return "".join(str(scores).split()).upper()
+    if constants.USMC_CATEGORIES[0] in record:
+        return "".join(str(record.get(cat) or "?").strip() for cat in constants.USMC_CATEGORIES).upper()
+    return None
+
+
+def _record_text(record, key, default=""):
+    """
+    A text field of a record, stripped.  JSON numbers are taken as text (a name of 12345); arrays and objects
+    raise ValueError.
+    """
+    value = record.get(key)
+    if value is None or value == "":
+        return default
+    if isinstance(value, (list, dict)):
+        raise ValueError(f"'{key}' must be text, not a JSON {'array' if isinstance(value, list) else 'object'}")
+    return str(value).strip()
+
+
+def _avg_to_units(text):
+    """Unrounded rpt avg -> AVG_UNITS.  Raises ValueError for rounded or impossible values."""
+    value = Fraction(str(text).strip())
+    frac = value.limit_denominator(NUM_MARKS)
+    if abs(frac - value) > Fraction(1, 10 ** 6):
+        raise ValueError(f"avg {text} is not an unrounded rpt average")
+    return models.avg_to_units(frac)
+
+
+class _Chunk:
+    """Rows of one chunk, waiting to be parsed together."""
+    def __init__(self):
+        self.letter_rows = []   # (line, name, 14 letters)
+        self.avg_units = []
+
+    def __len__(self):
+        return len(self.letter_rows) + len(self.avg_units)
+
+
+def _parse_letters(letter_rows):
+    """
+    Parses every marks row of a chunk at once.
+
+    Returns:
+        tuple: (names, marks (k, 14) int8, units (k,) int64, errors [(line, msg)]) for the good rows.
+    """
+    if not letter_rows:
+        return [], np.zeros((0, NUM_MARKS), dtype=np.int8), np.zeros(0, dtype=np.int64), []
+
+    errors = []
+    good_len = np.array([len(letters) == NUM_MARKS and letters.isascii() for _, _, letters in letter_rows])
+    marks = models.letters_to_marks([letters for _, _, letters in letter_rows])
+
+    num_observed = np.count_nonzero(marks > 0, axis=1)
+    valid = good_len & (marks >= 0).all(axis=1) & (num_observed > 0)
+    for idx in np.flatnonzero(~valid):
+        line, _, letters = letter_rows[idx]
+        if not good_len[idx]:
+            errors.append((line, f"Expected {NUM_MARKS} marks, got '{letters}'"))
+        elif (marks[idx] < 0).any():
+            errors.append((line, f"Invalid score letter in '{letters}'"))
+        else:
+            errors.append((line, "Can't have all scores be 'H'"))
+
+    marks = marks[valid]
+    units = marks.sum(axis=1, dtype=np.int64) * _UNITS_PER_MARK[num_observed[valid]]
+    names = [letter_rows[idx][1] for idx in np.flatnonzero(valid)]
+    return names, marks, units, errors
+
+
+def import_history(source, rank, fmt=None, chunk_size=4096, keep_columns=False, max_errors=100):
+    """
+    Reads a per-report history file and builds the exact original profile for one rank.
+
+    Args:
+        source: Path, or a file object (e.g. a streamlit upload).
+        rank (str): Rank to build the profile for.  Rows with a different 'rank' are skipped.
+        fmt (str): "csv" or "jsonl".  Default: from the file name, else csv.
+        chunk_size (int): Rows parsed per vectorized pass.
+        keep_columns (bool): Also return the reports with marks as ReportColumns (memory grows with the file).
+        max_errors (int): Bad rows to keep messages for.  All are counted.
+
+    Returns:
+        HistoryImport
+    """
+    fmt = fmt or _guess_format(source)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'. Allowed: {list(FORMATS)}")
+
+    stats = HistoryStats()
+    result = HistoryImport(profile=None)
+    kept_names, kept_marks = [], []
+
+    def _add_errors(errors):
+        result.num_errors += len(errors)
+        room = max_errors - len(result.errors)
+        result.errors.extend(errors[:max(room, 0)])
+
+    def _flush(chunk):
+        names, marks, units, errors = _parse_letters(chunk.letter_rows)
+        _add_errors(errors)
+        stats.update(units)
+        stats.update(np.array(chunk.avg_units, dtype=np.int64))
+        if keep_columns:
+            kept_names.extend(names)
+            kept_marks.append(marks)
+
+    text_file, close = _open_text(source)
+    try:
+        chunk = _Chunk()
+        for line_num, record in _iter_records(text_file, fmt):
+            if record is None:
+                _add_errors([(line_num, "Not a JSON object")])
+                continue
+            try:
+                record_rank = _record_text(record, "rank")
+                name = _record_text(record, "name", f"Row {line_num}")
+            except ValueError as e:
+                _add_errors([(line_num, str(e))])
+                continue
+            if record_rank and record_rank != rank:
+                result.num_skipped += 1
+                continue
+
+            letters = _record_marks(record)
+            if letters is not None:
+                chunk.letter_rows.append((line_num, name, letters))
+            elif record.get("avg") not in (None, ""):
+                try:
+                    chunk.avg_units.append(_avg_to_units(record["avg"]))
+                except (ValueError, ZeroDivisionError) as e:
+                    _add_errors([(line_num, str(e))])
+            else:
+                _add_errors([(line_num, "Row has no marks or avg")])
+
+            if len(chunk) >= chunk_size:
+                _flush(chunk)
+                chunk = _Chunk()
+        _flush(chunk)
+    finally:
+        if close:
+            text_file.close()
+
+    result.profile = stats.to_profile("Original", rank)
+    if keep_columns:
+        marks = np.concatenate(kept_marks) if kept_marks else np.zeros((0, NUM_MARKS), dtype=np.int8)
+        result.columns = models.ReportColumns(kept_names, marks)
+    return result
+
+
+####################################################################################
+###############################  Bulk Report Import  ###############################
+####################################################################################
+# New reports for the session, many at once - see calc_eng.add_reports_batch.  Either a CSV with a header (a
+# 'name' column plus the 14 category columns or a 'scores' column), or a pasted block with one report per line:
+#   SMITH, CC CCC CCCCC CCC H
+#   DE LA CRUZ  DD DDD DDDDD DDD H
+# The marks are taken from the end of the line (up to 14 letters A-H), so names can hold spaces and commas.
+
+_PASTED_TOKEN = re.compile(r"[^\s,]+")
+_MARK_LETTERS = re.compile(r"[A-Ha-h]+")
+
+
+def _split_pasted_line(line):
+    start, count = len(line), 0
+    for token in reversed(list(_PASTED_TOKEN.finditer(line))):
+        if count == NUM_MARKS or not _MARK_LETTERS.fullmatch(token.group()) or count + len(token.group()) > NUM_MARKS:
+            break
+        start, count = token.start(), count + len(token.group())
+    return line[:start].strip().rstrip(",").strip(), line[start:].strip()
+
+
+def read_report_rows(source):
+    """
+    Reads new reports from a CSV upload or a pasted block of text.
+
+    Args:
+        source: Text (str), or a file object.
+
+    Returns:
+        list: (name, mark letters) per report, in order.  Rows are not validated here.
+    """
+    if isinstance(source, str):
+        source = io.StringIO(source)
+    text_file, close = _open_text(source)
+    try:
+        lines = [line for line in text_file.read().splitlines() if line.strip()]
+    finally:
+        if close:
+            text_file.close()
+    if not lines:
+        return []
+
+    header = [col.strip().lower() for col in next(csv.reader([lines[0]]))]
+    if "name" not in header:
+        return [_split_pasted_line(line) for line in lines]
+
+    rows = []
+    for record in csv.DictReader(lines):
+        record = {(key or "").strip().lower(): val for key, val in record.items()}
+        # categories are matched case-insensitively too
+        record.update({cat: record.get(cat.lower()) for cat in constants.USMC_CATEGORIES if cat.lower() in record})
+        rows.append(((record.get("name") or "").strip(), _record_marks(record) or ""))
+    return rows
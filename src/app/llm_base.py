@@ -1,3 +1,5 @@
+import asyncio
+import time
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
 
@@ -29,11 +31,85 @@ class LLMResponse:
         model (str): The name/ID of the model used (e.g., "gpt-4o-mini", "mistral-7b").
         prompt_tokens (Optional[int]): Token count for the input (for cost tracking).
         completion_tokens (Optional[int]): Token count for the output.
+        ttft (Optional[float]): Seconds from sending the request to the first streamed text (streaming only).
+        tokens_per_sec (Optional[float]): Output tokens per second after the first one (streaming only).
+        cached (bool): True if it came from the response cache (llm_cache) - nothing was generated or paid for.
     """
     text: str
     model: str
     prompt_tokens: int | None = None
     completion_tokens: int | None = None
+    ttft: float | None = None
+    tokens_per_sec: float | None = None
+    cached: bool = False
+
+
+class LLMStream:
+    """
+    Text of a response as it's produced.  Iterate it for the text chunks (e.g. with st.write_stream), then read
+    .response for the whole text, token counts and timing.
+
+    The client's chunk generator gets the stream as its argument, so it can fill in model / token counts the
+    provider only reports at the end.  Without a completion token count, tokens_per_sec counts text chunks,
+    which the APIs send about one per token.
+    """
+    def __init__(self, model, make_chunks, clock=time.perf_counter):
+        """
+        Args:
+            model (str): Model name, until the chunk generator sets the one the provider reports.
+            make_chunks (callable): Takes this stream, returns an iterator of text chunks.
+            clock (callable): Returns the time in seconds.  For tests.
+        """
+        self.model = model
+        self.prompt_tokens = None
+        self.completion_tokens = None
+        self.ttft = None
+        self.elapsed = None
+        self.num_chunks = 0
+        self.done = False
+        self.cached = False
+        self._make_chunks = make_chunks
+        self._clock = clock
+        self._parts = []
+
+    def __iter__(self):
+        start = self._clock()
+        for chunk in self._make_chunks(self):
+            if not chunk:
+                continue
+            if self.ttft is None:
+                self.ttft = self._clock() - start
+            self.num_chunks += 1
+            self._parts.append(chunk)
+            yield chunk
+        self.elapsed = self._clock() - start
+        self.done = True
+
+    @property
+    def text(self):
+        """Text so far."""
+        return "".join(self._parts)
+
+    @property
+    def tokens_per_sec(self):
+        if not self.done or self.ttft is None:
+            return None
+        num_tokens = self.completion_tokens or self.num_chunks
+        gen_time = self.elapsed - self.ttft
+        # a single chunk (e.g. a cached response) has no rate to measure
+        return num_tokens / gen_time if gen_time > 0 and num_tokens > 1 else None
+
+    @property
+    def response(self):
+        """
+        Returns:
+            LLMResponse: Whole response.  Raises RuntimeError if the stream hasn't been read to the end.
+        """
+        if not self.done:
+            raise RuntimeError("Stream has not been read to the end")
+        return LLMResponse(text=self.text, model=self.model, prompt_tokens=self.prompt_tokens,
+                           completion_tokens=self.completion_tokens, ttft=self.ttft,
+                           tokens_per_sec=self.tokens_per_sec, cached=self.cached)
 
 
 class BaseLLMClient(ABC):
@@ -59,3 +135,41 @@ class BaseLLMClient(ABC):
             Exception: If the API call fails or connection times out.
         """
         pass
+
+    async def agenerate(self, request: LLMRequest) -> LLMResponse:
+        """
+        Async version of generate, for generating many reports at once.
+
+        Clients with a native async API override this.  The default runs generate on a worker thread, so
+        blocking clients (e.g. the Ollama CLI) can still be awaited side by side.
+        """
+        return await asyncio.to_thread(self.generate, request)
+
+    def stream(self, request: LLMRequest) -> LLMStream:
+        """
+        Streaming version of generate - text is available as it's produced.
+
+        Clients that can stream override this.  The default calls generate and gives the text as one chunk.
+
+        Returns:
+            LLMStream: Iterate it for the text chunks.  Errors are raised while iterating.
+        """
+        def _chunks(out):
+            response = self.generate(request)
+            out.model = response.model
+            out.prompt_tokens = response.prompt_tokens
+            out.completion_tokens = response.completion_tokens
+            yield response.text
+
+        return LLMStream(self.model, _chunks)
+
+    async def aclose(self):
+        """
+        Releases the async connections made on the running event loop, before the loop ends.  The default has
+        none to release.
+        """
+        pass
+
+    def close(self):
+        """Releases the client's connections.  The default has none to release."""
+        pass
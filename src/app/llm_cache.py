@@ -0,0 +1,208 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+import src.app.constants as constants
+from src.app.llm_base import BaseLLMClient, LLMRequest, LLMResponse, LLMStream
+
+####################################################################################
+##############################  LLM Response Cache  ################################
+####################################################################################
+# Persistent cache of LLM responses, so reloading the page or retrying the same inputs doesn't pay for the same
+# tokens twice.  Keys are a SHA-256 of everything that decides the response: the model id, the fully rendered
+# prompts and the sampling parameters (LLMRequest).  Stored in SQLite in WAL mode, which lets several streamlit
+# worker processes read and write the same file.  Every call opens its own short connection, so nothing is
+# shared between threads or processes.
+# Eviction: entries older than max_age_days are dropped, then the least recently used ones until the stored text
+# is under max_bytes.  It runs after every put.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+"""
+
+
+def make_key(model_id, request):
+    """
+    Content address of a request.
+
+    Args:
+        model_id (str): Model the request is sent to.
+        request (LLMRequest): Rendered prompts and sampling parameters.
+
+    Returns:
+        str: Hex SHA-256.
+    """
+    payload = json.dumps({"model": model_id, **dataclasses.asdict(request)}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    Disk-backed LLM response cache with size and age based LRU eviction.
+    """
+    def __init__(self, path=constants.LLM_CACHE_PATH, max_bytes=constants.LLM_CACHE_MAX_BYTES,
+                 max_age_days=constants.LLM_CACHE_MAX_AGE_DAYS, clock=time.time):
+        """
+        Args:
+            path (str | Path): SQLite file.  Created (with its folder) if missing.
+            max_bytes (int): Max total size of the stored response text.
+            max_age_days (float): Entries older than this are dropped, however often they're used.
+            clock (callable): Returns the current time in seconds.  For tests.
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 3600
+        self.clock = clock
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")    # persistent - readers don't block the writer
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # timeout: wait for another process's write instead of failing with 'database is locked'
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, key):
+        """
+        Returns:
+            LLMResponse: The cached response (marks it as recently used), or None.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT model, text, prompt_tokens, completion_tokens, created FROM responses "
+                                   "WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                now = self.clock()
+                if now - row[4] > self.max_age:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        finally:
+            conn.close()
+        return LLMResponse(text=row[1], model=row[0], prompt_tokens=row[2], completion_tokens=row[3])
+
+    def put(self, key, response):
+        """Stores (or replaces) a response, then evicts."""
+        now = self.clock()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                             (key, response.model, response.text, response.prompt_tokens, response.completion_tokens,
+                              len(response.text.encode()), now, now))
+                self._evict(conn, now)
+        finally:
+            conn.close()
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # walk from least recently used until enough is freed
+        to_delete = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_used, created"):
+            if total <= self.max_bytes:
+                break
+            to_delete.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", to_delete)
+
+    def clear(self):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM responses")
+        finally:
+            conn.close()
+
+    def __len__(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        finally:
+            conn.close()
+
+
+class CachedLLMClient(BaseLLMClient):
+    """
+    Wraps any client: generate() returns the cached response if there is one, otherwise calls the client and
+    stores the result.  Cache hits have None token counts, since nothing was paid for them, and cached=True.
+    """
+    def __init__(self, client, cache, refresh=False):
+        """
+        Args:
+            client (BaseLLMClient): Client to call on a miss.  Needs a .model attribute.
+            cache (LLMCache): Where responses are stored.
+            refresh (bool): Skip the lookup and always call the client (the new response replaces the old one).
+        """
+        self.client = client
+        self.cache = cache
+        self.refresh = refresh
+        self.model = client.model
+        self.last_hit = False
+
+    def generate(self, request: LLMRequest) -> LLMResponse:
+        key = make_key(self.model, request)
+        cached = None if self.refresh else self.cache.get(key)
+        self.last_hit = cached is not None
+        if cached is not None:
+            return dataclasses.replace(cached, prompt_tokens=None, completion_tokens=None, cached=True)
+
+        response = self.client.generate(request)
+        self.cache.put(key, response)
+        return response
+
+    async def agenerate(self, request: LLMRequest) -> LLMResponse:
+        """Async generate.  The SQLite calls are quick and run on a worker thread."""
+        key = make_key(self.model, request)
+        cached = None if self.refresh else await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return dataclasses.replace(cached, prompt_tokens=None, completion_tokens=None, cached=True)
+
+        response = await self.client.agenerate(request)
+        await asyncio.to_thread(self.cache.put, key, response)
+        return response
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def stream(self, request: LLMRequest) -> LLMStream:
+        """Streaming generate.  A hit is one chunk; a miss is stored once the client's stream has been read."""
+        key = make_key(self.model, request)
+        cached = None if self.refresh else self.cache.get(key)
+        self.last_hit = cached is not None
+        if cached is not None:
+            hit = LLMStream(cached.model, lambda out: iter([cached.text]))
+            hit.cached = True
+            return hit
+
+        inner = self.client.stream(request)
+
+        def _chunks(out):
+            yield from inner
+            out.model = inner.model
+            out.prompt_tokens = inner.prompt_tokens
+            out.completion_tokens = inner.completion_tokens
+            self.cache.put(key, inner.response)
+
+        return LLMStream(self.model, _chunks)
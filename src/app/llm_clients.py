@@ -1,11 +1,90 @@
+import asyncio
+import codecs
+import inspect
+import json
 import os
+import re
 import subprocess
+import threading
+import weakref
+import requests
 import src.app.constants as constants
 
 from pathlib import Path
-from openai import OpenAI
-from huggingface_hub import InferenceClient
-from src.app.llm_base import BaseLLMClient, LLMRequest, LLMResponse
+from openai import DEFAULT_CONNECTION_LIMITS, AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+from huggingface_hub import AsyncInferenceClient, InferenceClient
+from src.app.llm_base import BaseLLMClient, LLMRequest, LLMResponse, LLMStream
+
+# usage on the last streamed chunk (stream_options) came in a later huggingface_hub than requirements.txt pins -
+# older releases reject the argument, so it's only passed when supported.  TTFT is measured either way.
+_HF_STREAM_OPTIONS = "stream_options" in inspect.signature(InferenceClient.chat_completion).parameters
+
+
+def _chat_messages(request: LLMRequest) -> list:
+    # Build the messages list
+    # Only add the System role if the prompt actually has content
+    messages = []
+    if request.system_prompt:
+        messages.append({"role": "system", "content": request.system_prompt})
+
+    messages.append({"role": "user", "content": request.user_prompt})
+    return messages
+
+
+def _httpx_limits():
+    # bounded pool - clients are shared by every session (see client_pool.py)
+    # built from the openai default so it's the Limits class of whichever httpx package openai uses
+    return type(DEFAULT_CONNECTION_LIMITS)(max_connections=constants.LLM_POOL_MAX_CONNECTIONS,
+                                           max_keepalive_connections=constants.LLM_POOL_MAX_CONNECTIONS)
+
+
+class _PerLoop:
+    """
+    Async clients by event loop.  An async HTTP client only works on the loop it was created on, and each
+    generate_batch runs its own loop, so a long-lived client keeps one per loop.  agenerate_batch closes its
+    loop's client before the loop ends (aclose_current); close() gets any left on loops still alive.
+    The pooled client is shared by every session's thread, so the dict is only touched under a lock.
+    """
+    def __init__(self, factory):
+        self.factory = factory
+        self.clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self.clients.get(loop)
+            if client is None:
+                client = self.clients[loop] = self.factory()
+        return client
+
+    @staticmethod
+    async def _aclose(client):
+        close = getattr(client, "close", None)     # older huggingface_hub releases have nothing to close
+        result = close() if close is not None else None
+        if inspect.isawaitable(result):
+            await result
+
+    async def aclose_current(self):
+        """Closes the running loop's client, if it made one.  The next get() on this loop makes a new one."""
+        with self._lock:
+            client = self.clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await self._aclose(client)
+
+    def close(self):
+        """Closes the clients of every loop still alive.  Never blocks on a running loop."""
+        with self._lock:
+            items = list(self.clients.items())
+            self.clients.clear()
+        for loop, client in items:
+            if loop.is_closed():
+                continue    # its connections went with it
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._aclose(client), loop)
+            else:
+                loop.run_until_complete(self._aclose(client))
+
 
 class OpenAIClient(BaseLLMClient):
     """
@@ -29,48 +108,98 @@ class OpenAIClient(BaseLLMClient):
                 f"Unsupported model '{model}'. Allowed: {sorted(valid_ids)}"
             )
 
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(api_key=api_key, http_client=DefaultHttpxClient(limits=_httpx_limits()))
+        self.api_key = api_key
+        self._async_clients = _PerLoop(lambda: AsyncOpenAI(api_key=api_key,
+                                                           http_client=DefaultAsyncHttpxClient(limits=_httpx_limits())))
         self.model = model
 
+    def _request_kwargs(self, request: LLMRequest) -> dict:
+        # Responses API:
+        # - instructions: system/developer message
+        # - input: user content (string or structured items)
+        # - max_output_tokens: cap output (includes reasoning tokens for GPT-5 family)
+        kwargs = {
+                    "model": self.model,
+                    "instructions": request.system_prompt,
+                    "input": [{"role": "user", "content": request.user_prompt}],
+                    "max_output_tokens": request.max_tokens,
+                    "temperature": request.temperature,
+                    }
+
+        # medium effort is default - these lines can support adding effort as a param in the future
+        # if request.reasoning:
+        #     kwargs["reasoning"] = {"effort": "medium"}
+        return kwargs
+
+    @staticmethod
+    def _to_response(response) -> LLMResponse:
+        text = (response.output_text or "").strip()
+
+        usage = response.usage
+        prompt_tokens = usage.input_tokens if usage else None
+        completion_tokens = usage.output_tokens if usage else None
+
+        return LLMResponse(
+            text=text,
+            model=response.model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+
     def generate(self, request: LLMRequest) -> LLMResponse:
         """
         Generate text using OpenAI chat completions.
         """
         try:
-            # Responses API:
-            # - instructions: system/developer message
-            # - input: user content (string or structured items)
-            # - max_output_tokens: cap output (includes reasoning tokens for GPT-5 family)
-            kwargs = {
-                        "model": self.model,
-                        "instructions": request.system_prompt,
-                        "input": [{"role": "user", "content": request.user_prompt}],
-                        "max_output_tokens": request.max_tokens,
-                        "temperature": request.temperature,
-                        }
-
-            # medium effort is default - these lines can support adding effort as a param in the future
-            # if request.reasoning:
-            #     kwargs["reasoning"] = {"effort": "medium"}
-
-            response = self.client.responses.create(**kwargs)
-
-            text = (response.output_text or "").strip()
-
-            usage = response.usage
-            prompt_tokens = usage.input_tokens if usage else None
-            completion_tokens = usage.output_tokens if usage else None
+            response = self.client.responses.create(**self._request_kwargs(request))
+            return self._to_response(response)
 
-            return LLMResponse(
-                text=text,
-                model=response.model,
-                prompt_tokens=prompt_tokens,
-                completion_tokens=completion_tokens,
-            )
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API Error: {str(e)}") from e
+
+    async def agenerate(self, request: LLMRequest) -> LLMResponse:
+        """
+        Same as generate, on the async OpenAI client.
+        """
+        try:
+            response = await self._async_clients.get().responses.create(**self._request_kwargs(request))
+            return self._to_response(response)
 
         except Exception as e:
             raise RuntimeError(f"OpenAI API Error: {str(e)}") from e
 
+    def stream(self, request: LLMRequest) -> LLMStream:
+        """
+        Same as generate, but the text arrives as response.output_text.delta events.
+        Model and usage come with the final response.completed event.
+        """
+        def _chunks(out):
+            try:
+                events = self.client.responses.create(**self._request_kwargs(request), stream=True)
+                for event in events:
+                    if event.type == "response.output_text.delta":
+                        yield event.delta
+                    elif event.type == "response.completed":
+                        final = self._to_response(event.response)
+                        out.model = final.model
+                        out.prompt_tokens = final.prompt_tokens
+                        out.completion_tokens = final.completion_tokens
+                    elif event.type in ("response.failed", "error"):
+                        raise RuntimeError(getattr(event, "message", None) or "Response failed")
+
+            except Exception as e:
+                raise RuntimeError(f"OpenAI API Error: {str(e)}") from e
+
+        return LLMStream(self.model, _chunks)
+
+    async def aclose(self):
+        await self._async_clients.aclose_current()
+
+    def close(self):
+        self.client.close()
+        self._async_clients.close()
+
 
 class LocalModelClient(BaseLLMClient):
     """
@@ -109,7 +238,8 @@ class LocalModelClient(BaseLLMClient):
                 capture_output=True,
                 encoding="utf-8",
                 errors="replace",
-                check=True  # Raises CalledProcessError on non-zero exit code
+                check=True,  # Raises CalledProcessError on non-zero exit code
+                timeout=constants.OLLAMA_READ_TIMEOUT
             )
 
             return LLMResponse(
@@ -126,6 +256,189 @@ class LocalModelClient(BaseLLMClient):
         except Exception as e:
             raise RuntimeError(f"Local Inference Error: {str(e)}")
 
+    def stream(self, request: LLMRequest) -> LLMStream:
+        """
+        Same as generate, but stdout is read as the model writes it.
+        Runs with --verbose, which prints the prompt / output token counts to stderr at the end.
+        """
+        full_prompt = f"{request.system_prompt}\n\n{request.user_prompt}" if request.system_prompt else request.user_prompt
+
+        def _chunks(out):
+            try:
+                proc = subprocess.Popen(
+                    [self.local_path, "run", self.model, "--verbose"],
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+            except FileNotFoundError:
+                raise RuntimeError(f"Ollama executable not found at '{self.local_path}'. Is it installed?")
+
+            # stderr is drained on its own thread so a full pipe can't stall the model
+            err_parts = []
+            err_thread = threading.Thread(target=lambda: err_parts.append(proc.stderr.read()), daemon=True)
+            err_thread.start()
+            try:
+                proc.stdin.write(full_prompt.encode("utf-8"))
+                proc.stdin.close()
+
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                # os.read returns whatever is ready, instead of waiting for a full buffer
+                while data := os.read(proc.stdout.fileno(), 4096):
+                    yield decoder.decode(data)
+                yield decoder.decode(b"", final=True)
+
+                return_code = proc.wait()
+                err_thread.join()
+                stderr = b"".join(err_parts).decode("utf-8", errors="replace")
+                if return_code != 0:
+                    raise RuntimeError(f"Ollama CLI Error (Exit Code {return_code}): {stderr}")
+                out.prompt_tokens, out.completion_tokens = _parse_ollama_stats(stderr)
+
+            except RuntimeError:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Local Inference Error: {str(e)}")
+            finally:
+                if proc.poll() is None:     # reader stopped early
+                    proc.kill()
+                proc.stdout.close()
+
+        return LLMStream(self.model, _chunks)
+
+
+def _parse_ollama_stats(stderr):
+    """(prompt tokens, output tokens) from the stats 'ollama run --verbose' prints.  None if missing."""
+    prompt = re.search(r"^prompt eval count:\s+(\d+)", stderr, re.MULTILINE)
+    output = re.search(r"^eval count:\s+(\d+)", stderr, re.MULTILINE)
+    return (int(prompt.group(1)) if prompt else None), (int(output.group(1)) if output else None)
+
+
+class OllamaHTTPClient(BaseLLMClient):
+    """
+    Client for a running Ollama server (/api/chat).
+    Reuses pooled connections and asks the server to keep the model loaded (keep_alive), so only the first
+    request pays for loading it.  If the server isn't running, requests go to the fallback client (the CLI).
+    """
+    def __init__(self, model: str = constants.LOCAL_MODELS[constants.DEFAULT_LOCAL_MODEL]["model_id"],
+                 host: str = constants.OLLAMA_HOST, keep_alive: str = constants.OLLAMA_KEEP_ALIVE,
+                 timeout: tuple = (constants.OLLAMA_CONNECT_TIMEOUT, constants.OLLAMA_READ_TIMEOUT),
+                 fallback: BaseLLMClient = None):
+        """
+        Args:
+            model (str): The model tag to run (e.g. 'llama3').
+            host (str): Server address.  'host:port' without a scheme is taken as http.
+            keep_alive (str): How long the server keeps the model loaded after this request (e.g. '30m').
+            timeout (tuple): (connect, read) timeouts in seconds.
+            fallback (BaseLLMClient): Used when the server can't be reached.  None: raise instead.
+        """
+        self.model = model
+        self.host = (host if "://" in host else f"http://{host}").rstrip("/")
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.fallback = fallback
+        # keep-alive connections to the server, at most LLM_POOL_MAX_CONNECTIONS
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=constants.LLM_POOL_MAX_CONNECTIONS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _payload(self, request: LLMRequest, stream: bool) -> dict:
+        return {
+            "model": self.model,
+            "messages": _chat_messages(request),
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {"num_predict": request.max_tokens, "temperature": request.temperature},
+        }
+
+    def _post(self, request: LLMRequest, stream: bool):
+        """POST /api/chat.  Lets requests.ConnectionError through (server not running), wraps HTTP errors."""
+        response = self.session.post(f"{self.host}/api/chat", json=self._payload(request, stream),
+                                     timeout=self.timeout, stream=stream)
+        if response.status_code != 200:
+            try:
+                detail = response.json().get("error", response.text)
+            except ValueError:
+                detail = response.text
+            response.close()
+            raise RuntimeError(f"Ollama API Error ({response.status_code}): {detail}")
+        return response
+
+    def generate(self, request: LLMRequest) -> LLMResponse:
+        try:
+            data = self._post(request, stream=False).json()
+        except requests.ConnectionError:
+            if self.fallback is None:
+                raise RuntimeError(f"Ollama server not running at {self.host}")
+            return self.fallback.generate(request)
+        except RuntimeError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Local Inference Error: {str(e)}") from e
+
+        return LLMResponse(
+            text=data.get("message", {}).get("content", ""),
+            model=data.get("model", self.model),
+            prompt_tokens=data.get("prompt_eval_count"),
+            completion_tokens=data.get("eval_count"),
+        )
+
+    def stream(self, request: LLMRequest) -> LLMStream:
+        """
+        Same as generate, reading the server's JSON lines as they arrive.  Token counts are on the last line.
+        """
+        def _chunks(out):
+            try:
+                response = self._post(request, stream=True)
+            except requests.ConnectionError:
+                if self.fallback is None:
+                    raise RuntimeError(f"Ollama server not running at {self.host}")
+                inner = self.fallback.stream(request)
+                yield from inner
+                out.prompt_tokens, out.completion_tokens = inner.prompt_tokens, inner.completion_tokens
+                return
+            except RuntimeError:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Local Inference Error: {str(e)}") from e
+
+            try:
+                for line in response.iter_lines(chunk_size=None):     # each line as soon as it arrives
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if "error" in data:
+                        raise RuntimeError(f"Ollama API Error: {data['error']}")
+                    yield data.get("message", {}).get("content", "")
+                    if data.get("done"):
+                        out.model = data.get("model", self.model)
+                        out.prompt_tokens = data.get("prompt_eval_count")
+                        out.completion_tokens = data.get("eval_count")
+            except RuntimeError:
+                raise
+            except Exception as e:
+                raise RuntimeError(f"Local Inference Error: {str(e)}") from e
+            finally:
+                response.close()
+
+        return LLMStream(self.model, _chunks)
+
+    def close(self):
+        self.session.close()
+
+
+def make_local_client(model: str = constants.LOCAL_MODELS[constants.DEFAULT_LOCAL_MODEL]["model_id"],
+                      host: str = constants.OLLAMA_HOST, local_path: str = constants.OLLAMA_PATH) -> OllamaHTTPClient:
+    """
+    Local Ollama client: the server API, falling back to the CLI at local_path when the server isn't running.
+
+    Raises:
+        ValueError: If local_path is set but invalid (see LocalModelClient).
+    """
+    fallback = LocalModelClient(local_path, model) if local_path else None
+    return OllamaHTTPClient(model, host, fallback=fallback)
+
 
 class HuggingFaceClient(BaseLLMClient):
     """
@@ -145,45 +458,96 @@ class HuggingFaceClient(BaseLLMClient):
             raise ValueError("Missing Token: Set 'HF_API_TOKEN' in environment variables.")
 
         self.client = InferenceClient(token=self.api_token)
+        self._async_clients = _PerLoop(lambda: AsyncInferenceClient(token=self.api_token))
 
-    def generate(self, request: LLMRequest) -> LLMResponse:
-        try:
-            # Build the messages list
-            # Only add the System role if the prompt actually has content
-            messages = []
-            if request.system_prompt:
-                messages.append({"role": "system", "content": request.system_prompt})
+    def _to_response(self, response) -> LLMResponse:
+        # Extract Content
+        choice = response.choices[0]
+        generated_text = choice.message.content
+
+        if not generated_text:
+            raise RuntimeError("HuggingFace returned an empty response.")
+
+        # Attempt to extract usage stats (Available on some HF endpoints)
+        usage = response.usage
+        p_tokens = usage.prompt_tokens if usage else None
+        c_tokens = usage.completion_tokens if usage else None
 
-            messages.append({"role": "user", "content": request.user_prompt})
+        return LLMResponse(
+            text=generated_text,
+            model=self.model,
+            prompt_tokens=p_tokens,
+            completion_tokens=c_tokens,
+        )
 
+    def generate(self, request: LLMRequest) -> LLMResponse:
+        try:
             # Call the API (Blocking)
             response = self.client.chat.completions.create(
                 model=self.model,
-                messages=messages,
+                messages=_chat_messages(request),
                 max_tokens=request.max_tokens,
                 temperature=request.temperature,
                 stream=False
             )
+            return self._to_response(response)
 
-            # Extract Content
-            choice = response.choices[0]
-            generated_text = choice.message.content
-
-            if not generated_text:
-                raise RuntimeError("HuggingFace returned an empty response.")
-
-            # Attempt to extract usage stats (Available on some HF endpoints)
-            usage = response.usage
-            p_tokens = usage.prompt_tokens if usage else None
-            c_tokens = usage.completion_tokens if usage else None
+        except Exception as e:
+            # Wrap the error so the GUI knows it came from HF
+            raise RuntimeError(f"HuggingFace API Error: {str(e)}") from e
 
-            return LLMResponse(
-                text=generated_text,
+    async def agenerate(self, request: LLMRequest) -> LLMResponse:
+        """
+        Same as generate, on the async inference client.
+        """
+        try:
+            response = await self._async_clients.get().chat.completions.create(
                 model=self.model,
-                prompt_tokens=p_tokens,
-                completion_tokens=c_tokens,
+                messages=_chat_messages(request),
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                stream=False
             )
+            return self._to_response(response)
 
         except Exception as e:
-            # Wrap the error so the GUI knows it came from HF
             raise RuntimeError(f"HuggingFace API Error: {str(e)}") from e
+
+    def stream(self, request: LLMRequest) -> LLMStream:
+        """
+        Same as generate with stream=True.  Usage comes on the last chunk (include_usage), if the endpoint and the
+        installed huggingface_hub have it.
+        """
+        def _chunks(out):
+            try:
+                usage_kwargs = {"stream_options": {"include_usage": True}} if _HF_STREAM_OPTIONS else {}
+                chunks = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=_chat_messages(request),
+                    max_tokens=request.max_tokens,
+                    temperature=request.temperature,
+                    stream=True,
+                    **usage_kwargs,
+                )
+                for chunk in chunks:
+                    if chunk.choices:
+                        yield chunk.choices[0].delta.content
+                    if chunk.usage:
+                        out.prompt_tokens = chunk.usage.prompt_tokens
+                        out.completion_tokens = chunk.usage.completion_tokens
+
+            except Exception as e:
+                raise RuntimeError(f"HuggingFace API Error: {str(e)}") from e
+
+            if not out.num_chunks:
+                raise RuntimeError("HuggingFace returned an empty response.")
+
+        return LLMStream(self.model, _chunks)
+
+    async def aclose(self):
+        await self._async_clients.aclose_current()
+
+    def close(self):
+        if hasattr(self.client, "close"):     # older huggingface_hub releases have nothing to close
+            self.client.close()
+        self._async_clients.close()
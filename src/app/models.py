@@ -1,65 +1,217 @@
+import copy
+import heapq
+import math
+import random
+from collections import Counter
 import numpy as np
 import yaml
+from fractions import Fraction
 from pathlib import Path
 
 import src.app.constants as constants
 
+####################################################################################
+################################  Mark Codec  ######################################
+####################################################################################
+# A report's 14 marks as one 42-bit int, 3 bits per category, first category in the lowest bits ('H' = 0).  Equal
+# marks give equal codes, so the code works as a cheap dict / cache key or dedup key in place of scores_dict
+# strings.  Report.packed_marks holds it.
+
+MARK_BITS = 3
+MARKS_CODE_BITS = MARK_BITS * len(constants.USMC_CATEGORIES)     # 42 - fits any int / np.uint64
+_MARK_MASK = (1 << MARK_BITS) - 1
+_MARK_SHIFTS = np.arange(len(constants.USMC_CATEGORIES), dtype=np.uint64) * np.uint64(MARK_BITS)
+_MARK_LETTERS = {val: letter for letter, val in constants.SCORE_MAP.items()}
+
+
+def encode_marks(marks):
+    """Packs 14 mark values (0-7, 'H' = 0) into one int."""
+    code = 0
+    for idx, mark in enumerate(marks):
+        code |= int(mark) << (idx * MARK_BITS)
+    return code
+
+
+def decode_marks(code):
+    """Inverse of encode_marks.  Returns a list of 14 ints."""
+    return [(code >> (idx * MARK_BITS)) & _MARK_MASK for idx in range(len(constants.USMC_CATEGORIES))]
+
+
+def encode_scores(scores_dict):
+    """
+    Packs a scores_dict ({category: letter}) into one int.  Missing categories count as 'H'.
+
+    Raises:
+        ValueError: For invalid letters.
+    """
+    marks = []
+    for cat in constants.USMC_CATEGORIES:
+        letter = scores_dict.get(cat, "H")
+        if letter not in constants.SCORE_MAP:
+            raise ValueError(f"Invalid score letter: {letter}")
+        marks.append(constants.SCORE_MAP[letter])
+    return encode_marks(marks)
+
+
+def decode_scores(code):
+    """Inverse of encode_scores.  Returns {category: letter} for all 14 categories."""
+    return {cat: _MARK_LETTERS[mark] for cat, mark in zip(constants.USMC_CATEGORIES, decode_marks(code))}
+
+
+def encode_marks_array(marks):
+    """
+    Vectorized encode_marks.
+
+    Args:
+        marks: (k, 14) mark values, 0-7.
+
+    Returns:
+        np.ndarray: (k,) uint64 codes.
+    """
+    marks = np.asarray(marks).reshape(-1, len(constants.USMC_CATEGORIES)).astype(np.uint64)
+    return np.bitwise_or.reduce(marks << _MARK_SHIFTS, axis=1)
+
+
+def decode_marks_array(codes):
+    """
+    Vectorized decode_marks.
+
+    Returns:
+        np.ndarray: (k, 14) int8 marks.
+    """
+    codes = np.asarray(codes, dtype=np.uint64).reshape(-1, 1)
+    return ((codes >> _MARK_SHIFTS) & np.uint64(_MARK_MASK)).astype(np.int8)
+
+
+# letter -> mark, by byte value.  Anything that isn't A-H is -1.
+_LETTER_MARKS = np.full(256, -1, dtype=np.int8)
+for _letter, _val in constants.SCORE_MAP.items():
+    _LETTER_MARKS[ord(_letter)] = _val
+
+
+def letters_to_marks(letter_rows):
+    """
+    Converts many 14-letter mark strings at once.
+
+    Args:
+        letter_rows (list): Strings of mark letters, one per report (spaces already removed).
+
+    Returns:
+        np.ndarray: (k, 14) int8 marks.  Rows with an invalid letter or the wrong length have -1 in them.
+    """
+    num_cats = len(constants.USMC_CATEGORIES)
+    if not letter_rows:
+        return np.zeros((0, num_cats), dtype=np.int8)
+    raw = b"".join(letters.encode() if len(letters) == num_cats and letters.isascii() else b"?" * num_cats
+                   for letters in letter_rows)
+    return _LETTER_MARKS[np.frombuffer(raw, dtype=np.uint8)].reshape(len(letter_rows), num_cats)
+
+
+def parse_scores_str(scores_str):
+    """
+    Inverse of Report.scores_as_str.  Spaces are ignored and letters can be lower case.
+    Example: "CC CCC CCCCC CCC H" -> {"Mission Accomplishment": "C", ...}
+
+    Raises:
+        ValueError: If the string doesn't have exactly 14 valid mark letters.
+    """
+    letters = "".join(str(scores_str).split()).upper()
+    if len(letters) != len(constants.USMC_CATEGORIES):
+        raise ValueError(f"Expected {len(constants.USMC_CATEGORIES)} marks, got {len(letters)}")
+    bad = sorted(set(letters) - set(constants.SCORE_MAP))
+    if bad:
+        raise ValueError(f"Invalid score letter(s): {', '.join(bad)}")
+    return dict(zip(constants.USMC_CATEGORIES, letters))
+
+
 ####################################################################################
 ################################  Report class #####################################
 ####################################################################################
-class Report:
+# A report is split in two.  ReportCore holds what the calculations use (marks, average, RVs) in __slots__, with
+# the 14 marks packed into one int (see Mark Codec).  NarrativeRecord holds the text (prompt, accomplishments,
+# Section I, ...).  copy.deepcopy of a report copies the core and shares the narrative, so the shadow copies made
+# on every rerun stay small.  Narrative edits go through ReportDB / the Report properties and land in the one
+# shared record.
+
+class NarrativeRecord:
     """
-    Represents a single Marine's Fitness Report (FitRep).
+    Narrative inputs and outputs of a report.  Not copied by copy.deepcopy - use copy() for an independent one.
+    """
+    __slots__ = ("prompt", "billet", "accomplishments", "context", "secti", "secti_gens", "last_gen_hash",
+                 "prompt_tokens", "completion_tokens")
 
-    Holds the scores, calculated averages (RV), and narrative text inputs.
+    def __init__(self):
+        self.prompt = {"system": "Please enter accomplishments to generate a prompt",
+                       "user" : "Please enter accomplishments to generate a prompt"
+                       }
+        self.billet = ""
+        self.accomplishments = ""
+        self.context = ""
+        self.secti = ""
+        self.secti_gens = 0
+        self.last_gen_hash = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def copy(self):
+        new_rec = NarrativeRecord()
+        for field in self.__slots__:
+            setattr(new_rec, field, getattr(self, field))
+        new_rec.prompt = dict(self.prompt)
+        return new_rec
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class ReportCore:
     """
-    def __init__(self, rank, name, scores_dict=None):
+    Calculation state of a report: rank, name, marks, average and min/max RVs.
+    """
+    __slots__ = ("rank", "name", "scores_dict", "packed_marks", "rpt_avg", "mark_sum", "num_observed",
+                 "rv_proc_min", "rv_cum_min", "rv_proc_max", "rv_cum_max", "narrative")
+
+    def __init__(self, rank, name, scores_dict=None, narrative=None):
         """
         Args:
             rank (str): The rank of the Marine (e.g., "Capt").
             name (str): The last name of the Marine.
             scores_dict (dict, optional): Dictionary of 14 attributes mapped to letter grades (A-H).
+            narrative (NarrativeRecord, optional): Narrative to attach.  A new, empty one by default.
         """
         self.rank = rank
         self.name = name
         self.scores_dict = scores_dict if scores_dict is not None else {}
         # values
-        self.scores = np.zeros(14)
+        self.packed_marks = 0
         self.rpt_avg = 0
+        self.mark_sum = 0       # exact form of rpt_avg: mark_sum / num_observed
+        self.num_observed = 0
         # min/max rvs
         self.rv_proc_min = 0
         self.rv_cum_min = 0
         self.rv_proc_max = 0
         self.rv_cum_max = 0
-        # narratives
-        self.prompt = {"system": "Please enter accomplishments to generate a prompt",
-                       "user" : "Please enter accomplishments to generate a prompt"
-                       }
-        self.billet = ""
-        self.accomplishments = ""
-        self.context = ""
-        self.secti = ""
-        self.secti_gens = 0
-        self.last_gen_hash = None
-        self.prompt_tokens = 0
-        self.completion_tokens = 0
+        self.narrative = narrative if narrative is not None else NarrativeRecord()
         # if scores are provided, then update the values
         if scores_dict is not None:
             self.set_scores_with_dict(scores_dict)
             self._calc_rpt_avg()
 
-    def get_letter_scores(self):
-        """Returns the raw dictionary of letter grades."""
-        return self.scores_dict
+    @property
+    def scores(self):
+        """Marks as a numpy array, in category order.  'H' values are 0."""
+        return np.array(decode_marks(self.packed_marks), dtype=float)
 
     def _calc_rpt_avg(self):
         """
         Calculates the report average, ignoring 'H' (Not Observed) values.
-        'H' values are stored as 0 in self.scores.
         """
-        keep_vals = self.scores != 0
-        if np.any(keep_vals):
-            self.rpt_avg = self.scores[keep_vals].mean()
+        marks = decode_marks(self.packed_marks)
+        self.mark_sum = sum(marks)
+        self.num_observed = sum(1 for mark in marks if mark)
+        if self.num_observed:
+            self.rpt_avg = self.mark_sum / self.num_observed
         else:
             self.rpt_avg = 0
 
@@ -67,17 +219,61 @@ class Report:
         """
         Returns the appropriate value for the letter score.
         A=1, G=7, H=0 (Not Observed).
-        Returns -1 for invalid letters.
+
+        Raises:
+            ValueError: For invalid letters.
         """
-        return constants.SCORE_MAP.get(score_char, -1)
+        if score_char not in constants.SCORE_MAP:
+            raise ValueError(f"Invalid score letter: {score_char}")
+        return constants.SCORE_MAP[score_char]
 
     def set_scores_with_dict(self, score_dict):
         """
-        Parses a dictionary of attributes and updates the internal numpy array.
+        Parses a dictionary of attributes and updates the packed marks.
         """
+        marks = decode_marks(self.packed_marks)
         for i, key in enumerate(constants.USMC_CATEGORIES):
             if key in score_dict:
-                self.scores[i] = self._assign_score(score_dict[key])
+                marks[i] = self._assign_score(score_dict[key])
+        self.packed_marks = encode_marks(marks)
+
+    def __deepcopy__(self, memo):
+        # everything but scores_dict is immutable (or shared, for the narrative)
+        new_rpt = object.__new__(type(self))
+        for field in ReportCore.__slots__:
+            setattr(new_rpt, field, getattr(self, field))
+        new_rpt.scores_dict = dict(self.scores_dict)
+        return new_rpt
+
+
+def _narrative_field(field):
+    """Property that reads/writes a field of the report's NarrativeRecord."""
+    return property(lambda self: getattr(self.narrative, field),
+                    lambda self, val: setattr(self.narrative, field, val))
+
+
+class Report(ReportCore):
+    """
+    Represents a single Marine's Fitness Report (FitRep).
+
+    Holds the scores, calculated averages (RV), and narrative text inputs.
+    """
+    __slots__ = ()
+
+    # narratives
+    prompt = _narrative_field("prompt")
+    billet = _narrative_field("billet")
+    accomplishments = _narrative_field("accomplishments")
+    context = _narrative_field("context")
+    secti = _narrative_field("secti")
+    secti_gens = _narrative_field("secti_gens")
+    last_gen_hash = _narrative_field("last_gen_hash")
+    prompt_tokens = _narrative_field("prompt_tokens")
+    completion_tokens = _narrative_field("completion_tokens")
+
+    def get_letter_scores(self):
+        """Returns the raw dictionary of letter grades."""
+        return self.scores_dict
 
     def scores_as_str(self):
         """
@@ -132,28 +328,45 @@ class RankProfile:
     Tracks statistical profile for a specific rank (e.g., Captains).
     Used to calculate Relative Value (RV).
     """
-    def __init__(self, label, rank, high, low, avg, num_rpts):
+    def __init__(self, label, rank, high, low, avg, num_rpts, low_avg=None, high_avg=None):
+        """
+        low_avg / high_avg bracket the true average (OMPF avg is rounded).  Defaults to avg +/- 0.005; pass a
+        tighter bracket from calc_eng.infer_avg_bounds if available.
+        """
         self.label = label
         self.rank = rank
         self.high = high
         self.low = low
         self.avg = avg
-        self.low_avg = avg - 0.005
-        self.high_avg = avg + 0.005     # accounts for precision loss
+        self.low_avg = avg - 0.005 if low_avg is None else low_avg
+        self.high_avg = avg + 0.005 if high_avg is None else high_avg    # accounts for precision loss
         self.num_rpts = num_rpts
 
         # new value, attempt to reduce prrecision errors
         self.score_sum = avg * num_rpts
 
-    def set_values(self, high, low, avg, num_rpts):
+    def set_values(self, high, low, avg, num_rpts, low_avg=None, high_avg=None):
         self.high = high
         self.low = low
         self.avg = avg
-        self.low_avg = avg - 0.005
-        self.high_avg = avg + 0.005  # accounts for precision loss
+        self.low_avg = avg - 0.005 if low_avg is None else low_avg
+        self.high_avg = avg + 0.005 if high_avg is None else high_avg  # accounts for precision loss
         self.num_rpts = num_rpts
         self.score_sum = avg * num_rpts
 
+    def get_state(self):
+        """
+        Returns the running values as a tuple.  Used by the incremental calc engine to checkpoint the profile.
+        """
+        return (self.high, self.low, self.avg, self.low_avg, self.high_avg, self.num_rpts, self.score_sum)
+
+    def set_state(self, state):
+        """
+        Restores running values saved with get_state().  Unlike set_values, the precision bracket is restored
+        exactly instead of being rebuilt from the average.
+        """
+        self.high, self.low, self.avg, self.low_avg, self.high_avg, self.num_rpts, self.score_sum = state
+
     def update_with_rpt(self, rpt):
         """
         Updates the running average, high, and low based on a new report.
@@ -176,6 +389,34 @@ class RankProfile:
         # new
         self.score_sum += rpt.rpt_avg
 
+    def remove_rpt(self, rpt, multiset):
+        """
+        Takes a report back out of the profile (withdrawn/adverse).  Reverse of update_with_rpt.
+
+        Args:
+            rpt (Report): Report to remove.
+            multiset (AvgMultiset): Every known rpt avg in the profile, rpt's included.  rpt's avg is removed
+                                    from it, and the new high/low come from what's left.
+        """
+        multiset.remove(rpt.rpt_avg)
+        self.num_rpts -= 1
+        if self.num_rpts <= 0:
+            self.set_values(0, 0, 0, 0)
+            return
+
+        # reverse welfords
+        self.avg = self.avg + ((self.avg - rpt.rpt_avg) / self.num_rpts)
+        self.low_avg = self.low_avg + ((self.low_avg - rpt.rpt_avg) / self.num_rpts)
+        self.high_avg = self.high_avg + ((self.high_avg - rpt.rpt_avg) / self.num_rpts)
+        self.score_sum -= rpt.rpt_avg
+        self._set_extremes(multiset)
+
+    def _set_extremes(self, multiset):
+        # an empty multiset means only OMPF reports we know nothing about are left - keep the old values
+        if len(multiset):
+            self.high = multiset.max()
+            self.low = multiset.min()
+
     def get_average(self):
         """
         added to reduce precision errors caused by rounded profile averages
@@ -190,6 +431,257 @@ class RankProfile:
         res_str += f"     Avg: {self.avg:.2f}\n"
         return res_str
 
+
+class AvgMultiset:
+    """
+    Sorted multiset of rpt averages, for RankProfile.remove_rpt.
+
+    A max heap and a min heap with lazy deletion: removed values are counted and only popped once they reach the
+    top of a heap.  add/remove are O(log n), max/min are O(1) amortized.
+    """
+    def __init__(self, avgs=()):
+        self._max_heap = [-avg for avg in avgs]
+        self._min_heap = list(avgs)
+        heapq.heapify(self._max_heap)
+        heapq.heapify(self._min_heap)
+        self._counts = Counter(avgs)
+        self._size = len(self._min_heap)
+        self._stale_max = Counter()   # removed, but maybe still in the max heap
+        self._stale_min = Counter()
+
+    @classmethod
+    def from_profile(cls, orig_prof, db):
+        """
+        Builds the multiset for a session profile: the OMPF high and low (the only historical rpt avgs we know)
+        plus every report in db.
+        """
+        avgs = []
+        if orig_prof.num_rpts >= 1:
+            avgs.append(orig_prof.high)
+        if orig_prof.num_rpts >= 2:
+            avgs.append(orig_prof.low)
+        avgs.extend(db.rpts_dict[name].rpt_avg for name in db.name_list)
+        return cls(avgs)
+
+    def add(self, avg):
+        if self._stale_max[avg]:
+            self._stale_max[avg] -= 1      # still in the heap - reuse it
+        else:
+            heapq.heappush(self._max_heap, -avg)
+        if self._stale_min[avg]:
+            self._stale_min[avg] -= 1
+        else:
+            heapq.heappush(self._min_heap, avg)
+        self._counts[avg] += 1
+        self._size += 1
+
+    def remove(self, avg):
+        """Raises ValueError if avg isn't in the multiset."""
+        if not self._counts[avg]:
+            raise ValueError(f"{avg} is not in the profile")
+        self._counts[avg] -= 1
+        self._stale_max[avg] += 1
+        self._stale_min[avg] += 1
+        self._size -= 1
+
+    def max(self):
+        while self._stale_max[-self._max_heap[0]]:
+            self._stale_max[-heapq.heappop(self._max_heap)] -= 1
+        return -self._max_heap[0]
+
+    def min(self):
+        while self._stale_min[self._min_heap[0]]:
+            self._stale_min[heapq.heappop(self._min_heap)] -= 1
+        return self._min_heap[0]
+
+    def __len__(self):
+        return self._size
+
+####################################################################################
+#############################  Exact Rpt Averages ##################################
+####################################################################################
+# Every rpt average is (mark sum) / (observed marks), with 1-14 observed marks.  Scaled by the lcm of 1-14, every
+# possible rpt average is a whole number, so profile sums can be kept as exact integers (see importer).
+AVG_UNITS = math.lcm(*range(1, len(constants.USMC_CATEGORIES) + 1))
+
+
+def avg_to_units(avg):
+    """
+    Converts a rpt average (float or Fraction) to whole AVG_UNITS.
+
+    Raises:
+        ValueError: If no mark sum / observed count produces avg.
+    """
+    frac = Fraction(avg).limit_denominator(len(constants.USMC_CATEGORIES))
+    if float(frac) != float(avg):
+        raise ValueError(f"{avg} is not a possible rpt average")
+    return frac.numerator * (AVG_UNITS // frac.denominator)
+
+
+####################################################################################
+#################################  Order Index #####################################
+####################################################################################
+# Processing order of the reports.  An implicit treap (a randomly balanced binary tree ordered by position, with
+# subtree sizes), plus name -> node and name -> parent name dicts, so a name's position is a walk up the tree.
+# Membership is O(1); position, insert, delete and move are O(log n) expected.
+# copy() shares the tree: nodes are never changed by an index that didn't create them, split / merge copy a shared
+# node before changing it (path copying), so a copy costs two dict copies and each change O(log n) new nodes.
+
+class _OrderNode:
+    __slots__ = ("name", "prio", "size", "left", "right", "owner")
+
+    def __init__(self, name, owner, prio=None):
+        self.name = name
+        self.prio = random.random() if prio is None else prio
+        self.size = 1
+        self.left = None
+        self.right = None
+        self.owner = owner
+
+
+def _size(node):
+    return node.size if node is not None else 0
+
+
+class _OrderIndex:
+    """Ordered set of report names with O(1) membership and O(log n) positional updates."""
+    def __init__(self, names=()):
+        self.nodes = {}
+        self.parents = {}
+        self.root = None
+        self._token = object()      # owner of the nodes this index may change in place
+        self._build(names)
+
+    def _build(self, names):
+        """Builds the tree in O(n) - a stack of the right spine, like a Cartesian tree."""
+        spine = []
+        for name in names:
+            node = _OrderNode(name, self._token)
+            self.nodes[name] = node
+            last = None
+            while spine and spine[-1].prio < node.prio:
+                last = spine.pop()
+            node.left = last
+            if spine:
+                spine[-1].right = node
+            spine.append(node)
+
+        # sizes and parents, children first
+        stack, post = [spine[0]] if spine else [], []
+        while stack:
+            node = stack.pop()
+            post.append(node)
+            stack.extend(child for child in (node.left, node.right) if child is not None)
+        for node in reversed(post):
+            self._fix(node)
+        self._set_root(spine[0] if spine else None)
+
+    def _own(self, node):
+        """Returns node, copied first if it is shared with another index."""
+        if node.owner is self._token:
+            return node
+        new = _OrderNode(node.name, self._token, node.prio)
+        new.size, new.left, new.right = node.size, node.left, node.right
+        self.nodes[node.name] = new
+        return new
+
+    def _fix(self, node):
+        """Recomputes size and the children's parents after node's children changed."""
+        node.size = 1 + _size(node.left) + _size(node.right)
+        if node.left is not None:
+            self.parents[node.left.name] = node.name
+        if node.right is not None:
+            self.parents[node.right.name] = node.name
+
+    def _split(self, node, k):
+        """Splits a tree into (first k nodes, rest)."""
+        if node is None:
+            return None, None
+        node = self._own(node)
+        if _size(node.left) >= k:
+            left, node.left = self._split(node.left, k)
+            self._fix(node)
+            return left, node
+        node.right, right = self._split(node.right, k - _size(node.left) - 1)
+        self._fix(node)
+        return node, right
+
+    def _merge(self, left, right):
+        """Joins two trees, every node of left before every node of right."""
+        if left is None or right is None:
+            return left if left is not None else right
+        if left.prio > right.prio:
+            left = self._own(left)
+            left.right = self._merge(left.right, right)
+            self._fix(left)
+            return left
+        right = self._own(right)
+        right.left = self._merge(left, right.left)
+        self._fix(right)
+        return right
+
+    def _set_root(self, node):
+        self.root = node
+        if node is not None:
+            self.parents[node.name] = None
+
+    def position(self, name):
+        node = self.nodes[name]
+        pos = _size(node.left)
+        parent = self.parents[name]
+        while parent is not None:
+            parent_node = self.nodes[parent]
+            if node is parent_node.right:
+                pos += _size(parent_node.left) + 1
+            node, parent = parent_node, self.parents[parent]
+        return pos
+
+    def insert(self, pos, name):
+        """Inserts name before position pos (pos = len appends).  Returns the position used."""
+        pos = max(0, min(pos, len(self)))
+        node = _OrderNode(name, self._token)
+        self.nodes[name] = node
+        left, right = self._split(self.root, pos)
+        self._set_root(self._merge(self._merge(left, node), right))
+        return pos
+
+    def delete(self, name):
+        """Removes name.  Returns the position it had."""
+        pos = self.position(name)
+        left, rest = self._split(self.root, pos)
+        _, right = self._split(rest, 1)
+        del self.nodes[name]
+        del self.parents[name]
+        self._set_root(self._merge(left, right))
+        return pos
+
+    def copy(self):
+        """Copy that shares the tree with this index.  Both sides copy a node before changing it."""
+        new = _OrderIndex.__new__(_OrderIndex)
+        new.nodes = dict(self.nodes)
+        new.parents = dict(self.parents)
+        new.root = self.root
+        new._token = object()
+        self._token = object()      # the nodes so far are shared now - this index mustn't change them in place
+        return new
+
+    def __contains__(self, name):
+        return name in self.nodes
+
+    def __len__(self):
+        return _size(self.root)
+
+    def __iter__(self):
+        stack, node = [], self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.name
+            node = node.right
+
+
 ####################################################################################
 ##################################  Rpt DB #########################################
 ####################################################################################
@@ -197,21 +689,135 @@ class RankProfile:
 class ReportDB:
     """
     In-memory database to store current session reports.
-    Maintains insertion order using a list + dict approach.
+    Maintains processing order with an order index (see _OrderIndex) + dict approach.  Methods that change the
+    order return the lowest position they affected - RVs before that position don't change.
+
+    shadow() gives a copy-on-write "what-if" view: it shares the Report objects with this db, and a report is
+    only copied when the shadow changes it (get_report_for_update / set_rvs).  Shared reports must not be
+    changed through the committed db while a shadow is in use.
     """
     def __init__(self):
-        self.name_list = []
+        self._order = _OrderIndex()
+        self._names = []        # name_list cache, None when stale
         self.rpts_dict = {}
+        self._owned = None      # names of the reports a shadow has copied, None = owns every report
+
+    @property
+    def name_list(self):
+        """Report names in processing order.  Cached list - don't modify it, use the db methods."""
+        if self._names is None:
+            self._names = list(self._order)
+        return self._names
+
+    @name_list.setter
+    def name_list(self, names):
+        self._order = _OrderIndex(names)
+        self._names = None
+
+    def shadow(self):
+        """Returns a copy-on-write view of the db.  Only the dicts are copied - the order index is shared."""
+        new_db = ReportDB()
+        new_db._order = self._order.copy()
+        new_db._names = self._names
+        new_db.rpts_dict = dict(self.rpts_dict)
+        new_db._owned = set()
+        return new_db
+
+    def commit(self):
+        """Makes a shadow the owner of all its reports, e.g. when it replaces the committed db.  Returns self."""
+        self._owned = None
+        return self
+
+    def is_shadow(self):
+        return self._owned is not None
+
+    def get_report_for_update(self, name):
+        """Returns a report that is safe to change - on a shadow, shared reports are copied first."""
+        if self._owned is not None and name not in self._owned:
+            self.rpts_dict[name] = copy.deepcopy(self.rpts_dict[name])
+            self._owned.add(name)
+        return self.rpts_dict[name]
+
+    def set_rvs(self, name, rv_proc=None, rv_cum=None):
+        """
+        Sets RV Proc and/or RV Cum, each a (min, max) tuple.  A report is only copied if a value changes.
+        """
+        rpt = self.rpts_dict[name]
+        if rv_proc is not None and rv_proc != (rpt.rv_proc_min, rpt.rv_proc_max):
+            rpt = self.get_report_for_update(name)
+            rpt.rv_proc_min, rpt.rv_proc_max = rv_proc
+        if rv_cum is not None and rv_cum != (rpt.rv_cum_min, rpt.rv_cum_max):
+            rpt = self.get_report_for_update(name)
+            rpt.rv_cum_min, rpt.rv_cum_max = rv_cum
 
     def add_report(self, new_rpt):
-        """Adds a new report. If name exists, duplicates are not handled (overwrites dict key)."""
-        if new_rpt.name not in self.rpts_dict:
-            self.name_list.append(new_rpt.name)
-        self.rpts_dict[new_rpt.name] = new_rpt
+        """
+        Adds a new report to the end. If name exists, duplicates are not handled (overwrites dict key).
+
+        Returns:
+            int: Position of the report.
+        """
+        if new_rpt.name not in self._order:
+            return self.insert_report(len(self._order), new_rpt)
+        return self.replace_rpt(new_rpt)
+
+    def insert_report(self, pos, new_rpt):
+        """
+        Inserts a new report before position pos.
+
+        Returns:
+            int: Position of the report.
+        """
+        if new_rpt.name in self._order:
+            raise ValueError(f"{new_rpt.name} is already in the db")
+        pos = self._order.insert(pos, new_rpt.name)
+        self._names = None
+        self._store(new_rpt)
+        return pos
 
     def replace_rpt(self, new_rpt):
-        """Updates an existing report object."""
+        """
+        Updates an existing report object.
+
+        Returns:
+            int: Position of the report.
+        """
+        self._store(new_rpt)
+        return self._order.position(new_rpt.name)
+
+    def _store(self, new_rpt):
         self.rpts_dict[new_rpt.name] = new_rpt
+        if self._owned is not None:
+            self._owned.add(new_rpt.name)
+
+    def delete_report(self, name):
+        """
+        Removes a report.
+
+        Returns:
+            int: Position the report had.
+        """
+        pos = self._order.delete(name)
+        self._names = None
+        del self.rpts_dict[name]
+        if self._owned is not None:
+            self._owned.discard(name)
+        return pos
+
+    def move_report(self, name, new_pos):
+        """
+        Moves a report to new_pos (0 = processed first).
+
+        Returns:
+            int: Lowest position whose report changed.
+        """
+        old_pos = self._order.delete(name)
+        new_pos = self._order.insert(new_pos, name)
+        self._names = None
+        return min(old_pos, new_pos)
+
+    def get_position(self, name):
+        return self._order.position(name)
 
     def edit_report_sect_i(self, name, final_text):
         """Updates the generated narrative text."""
@@ -227,14 +833,28 @@ class ReportDB:
             self.rpts_dict[name].prompt["system"] = s_prompt
             self.rpts_dict[name].prompt["user"] = u_prompt
 
+    def reorder_reports(self, new_order):
+        """
+        Sets the processing order.  new_order must hold exactly the names already in the db.
+
+        Returns:
+            int: Lowest position whose report changed (the number of reports if none did).
+        """
+        if sorted(new_order) != sorted(self.name_list):
+            raise ValueError("New order must contain the same reports as the db")
+        first_changed = next((idx for idx, (old, new) in enumerate(zip(self.name_list, new_order)) if old != new),
+                             len(new_order))
+        self.name_list = new_order
+        return first_changed
+
     def get_report_by_name(self, name):
         return self.rpts_dict[name]
 
     def get_num_reports(self):
-        return len(self.name_list)
+        return len(self._order)
 
     def is_name_in_db(self, name):
-        return name in self.name_list
+        return name in self._order
 
     def increment_report_gen_counter(self, name):
         if name in self.rpts_dict:
@@ -246,6 +866,57 @@ class ReportDB:
             res_str += f"{self.rpts_dict[name]}\n\n"
         return res_str
 
+####################################################################################
+###############################  Report Columns ####################################
+####################################################################################
+# struct-of-arrays copy of the report db, for batch (vectorized) calculations
+class ReportColumns:
+    """
+    Columnar view of a ReportDB.
+
+    One row per report, in db order.  Marks are stored as an (n, 14) int8 matrix ('H' = 0), and the report
+    averages and RV results as float vectors.  Calculations fill the RV vectors, then write_to_db() copies them
+    back onto the Report objects.
+    """
+    def __init__(self, names, marks):
+        """
+        Args:
+            names (list): Report names, in processing order.
+            marks (array-like): (n, 14) matrix of mark values (1-7, 0 = 'H').
+        """
+        self.names = list(names)
+        self.marks = np.asarray(marks, dtype=np.int8).reshape(len(self.names), len(constants.USMC_CATEGORIES))
+
+        # 'H' marks don't count toward the report average
+        self.num_observed = np.count_nonzero(self.marks, axis=1)
+        self.mark_sums = self.marks.sum(axis=1, dtype=np.int64)
+        self.rpt_avgs = np.zeros(len(self.names))
+        np.divide(self.mark_sums, self.num_observed, out=self.rpt_avgs, where=self.num_observed > 0)
+
+        # min/max rvs
+        self.rv_proc_min = np.zeros(len(self.names))
+        self.rv_proc_max = np.zeros(len(self.names))
+        self.rv_cum_min = np.zeros(len(self.names))
+        self.rv_cum_max = np.zeros(len(self.names))
+
+    @classmethod
+    def from_db(cls, db):
+        """Builds the columns from the reports in a ReportDB."""
+        codes = np.fromiter((db.rpts_dict[name].packed_marks for name in db.name_list), dtype=np.uint64,
+                            count=db.get_num_reports())
+        return cls(db.name_list, decode_marks_array(codes))
+
+    def write_to_db(self, db):
+        """Copies the RV vectors onto the matching Report objects in db."""
+        for idx, name in enumerate(self.names):
+            db.set_rvs(name,
+                       rv_proc=(float(self.rv_proc_min[idx]), float(self.rv_proc_max[idx])),
+                       rv_cum=(float(self.rv_cum_min[idx]), float(self.rv_cum_max[idx])))
+
+    def __len__(self):
+        return len(self.names)
+
+
 ####################################################################################
 ########################  Config/Example Data class ################################
 ####################################################################################
@@ -0,0 +1,84 @@
+import copy
+from dataclasses import dataclass, field
+
+import src.app.models as models
+import src.app.calc_eng as calc_eng
+import src.app.constants as constants
+
+####################################################################################
+#############################  Multi-Rank Sessions  ################################
+####################################################################################
+# One profile and report db per rank, so an RS can work on several ranks (e.g. Sgts, SSgts and GySgts) in the
+# same session.  Ranks never share reports, and only the current rank is edited - the pages recalculate it as they
+# go - so a stored rank is always up to date and switching back to it needs no recalc.
+
+
+@dataclass
+class RankState:
+    """
+    Profile and reports of one rank.
+
+    Attributes:
+        original_profile (RankProfile): Profile as entered from the OMPF (or imported).
+        active_profile (RankProfile): Profile with the session's reports.
+        rpt_db (ReportDB): The session's reports for this rank.
+        engine (RVEngine): Incremental RV checkpoints for this rank.
+    """
+    original_profile: models.RankProfile
+    active_profile: models.RankProfile
+    rpt_db: models.ReportDB = field(default_factory=models.ReportDB)
+    engine: calc_eng.RVEngine = field(default_factory=calc_eng.RVEngine)
+
+
+class MultiRankSession:
+    """
+    Profiles and report dbs for every rank in a session, keyed by rank.
+    """
+    def __init__(self):
+        self.ranks = {}
+
+    def set_profile(self, orig_profile):
+        """
+        Starts (or restarts) a rank with a new original profile and no reports.
+
+        Returns:
+            RankState
+        """
+        if orig_profile.rank not in constants.USMC_RANKS:
+            raise ValueError(f"Unknown rank '{orig_profile.rank}'. Allowed: {constants.USMC_RANKS}")
+        active = copy.copy(orig_profile)
+        active.label = "Active"
+        state = RankState(orig_profile, active)     # no reports - active == original
+        self.ranks[orig_profile.rank] = state
+        return state
+
+    def get(self, rank):
+        """RankState of a rank, or None."""
+        return self.ranks.get(rank)
+
+    def remove(self, rank):
+        self.ranks.pop(rank, None)
+
+    def set_state(self, rank, rpt_db=None, active_profile=None, engine=None):
+        """
+        Stores a rank's current db / active profile / engine (e.g. after the UI saved a report).  They should
+        already be recalculated - the session doesn't recalc.
+        """
+        state = self.ranks[rank]
+        if rpt_db is not None:
+            state.rpt_db = rpt_db
+        if active_profile is not None:
+            state.active_profile = active_profile
+        if engine is not None:
+            state.engine = engine
+
+    @property
+    def rank_list(self):
+        """Ranks in the session, in USMC_RANKS order."""
+        return [rank for rank in constants.USMC_RANKS if rank in self.ranks]
+
+    def __contains__(self, rank):
+        return rank in self.ranks
+
+    def __len__(self):
+        return len(self.ranks)
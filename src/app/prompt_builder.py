@@ -1,3 +1,4 @@
+import hashlib
 import random
 import src.app.constants as constants
 import src.app.prompt_templates as templates
@@ -37,13 +38,13 @@ def _get_tier_config(rv):
         }
 
 
-def _get_random_recs(recs, key):
+def _get_random_recs(recs, key, rng=random):
     """Helper to safely fetch a random promotion and assignment recommendation."""
     pool = recs.get(key, {})
 
     def pick(cat):
         opts = pool.get(cat, [""])
-        choice = random.choice(opts)
+        choice = rng.choice(opts)
         # If the config says "none" (e.g. for low performers), return empty string
         return "" if "none" in choice.lower() else choice
 
@@ -52,7 +53,19 @@ def _get_random_recs(recs, key):
 
 # --- Public Methods ---
 
-def build_foundation_prompt(example_data, rpt):
+def prompt_rng(rpt):
+    """
+    Random generator seeded from the report's inputs (rank, name, marks, billet, accomplishments, context).
+    Same inputs -> same examples and recommendations -> same prompt, so the LLM response cache can hit.
+    The generation count is mixed in too, so a regeneration (e.g. after Reset Lock) gets a new prompt and a new
+    response instead of the cached one.
+    """
+    key = (f"{rpt.rank}|{rpt.name}|{rpt.packed_marks}|{rpt.billet}|{rpt.accomplishments}|{rpt.context}|"
+           f"{rpt.secti_gens}")
+    return random.Random(int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big"))
+
+
+def build_foundation_prompt(example_data, rpt, rng=random):
     """
     Constructs a complex System/User prompt pair for Foundation Models (GPT-4o).
     """
@@ -63,8 +76,8 @@ def build_foundation_prompt(example_data, rpt):
 
     # Select dynamic content
     tier_examples = examples.get(config['key'], [])
-    example_text = random.choice(tier_examples)['section_i'] if tier_examples else "No example provided."
-    prom_rec, assign_rec = _get_random_recs(recs, config['key'])
+    example_text = rng.choice(tier_examples)['section_i'] if tier_examples else "No example provided."
+    prom_rec, assign_rec = _get_random_recs(recs, config['key'], rng)
 
     s_prompt = (f"""You are a United States Marine Reporting Senior writing Section I comments for a fitness report.
 
@@ -99,7 +112,7 @@ MANDATORY ENDING: {prom_rec} {assign_rec}
     return s_prompt, u_prompt
 
 
-def build_open_weights_prompt(example_data, rpt):
+def build_open_weights_prompt(example_data, rpt, rng=random):
     """
     Constructs a System/User prompt pair for high-end Open Weight models
     (Qwen 72B, Mixtral 8x7B, Llama 3 70B).
@@ -114,8 +127,8 @@ def build_open_weights_prompt(example_data, rpt):
 
     # 1. Select dynamic content
     tier_examples = examples.get(config['key'], [])
-    example_text = random.choice(tier_examples)['section_i'] if tier_examples else "No example provided."
-    prom_rec, assign_rec = _get_random_recs(recs, config['key'])
+    example_text = rng.choice(tier_examples)['section_i'] if tier_examples else "No example provided."
+    prom_rec, assign_rec = _get_random_recs(recs, config['key'], rng)
 
     # 2. System Prompt: Role & Rules
     # slightly adjusted for Qwen/Mixtral which prefer very explicit formatting rules
@@ -150,7 +163,7 @@ def build_open_weights_prompt(example_data, rpt):
     return s_prompt, u_prompt
 
 
-def build_local_prompt(example_data, rpt):
+def build_local_prompt(example_data, rpt, rng=random):
     """
     Constructs a single simplified prompt string for Local Models (Mistral/Llama).
     """
@@ -159,7 +172,7 @@ def build_local_prompt(example_data, rpt):
     config = _get_tier_config(rpt.rv_cum_min)
 
     tier_examples = examples.get(config['key'], [])
-    example_text = random.choice(tier_examples)['section_i'] if tier_examples else ""
+    example_text = rng.choice(tier_examples)['section_i'] if tier_examples else ""
 
     user_context = rpt.context if rpt.context else "No additional context"
     return (
@@ -12,7 +12,9 @@ if str(root_path) not in sys.path:
     sys.path.append(str(root_path))
 
 import src.app.models as models
+import src.app.calc_eng as calc_eng
 import src.app.constants as constants
+import src.app.multi_rank as multi_rank
 import gui_profile
 import gui_reports
 import gui_narratives
@@ -87,10 +89,20 @@ def initializations():
         'original_profile': None,
         'active_profile': None,
         'rpt_db': models.ReportDB(),
+        'rv_engine': calc_eng.RVEngine(),   # incremental RV checkpoints, reused across reruns
+        'rv_lattice': None,                 # RV of every possible rpt avg vs the active profile
+        'history': None,                    # saved scenarios (history.SessionHistory)
+        'rank_session': multi_rank.MultiRankSession(),  # profile + reports of every rank in the session
 
         # Report Editing State
         'previous_name': None,
         'save_rpt_msg': None,
+        'bulk_import_errors': None,         # rows the last bulk import skipped
+        'quick_marks': "",                  # quick-entry mark string, e.g. "CC CCC CCCCC CCC H"
+        'quick_marks_error': None,
+        'attr_form_mode': False,            # attribute grid only recalcs on submit
+        'suggested_order': None,
+        'suggested_order_exact': True,      # False if the optimizer couldn't rule out a better order
 
         # Real-time/Shadow States (For "What-If" calculations)
         'display_rpt': None,
@@ -105,6 +117,9 @@ def initializations():
         'narrative_context': None,
         'narrative_final_text': None,
         'narratives_gen_complete': None,
+        'llm_cache_refresh': None,          # report whose next generation skips the LLM response cache
+        'gen_metrics': None,                # (time to first token, tokens/sec) of the last generation
+        'bulk_gen_errors': None,            # reports the last Generate All couldn't generate
 
         # Trigger Keys (Buttons)
         'reset_narrative': None,
@@ -135,6 +150,7 @@ def main():
     """
 
     initializations()
+    gui_profile.sync_rank_session()
 
     render_header()
 
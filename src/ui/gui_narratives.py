@@ -15,6 +15,8 @@ if str(root_path) not in sys.path:
 import src.app.models as models
 import src.app.calc_eng as calc_eng
 import src.app.constants as constants
+import src.app.llm_cache as llm_cache
+import sqlite3
 
 ####################################################################################
 ######################  Load and Cache Examples  ###################################
@@ -23,6 +25,15 @@ import src.app.constants as constants
 def get_cached_data():
     return models.ExampleData()
 
+
+@st.cache_resource
+def get_llm_cache():
+    """Shared LLM response cache.  None if the cache file can't be opened - generation still works without it."""
+    try:
+        return llm_cache.LLMCache()
+    except (OSError, sqlite3.Error):
+        return None
+
 ####################################################################################
 ######################  Navigation and Rpt Summary  ################################
 ####################################################################################
@@ -95,10 +106,11 @@ def render_rpt_data():
 ############################  Narrative Inputs  ####################################
 ####################################################################################
 
-def get_input_hash(name, rank, scores, billet, accomplishments, context, model_option):
+def get_input_hash(name, rank, marks_code, billet, accomplishments, context, model_option):
     """Generates a unique signature for the current set of inputs.
-    Prevents multiple LLM generations in a row for the same data"""
-    combined_string = f"{name}|{rank}|{str(sorted(scores.items()))}|{billet}|{accomplishments}|{context}|{model_option}"
+    Prevents multiple LLM generations in a row for the same data.
+    marks_code is the packed marks int (Report.packed_marks / models.encode_scores)."""
+    combined_string = f"{name}|{rank}|{marks_code}|{billet}|{accomplishments}|{context}|{model_option}"
     # Generate a unique MD5 hex digest
     return hashlib.md5(combined_string.encode()).hexdigest()
 
@@ -220,14 +232,14 @@ def render_generation_section(curr_rpt, data_saved, billet, accomplishments, use
     if enable_open:
         for name in constants.OPEN_WEIGHT_MODELS:
             options.append(f"Open: {name}")
-    if enable_local and constants.OLLAMA_PATH:
+    if enable_local:    # server API or CLI - calc_eng.query_local reports if neither is there
         for name in constants.LOCAL_MODELS:
             options.append(f"Local: {name}")
 
     model_option = st.selectbox("Choose your LLM:", options=options, disabled=not data_saved)
 
     # check current
-    current_hash = get_input_hash(curr_rpt.name, curr_rpt.rank, curr_rpt.get_letter_scores(), billet,
+    current_hash = get_input_hash(curr_rpt.name, curr_rpt.rank, curr_rpt.packed_marks, billet,
                                   accomplishments, user_context, model_option)
     fresh_data = current_hash != getattr(curr_rpt, 'last_gen_hash', None)  #if model_option != 'Manual Input' else True
 
@@ -254,6 +266,7 @@ def render_generation_section(curr_rpt, data_saved, billet, accomplishments, use
         # The 'Try Again' Reset
         if st.button("Reset Lock", help="Allow regeneration with same inputs", disabled=not data_saved or fresh_data or exceeded_max_gens):
             curr_rpt.last_gen_hash = None
+            st.session_state.llm_cache_refresh = curr_rpt.name    # user wants a new response, not the cached one
             st.rerun()
 
     if generate_btn:  # st.button("Generate Sect I", type="primary"):
@@ -270,38 +283,51 @@ def render_generation_section(curr_rpt, data_saved, billet, accomplishments, use
     elif not fresh_data:
         st.caption(":orange[Section I already generated for these inputs. Change something to regenerate, or hit Reset to unlock.]")  # st.info("Section I already generated for these inputs. Change something to regenerate, or hit Reset to unlock.")
 
+    render_batch_generation(model_option, max_generations)
+
 
 def _handle_llm_generation(curr_rpt, model_option, current_hash):
-    """Internal helper to wrap API calls with error handling."""
+    """Internal helper to wrap API calls with error handling.  The text is streamed onto the page as it's produced."""
     example_data = get_cached_data()
-    model_name = model_option.split(":")[1].strip() if ":" in model_option else None
+    provider, model_cfg = _model_for_option(model_option)
+    cache = get_llm_cache()
+    # local has no lock or limit, so Generate with the same inputs means "another draft" - never the cached one
+    refresh = provider == "local" or st.session_state.llm_cache_refresh == curr_rpt.name
+    metrics = None
 
     try:
-        with st.spinner(f"Generating with {model_option}..."):
-            # Map the selection to your LLM clients
-            if "Local" in model_option:
-                # No gen counter or hash lock - local inference is free and unlimited
-                result, model, p_tokens, c_tokens = calc_eng.query_local(curr_rpt, example_data, model=constants.LOCAL_MODELS[model_name])
-
-            elif "Frontier" in model_option:
-                result, model, p_tokens, c_tokens = calc_eng.query_foundation(curr_rpt, example_data, model=constants.FRONTIER_MODELS[model_name])
-                st.session_state.rpt_db.increment_report_gen_counter(curr_rpt.name)
-                curr_rpt.last_gen_hash = current_hash
-
-            elif "Open" in model_option:
-                result, model, p_tokens, c_tokens = calc_eng.query_open(curr_rpt, example_data, model=constants.OPEN_WEIGHT_MODELS[model_name])
-                st.session_state.rpt_db.increment_report_gen_counter(curr_rpt.name)
+        if provider is None:
+            # placeholder - plan to add library of phrases to populate sect i on manual mode
+            result, model, p_tokens, c_tokens = calc_eng.query_manual()
+
+        else:
+            try:
+                llm_stream = calc_eng.query_stream(curr_rpt, example_data, provider, model_cfg, cache=cache,
+                                                   refresh=refresh)
+                st.write_stream(llm_stream)
+                response = llm_stream.response
+                result, model = response.text.strip(), response.model
+                p_tokens, c_tokens = response.prompt_tokens, response.completion_tokens
+                metrics = (response.ttft, response.tokens_per_sec)
+                from_cache = response.cached
+            except Exception as e:
+                result, model, p_tokens, c_tokens = calc_eng.query_error(provider, e), "Error", None, None
+                from_cache = False
+
+            if provider != "local":
+                # No gen counter or hash lock for local - local inference is free and unlimited
+                # A cache hit locks the inputs but isn't a generation - nothing was generated or paid for
+                if not from_cache:
+                    st.session_state.rpt_db.increment_report_gen_counter(curr_rpt.name)
                 curr_rpt.last_gen_hash = current_hash
 
-            else:
-                # placeholder - plan to add library of phrases to populate sect i on manual mode
-                result, model, p_tokens, c_tokens = calc_eng.query_manual()
-
-            # Accumulate token usage on the report
-            curr_rpt.prompt_tokens += (p_tokens or 0)
-            curr_rpt.completion_tokens += (c_tokens or 0)
+        # Accumulate token usage on the report
+        curr_rpt.prompt_tokens += (p_tokens or 0)
+        curr_rpt.completion_tokens += (c_tokens or 0)
 
+        st.session_state.llm_cache_refresh = None
         st.session_state['output'] = (result, model)
+        st.session_state.gen_metrics = metrics
         st.session_state.narratives_gen_complete = True
         st.rerun()
 
@@ -309,6 +335,90 @@ def _handle_llm_generation(curr_rpt, model_option, current_hash):
         st.error(f"Generation Failed: {str(e)}")
 
 
+def _metrics_caption(metrics):
+    """' - first token 0.8s, 45 tokens/sec' for the last streamed generation ('' if not measured)."""
+    if not metrics or metrics[0] is None:
+        return ""
+    ttft, tokens_per_sec = metrics
+    rate = f", {tokens_per_sec:.0f} tokens/sec" if tokens_per_sec else ""
+    return f" - first token {ttft:.1f}s{rate}"
+
+
+def _model_for_option(model_option):
+    """(provider, model config) of a dropdown option, or (None, None) for Manual Input."""
+    model_name = model_option.split(":")[1].strip() if ":" in model_option else None
+    if "Local" in model_option:
+        return "local", constants.LOCAL_MODELS[model_name]
+    if "Frontier" in model_option:
+        return "foundation", constants.FRONTIER_MODELS[model_name]
+    if "Open" in model_option:
+        return "open", constants.OPEN_WEIGHT_MODELS[model_name]
+    return None, None
+
+
+def _batch_rpts(model_option, max_generations):
+    """Reports with saved inputs that can still be generated - same locks as the single Generate button."""
+    rpts = []
+    for name in st.session_state.rpt_db.name_list:
+        rpt = st.session_state.rpt_db.get_report_by_name(name)
+        if rpt.accomplishments == "":
+            continue
+        if "Local" not in model_option:
+            input_hash = get_input_hash(rpt.name, rpt.rank, rpt.packed_marks, rpt.billet, rpt.accomplishments,
+                                        rpt.context, model_option)
+            if rpt.secti_gens >= max_generations or input_hash == rpt.last_gen_hash:
+                continue
+        rpts.append(rpt)
+    return rpts
+
+
+def render_batch_generation(model_option, max_generations):
+    """
+    Generates Section I for every report with saved inputs at once (calc_eng.generate_batch).
+    Each result is saved into its report as soon as it arrives.
+    """
+    provider, model = _model_for_option(model_option)
+    rpts = _batch_rpts(model_option, max_generations) if provider else []
+
+    with st.expander("Generate All"):
+        st.caption(f"Generates Section I with {model_option} for every report with saved inputs "
+                   f"({len(rpts)} ready), up to {constants.BATCH_MAX_CONCURRENCY} at a time.  "
+                   f"Overwrites their current Section I.")
+        if st.session_state.bulk_gen_errors:
+            st.error("Some reports failed:\n\n" + "\n\n".join(st.session_state.bulk_gen_errors))
+        if not st.button("Generate All", disabled=not rpts):
+            return
+
+        progress = st.progress(0., text="Generating...")
+        errors = []
+        done = []
+
+        def _on_result(name, result):
+            text, model_used, p_tokens, c_tokens = result
+            if model_used == "Error":
+                errors.append(f"{name}: {text}")
+            else:
+                rpt = st.session_state.rpt_db.get_report_by_name(name)
+                st.session_state.rpt_db.edit_report_sect_i(name, text)
+                rpt.prompt_tokens += (p_tokens or 0)
+                rpt.completion_tokens += (c_tokens or 0)
+                if provider != "local":
+                    # No gen counter or hash lock - local inference is free and unlimited
+                    st.session_state.rpt_db.increment_report_gen_counter(name)
+                    rpt.last_gen_hash = get_input_hash(rpt.name, rpt.rank, rpt.packed_marks, rpt.billet,
+                                                       rpt.accomplishments, rpt.context, model_option)
+            done.append(name)
+            progress.progress(len(done) / len(rpts), text=f"{len(done)} / {len(rpts)} done - {name}")
+
+        # local runs are unlimited and meant to give new drafts, so they skip the response cache
+        cache = get_llm_cache() if provider != "local" else None
+        calc_eng.generate_batch(rpts, get_cached_data(), provider, model, cache=cache, on_result=_on_result)
+
+        st.session_state.bulk_gen_errors = errors
+        st.session_state.reset_secti = True     # show the new text if the displayed report was generated
+        st.rerun()
+
+
 ####################################################################################
 ############################  Review Section  ######################################
 ####################################################################################
@@ -316,7 +426,8 @@ def _handle_llm_generation(curr_rpt, model_option, current_hash):
 def render_review_section(curr_rpt, changed_names, data_saved):
     """Renders review final text section."""
     if st.session_state.narratives_gen_complete:
-        st.success(f"Generation Complete!  Model used: {st.session_state['output'][1]}")
+        st.success(f"Generation Complete!  Model used: {st.session_state['output'][1]}"
+                   f"{_metrics_caption(st.session_state.gen_metrics)}")
         st.session_state.narratives_gen_complete = False
         st.session_state.narrative_final_text = st.session_state['output'][0]
 
@@ -11,6 +11,7 @@ if str(root_path) not in sys.path:
 import src.app.models as models
 import src.app.calc_eng as calc_eng
 import src.app.constants as constants
+import src.app.importer as importer
 
 
 ####################################################################################
@@ -62,6 +63,43 @@ def _get_correct_avg(unrounded_high, unrounded_low, avg, count):
     if count == 2: return (unrounded_low + unrounded_high) / 2
     return avg
 
+def sync_rank_session():
+    """
+    Stores the current rank's profile and reports (the pages replace them when saving) back into the multi-rank
+    session.
+    """
+    session = st.session_state.rank_session
+    prof = st.session_state.active_profile
+    if prof and prof.rank in session:
+        session.set_state(prof.rank, st.session_state.rpt_db, prof, st.session_state.rv_engine)
+
+
+def load_rank(rank, sync=True):
+    """
+    Makes rank the current one - the pages work on its profile and reports.  Can be used as a callback.
+    The current rank is stored back into the session first, unless sync is False.
+    """
+    if sync:
+        sync_rank_session()
+    state = st.session_state.rank_session.get(rank)
+    st.session_state.original_profile = state.original_profile
+    st.session_state.active_profile = state.active_profile
+    st.session_state.rpt_db = state.rpt_db
+    st.session_state.rv_engine = state.engine
+    st.session_state.history = None     # scenarios are per rank
+    st.session_state.suggested_order = None
+    st.session_state.display_rpt = None
+    st.session_state.display_profile = None
+    st.session_state.display_db = None
+
+
+def _start_rank(orig_profile):
+    """Adds (or restarts) the profile's rank in the session, with no reports, and makes it the current rank."""
+    sync_rank_session()
+    st.session_state.rank_session.set_profile(orig_profile)
+    load_rank(orig_profile.rank, sync=False)    # don't let the old state of this rank overwrite the new one
+
+
 def run_profile_page():
     """
     Renders the Profile Configuration Page.
@@ -89,12 +127,75 @@ def run_profile_page():
     if not is_valid:
         st.error(error_msg)
 
+    # OMPF rounding can hide which rpt average is the real high/low - let the user know which one we use
+    for label, val in (("High", high), ("Low", low)):
+        candidates = calc_eng.unround_candidates(val)
+        if len(candidates) > 1:
+            options = ", ".join(f"{cand:.4f}" for cand in candidates)
+            st.caption(f"Profile {label} {val:.2f} could be any of {options} - using {calc_eng.unround_score(val):.4f}")
+
     if st.button("Save Profile", type='primary', disabled=not is_valid):
         unrounded_high = calc_eng.unround_score(high)
         unrounded_low = calc_eng.unround_score(low)
         real_avg = _get_correct_avg(unrounded_high, unrounded_low, avg, num_reports)
-        st.session_state.original_profile = models.RankProfile("Original", rank, unrounded_high, unrounded_low, real_avg, num_reports)
-        st.session_state.active_profile = models.RankProfile("Active", rank, unrounded_high, unrounded_low, real_avg, num_reports)
+        low_avg, high_avg = calc_eng.infer_avg_bounds(high, low, real_avg, num_reports)
+        _start_rank(models.RankProfile("Original", rank, unrounded_high, unrounded_low, real_avg, num_reports,
+                                       low_avg=low_avg, high_avg=high_avg))
         st.session_state.page = 'reports'
         st.rerun()
     st.caption("Save profile to add reports - profile will be locked while entering reports")
+    if rank in st.session_state.rank_session:
+        st.caption(f"Saving replaces the {rank} profile and reports already in this session")
+        # the OMPF avg is rounded too - show how much of the rounding the saved profile rules out (worked out on
+        # Save, not on every rerun)
+        saved = st.session_state.rank_session.get(rank).original_profile
+        if saved.num_rpts >= 3:
+            st.caption(f"Saved {rank} profile avg is between {saved.low_avg:.4f} and {saved.high_avg:.4f}")
+
+    render_history_import(rank)
+    render_saved_ranks()
+
+
+def render_saved_ranks():
+    """Lets the user go back to a rank already in the session."""
+    session = st.session_state.rank_session
+    if not len(session):
+        return
+    with st.container(border=True):
+        st.markdown("**Ranks in this session**")
+        c1, c2 = st.columns([3, 1])
+        rank = c1.selectbox("Rank", session.rank_list, key='saved_rank', label_visibility="collapsed",
+                            format_func=lambda r: f"{r} ({session.get(r).rpt_db.get_num_reports()} reports)")
+        if c2.button("Open", use_container_width=True):
+            load_rank(rank)
+            st.session_state.page = 'reports'
+            st.rerun()
+
+
+def render_history_import(rank):
+    """
+    Builds the original profile from the RS's per-report history file instead of the rounded OMPF values.
+    """
+    with st.expander("Import Profile from Report History"):
+        st.caption("CSV (with a header) or JSON lines, one row per report: the 14 category marks (or a 'scores' "
+                   "column like 'CC CCC CCCCC CCC H'), or the unrounded rpt 'avg'.  Rows with a different 'rank' "
+                   "are skipped.  High, low and avg are calculated exactly - no OMPF rounding.")
+        upload = st.file_uploader("History file", type=["csv", "jsonl", "json", "ndjson"], key='history_upload')
+
+        if st.button("Import Profile", disabled=upload is None):
+            try:
+                res = importer.import_history(upload, rank)
+            except (ValueError, UnicodeDecodeError) as e:
+                st.error(f"Couldn't read file: {e}")
+                return
+
+            if res.num_errors:
+                st.warning(f"{res.num_errors} rows couldn't be read:")
+                st.text("\n".join(f"Line {line}: {msg}" for line, msg in res.errors))
+            if not res.profile.num_rpts:
+                st.error(f"No {rank} reports found in file.")
+                return
+
+            _start_rank(res.profile)
+            st.session_state.page = 'reports'
+            st.rerun()
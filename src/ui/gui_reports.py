@@ -1,6 +1,7 @@
 import copy
 
 import streamlit as st
+import pandas as pd
 from pathlib import Path
 import sys
 
@@ -13,6 +14,10 @@ if str(root_path) not in sys.path:
 import src.app.models as models
 import src.app.calc_eng as calc_eng
 import src.app.constants as constants
+import src.app.forecast as forecast
+import src.app.history as history
+import src.app.importer as importer
+import gui_profile
 
 
 ####################################################################################
@@ -42,10 +47,211 @@ def load_mro_data():
         # Load scores into the session keys that control the widgets
         for cat, score in rpt_scores.items():
             st.session_state[f"btn_{cat}"] = score
+        st.session_state.quick_marks = report.scores_as_str()
         st.toast(f"Loaded existing data for {new_name}")
     else:
         # Reset to defaults for a new entry
         reset_attribute_buttons()
+        st.session_state.quick_marks = ""
+
+
+def apply_quick_marks():
+    """
+    Callback - parses the quick-entry mark string into all 14 attribute buttons at once, so entering a report
+    takes one rerun instead of one per attribute.
+    """
+    text = st.session_state.quick_marks
+    if not text.strip():
+        return
+    try:
+        scores = models.parse_scores_str(text)
+    except ValueError as e:
+        st.session_state.quick_marks_error = f"{e} - format is 'CC CCC CCCCC CCC H'"
+        return
+    for cat, score in scores.items():
+        st.session_state[f"btn_{cat}"] = score
+
+
+def apply_suggested_marks(scores):
+    """Callback - loads a target RV suggestion into the attribute buttons."""
+    for cat, score in scores.items():
+        st.session_state[f"btn_{cat}"] = score
+    st.session_state.quick_marks = ""
+
+
+def render_rv_solver(current_scores):
+    """
+    Suggests the fewest mark changes that reach a target RV.
+    Only used for new reports - the lattice is built from the active profile, which already holds saved reports.
+    """
+    with st.expander("Find marks for a target RV"):
+        c1, c2 = st.columns(2)
+        with c1:
+            target = st.number_input("Target min. RV", key='solver_target', min_value=80.0, max_value=100.0,
+                                     value=constants.TIER_MIDDLE, step=0.01)
+        with c2:
+            keep_high = st.checkbox("Don't raise my profile high", key='solver_keep_high', value=True)
+
+        lattice = calc_eng.get_rv_lattice(st.session_state.active_profile, st.session_state.get('rv_lattice'))
+        st.session_state.rv_lattice = lattice
+        results = calc_eng.solve_for_rv(lattice, current_scores, target, keep_high=keep_high, limit=5)
+
+        if not results:
+            st.caption(":red[No set of marks reaches this RV]")
+            return
+
+        for idx, res in enumerate(results):
+            changes = ", ".join(f"{cat}: {current_scores[cat]} → {score}"
+                                for cat, score in res['scores'].items() if score != current_scores[cat])
+            row_text, row_button = st.columns([4, 1])
+            row_text.markdown(f"**RV {res['rv_min']:.2f}** (Avg {res['rpt_avg']:.2f}) - {changes or 'No changes needed'}")
+            row_button.button("Apply", key=f"solver_apply_{idx}", on_click=apply_suggested_marks,
+                              args=(res['scores'],), disabled=res['changes'] == 0)
+
+
+def render_order_optimizer():
+    """Suggests a processing order for the saved reports that raises RV Proc."""
+    db = st.session_state.rpt_db
+    if db.get_num_reports() < 2:
+        return
+
+    with st.expander("Optimize processing order"):
+        st.caption("RV Proc depends on the order reports are processed.  RV Cum is not affected.")
+        goals = {"total": "Highest total RV Proc", "balance": "Raise the lowest RV Proc"}
+        objective = st.radio("Goal", list(goals), format_func=goals.get, horizontal=True, key='order_objective')
+
+        if st.button("Find best order"):
+            order, _, exact = calc_eng.optimize_order(st.session_state.original_profile, db, objective)
+            st.session_state.suggested_order = order
+            st.session_state.suggested_order_exact = exact
+
+        # manual move - reports before the lowest moved position keep their RV Proc
+        c1, c2, c3 = st.columns([2, 1, 1])
+        move_name = c1.selectbox("Move report", db.name_list, key='move_rpt_name')
+        move_pos = c2.number_input("To position", key='move_rpt_pos', min_value=1, max_value=db.get_num_reports(),
+                                   value=db.get_position(move_name) + 1, step=1)
+        if c3.button("Move", disabled=move_pos == db.get_position(move_name) + 1):
+            db.move_report(move_name, int(move_pos) - 1)
+            calc_eng.recalc_db(db, st.session_state.original_profile, st.session_state.active_profile,
+                               engine=st.session_state.rv_engine)
+            st.rerun()
+
+        order = st.session_state.suggested_order
+        if order and sorted(order) == sorted(db.name_list):
+            st.write(" → ".join(order))
+            if st.session_state.suggested_order_exact:
+                st.caption(":green[Best possible order - every other order was ruled out.]")
+            else:
+                st.caption(":orange[Approximate - too many reports to rule out every other order. "
+                           "This is the best order found, and never worse than the entered or sorted orders.]")
+            if st.button("Apply order", disabled=order == db.name_list):
+                db.reorder_reports(order)
+                calc_eng.recalc_db(db, st.session_state.original_profile, st.session_state.active_profile,
+                                   engine=st.session_state.rv_engine)
+                st.session_state.suggested_order = None
+                st.rerun()
+
+
+def render_forecast():
+    """Monte Carlo forecast of how the saved reports' RV Cum may drift over future reporting periods."""
+    db = st.session_state.rpt_db
+    if db.get_num_reports() < 1:
+        return
+
+    with st.expander("Forecast RV Cum drift"):
+        st.caption("Simulates future reports drawn from your own report history. Same seed = same results.")
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            periods = st.number_input("Reporting periods", key='fc_periods', min_value=1, max_value=20, value=4)
+        with c2:
+            per_period = st.number_input("Reports per period", key='fc_per_period', min_value=1, max_value=50, value=3)
+        with c3:
+            seed = st.number_input("Seed", key='fc_seed', min_value=0, value=0, step=1)
+
+        if st.button("Run forecast"):
+            with st.spinner("Simulating..."):
+                res = forecast.forecast_rv_cum(st.session_state.active_profile, db, periods=int(periods),
+                                               rpts_per_period=int(per_period), seed=int(seed))
+            rows = []
+            for name in res.names:
+                band = res.band(name)
+                rows.append({"MRO": name,
+                             "RV Cum Now": db.get_report_by_name(name).rv_cum_min,
+                             "5%": band[5], "Median": band[50], "95%": band[95]})
+            df = pd.DataFrame(rows).set_index("MRO")
+            st.table(df.style.format("{:.2f}"))
+            st.caption(f"Min. RV Cum after {int(periods)} periods")
+
+
+def render_scenarios():
+    """Save the saved reports as named scenarios, compare any two, and roll back."""
+    orig = st.session_state.original_profile
+    hist = st.session_state.history
+    if hist is None or hist.orig_profile.get_state() != orig.get_state():
+        hist = st.session_state.history = history.SessionHistory(orig)
+
+    with st.expander("Scenarios"):
+        st.caption("Save the current reports as a scenario, try changes, then compare or roll back.")
+        c1, c2 = st.columns([3, 1])
+        label = c1.text_input("Scenario name", key='scenario_label', placeholder="e.g. SMITH gets an F in Initiative")
+        if c2.button("Save scenario", disabled=st.session_state.rpt_db.get_num_reports() == 0):
+            hist.commit(st.session_state.rpt_db, label or f"Scenario {len(hist) + 1}")
+
+        if not len(hist):
+            return
+
+        labels = {ver.version_id: f"{ver.version_id + 1}. {ver.label}" for ver in hist.versions}
+        c1, c2 = st.columns(2)
+        ver_a = c1.selectbox("Compare", list(labels), format_func=labels.get, key='scenario_a')
+        ver_b = c2.selectbox("With", list(labels), format_func=labels.get, index=len(labels) - 1, key='scenario_b')
+
+        changes = hist.diff(ver_a, ver_b)
+        if changes:
+            rows = [{"MRO": name, "RV Proc (A)": vals["rv_proc_min"][0], "RV Proc (B)": vals["rv_proc_min"][1],
+                     "RV Cum (A)": vals["rv_cum_min"][0], "RV Cum (B)": vals["rv_cum_min"][1]}
+                    for name, vals in changes.items()]
+            st.table(pd.DataFrame(rows).set_index("MRO").style.format("{:.2f}", na_rep="-"))
+        else:
+            st.caption("No RV changes between these scenarios.")
+
+        if st.button(f"Roll back to {labels[ver_a]}"):
+            db, prof = hist.checkout(ver_a)
+            st.session_state.rpt_db = db   # still a shadow, so later edits never reach the saved scenario
+            st.session_state.active_profile = prof
+            st.session_state.rv_engine = calc_eng.RVEngine()
+            st.rerun()
+
+
+def render_bulk_import():
+    """Adds many reports at once from a pasted block or a CSV, with one recalculation."""
+    with st.expander("Bulk Import Reports"):
+        st.caption("One report per line: name, then marks in the FitRep block format, e.g. 'SMITH, CC CCC CCCCC CCC H'.  "
+                   "Or upload a CSV with a 'name' column and a 'scores' column (or the 14 attribute columns).  "
+                   "Existing names are updated.")
+        pasted = st.text_area("Reports", key='bulk_text', placeholder="SMITH, CC CCC CCCCC CCC H\nJONES, DD DDD DDDDD DDD H")
+        upload = st.file_uploader("Or upload CSV", type=["csv"], key='bulk_upload')
+
+        if st.button("Import Reports", disabled=not (pasted.strip() or upload)):
+            rows = importer.read_report_rows(upload if upload is not None else pasted)
+            new_db = st.session_state.rpt_db.shadow()
+            new_prof = copy.copy(st.session_state.active_profile)
+            results = calc_eng.add_reports_batch(new_db, st.session_state.original_profile, new_prof,
+                                                 new_prof.rank, rows, engine=st.session_state.rv_engine)
+
+            num_added = sum(success for _, success in results)
+            if num_added:
+                st.session_state.rpt_db = new_db.commit()
+                st.session_state.active_profile = new_prof
+            st.session_state.bulk_import_errors = [f"Row {idx + 1} ({name or 'no name'}): {msg}"
+                                                   for idx, ((name, _), (msg, success)) in enumerate(zip(rows, results))
+                                                   if not success]
+            st.session_state.save_rpt_msg = f"{num_added} reports imported"
+            st.rerun()
+
+        if st.session_state.bulk_import_errors:
+            st.warning(f"{len(st.session_state.bulk_import_errors)} rows not imported:")
+            st.text("\n".join(st.session_state.bulk_import_errors))
+            st.session_state.bulk_import_errors = None
 
 
 def render_navigation():
@@ -58,16 +264,20 @@ def render_navigation():
 
     with c2:
         if st.button("◀ Reset Profile", use_container_width=True, help="This will erase all reports and re-set the profile"):
+            if st.session_state.active_profile:
+                st.session_state.rank_session.remove(st.session_state.active_profile.rank)
             st.session_state.original_profile = None
             st.session_state.active_profile = None
             st.session_state.rpt_db = models.ReportDB()
+            st.session_state.rv_engine = calc_eng.RVEngine()
+            st.session_state.history = None
             st.session_state.page = 'profile'
             st.rerun()
 
     with c3:
         if st.button("Generate Section I's ▶", type='primary', use_container_width=True, disabled=not has_reports):
-            new_db = copy.deepcopy(st.session_state.rpt_db)
-            new_prof = copy.deepcopy(st.session_state.active_profile)
+            new_db = st.session_state.rpt_db.shadow()
+            new_prof = copy.copy(st.session_state.active_profile)
             st.session_state.display_db = new_db
             st.session_state.display_profile = new_prof
             st.session_state.page = 'narratives'
@@ -76,6 +286,28 @@ def render_navigation():
     with c4:
         if not has_reports:
             st.warning("Save reports to unlock Sect I generation")
+        render_rank_switcher()
+
+
+def _switch_rank():
+    """Callback for the rank switcher."""
+    gui_profile.load_rank(st.session_state.current_rank)
+    st.session_state.reports_name = ""
+    st.session_state.quick_marks = ""
+    reset_attribute_buttons()
+
+
+def render_rank_switcher():
+    """Switch between the ranks in the session, or add another rank's profile."""
+    session = st.session_state.rank_session
+    c1, c2 = st.columns([2, 1])
+    if len(session) > 1 and st.session_state.active_profile:
+        st.session_state.current_rank = st.session_state.active_profile.rank
+        c1.selectbox("Rank", session.rank_list, key='current_rank', on_change=_switch_rank,
+                     label_visibility="collapsed")
+    if c2.button("+ Add Rank", use_container_width=True, help="Enter another rank's profile - this rank's reports are kept"):
+        st.session_state.page = 'profile'
+        st.rerun()
 
 
 def run_reports_page():
@@ -115,29 +347,47 @@ def run_reports_page():
     st.caption(
         "Mark based on descriptions on the FitRep, do NOT mark to your profile.  Use this for validation and refinement only.")
 
+    # Quick entry - all 14 marks in one field, one rerun
+    c1, c2 = st.columns([3, 1])
+    with c1:
+        st.text_input("Quick entry", key='quick_marks', placeholder="CC CCC CCCCC CCC H", on_change=apply_quick_marks,
+                      disabled=not current_name, help="All 14 marks in FitRep block order - sets every attribute below")
+    with c2:
+        form_mode = st.toggle("Form mode", key='attr_form_mode',
+                              help="Only recalculate when 'Update' is pressed, instead of on every attribute click")
+    if st.session_state.quick_marks_error:
+        st.error(st.session_state.quick_marks_error)
+        st.session_state.quick_marks_error = None
+
     # The Table of Buttons
+    # in form mode, clicks are held by the form and the page reruns once on submit
+    grid = st.form("attr_form", border=False) if form_mode else st.container()
 
     current_scores = {}
 
-    for cat in constants.USMC_CATEGORIES:
-        # row_label is the name, row_buttons is the button bar
-        row_label, row_buttons = st.columns([0.4, 2], gap="small")  # st.columns([1, 2])
-
-        with row_label:
-            st.markdown(f"**{cat}**")
-
-        with row_buttons:
-            val = st.segmented_control(
-                label=cat,
-                # TODO: make attribute scors a constant
-                options=constants.SCORE_LETTER_VALS,
-                #default="C",
-                key=f"btn_{cat}",
-                label_visibility="collapsed",  # Hides the label so it looks like a table row
-                selection_mode='single',
-                disabled=not current_name
-            )
-            current_scores[cat] = val
+    with grid:
+        for cat in constants.USMC_CATEGORIES:
+            # row_label is the name, row_buttons is the button bar
+            row_label, row_buttons = st.columns([0.4, 2], gap="small")  # st.columns([1, 2])
+
+            with row_label:
+                st.markdown(f"**{cat}**")
+
+            with row_buttons:
+                val = st.segmented_control(
+                    label=cat,
+                    # TODO: make attribute scors a constant
+                    options=constants.SCORE_LETTER_VALS,
+                    #default="C",
+                    key=f"btn_{cat}",
+                    label_visibility="collapsed",  # Hides the label so it looks like a table row
+                    selection_mode='single',
+                    disabled=not current_name
+                )
+                current_scores[cat] = val
+
+        if form_mode:
+            st.form_submit_button("Update calculations", disabled=not current_name)
 
     # Real time calculation updates based on current scores
     # check inputs for validitity
@@ -145,11 +395,17 @@ def run_reports_page():
 
     if valid_rpt_data:
         st.success(valid_rpt_msg)
-        copy_of_prof = copy.deepcopy(st.session_state.active_profile)
-        copy_of_db = copy.deepcopy(st.session_state.rpt_db)
+        # shadow shares unchanged reports with the saved db - only reports whose values change get copied
+        copy_of_prof = copy.copy(st.session_state.active_profile)
+        copy_of_db = st.session_state.rpt_db.shadow()
+        # a new report's RV is a lattice lookup - no replay of the saved reports
+        lattice = calc_eng.get_rv_lattice(st.session_state.active_profile, st.session_state.get('rv_lattice'))
+        st.session_state.rv_lattice = lattice
         working_rpt_db, working_rank_prof, working_rpt = calc_eng.update_calcs(copy_of_db, st.session_state.original_profile,
                                                                                copy_of_prof, rank_prof.rank,
-                                                                               current_name, current_scores)
+                                                                               current_name, current_scores,
+                                                                               engine=st.session_state.rv_engine,
+                                                                               lattice=lattice)
         st.session_state.display_db = working_rpt_db
         st.session_state.display_profile = working_rank_prof
         st.session_state.display_rpt = working_rpt
@@ -160,10 +416,13 @@ def run_reports_page():
         st.session_state.display_profile = None
         st.session_state.display_db = None
 
+    if valid_rpt_data and not editing:
+        render_rv_solver(current_scores)
+
     bt_label = "Add to profile" if not editing else "Save Changes"
     if st.button(bt_label, disabled=not valid_rpt_data):
-        new_db = copy.deepcopy(st.session_state.display_db)
-        new_prof = copy.deepcopy(st.session_state.display_profile)
+        new_db = st.session_state.display_db.commit()
+        new_prof = copy.copy(st.session_state.display_profile)
         st.session_state.rpt_db = new_db
         st.session_state.active_profile = new_prof
         if editing:
@@ -173,6 +432,17 @@ def run_reports_page():
         st.session_state.save_rpt_msg = saved_report_msg
         st.rerun()
 
+    if editing and st.button("Withdraw report", help="Remove this report from the profile (withdrawn or adverse)"):
+        calc_eng.withdraw_report(st.session_state.original_profile, st.session_state.active_profile,
+                                 st.session_state.rpt_db, current_name, engine=st.session_state.rv_engine)
+        st.session_state.save_rpt_msg = f"{current_name} withdrawn from profile"
+        st.rerun()
+
     if st.session_state.save_rpt_msg:
         st.success(st.session_state.save_rpt_msg)
         st.session_state.save_rpt_msg = None
+
+    render_bulk_import()
+    render_order_optimizer()
+    render_forecast()
+    render_scenarios()
@@ -1,4 +1,5 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import sys
@@ -81,6 +82,13 @@ def render_profile_summary():
     h_col4.markdown(f"*{prof.avg:.2f}*")    # (f"*{prof.avg:.2f}*") (f"*{prof.get_average():.2f}*")
     h_col5.markdown(f"*{prof.num_rpts}*")
 
+    # other ranks in the session
+    session = st.session_state.get('rank_session')
+    others = [rank for rank in session.rank_list if rank != prof.rank] if session else []
+    if others:
+        st.caption("Other ranks: " + ", ".join(f"{rank} ({session.get(rank).rpt_db.get_num_reports()} rpts, "
+                                                f"high {session.get(rank).active_profile.high:.2f})" for rank in others))
+
 
 def _render_active_report_card(mro_name: str, mro_rank: str, report_obj):
     """
@@ -117,6 +125,43 @@ def render_reports_summary():
     display_rpt = st.session_state.get('display_rpt')
 
     _render_active_report_card(mro_name, mro_rank, display_rpt)
+    if display_rpt:
+        render_sensitivity_grid(display_rpt)
+
+
+def render_sensitivity_grid(display_rpt):
+    """
+    Heatmap of the RV Cum change from changing any one mark of the report being edited.
+    Cells that would make the report the profile high are outlined.
+    """
+    orig_prof = st.session_state.get('original_profile')
+    lattices = calc_eng.get_sensitivity_lattices(orig_prof, st.session_state.active_profile, st.session_state.rpt_db,
+                                                 display_rpt.name, st.session_state.get('rv_lattice'))
+    grid = calc_eng.SensitivityGrid(display_rpt.get_letter_scores(), *lattices)
+
+    with st.expander("Mark Sensitivity"):
+        best = grid.best_change()
+        if best:
+            st.caption(f"Biggest gain: {best[0]} to '{best[1]}' (+{best[2]:.2f} RV Cum)")
+
+        df = pd.DataFrame(grid.rv_cum_delta, index=[cat[:14] for cat in grid.categories], columns=grid.letters)
+        high_df = pd.DataFrame(grid.raises_high, index=df.index, columns=df.columns)
+        scale = max(float(np.nanmax(np.abs(grid.rv_cum_delta))), 0.01) if grid.valid.any() else 1.
+
+        def color_delta(val):
+            """Green for gains, red for losses, stronger with size."""
+            if pd.isna(val):
+                return 'color: gray'
+            alpha = min(abs(val) / scale, 1.) * 0.6
+            rgb = "46, 204, 113" if val > 0 else "231, 76, 60"
+            return f'background-color: rgba({rgb}, {alpha:.2f})' if val else ''
+
+        styled_df = (df.style
+                     .format("{:+.1f}", na_rep="-")
+                     .map(color_delta)
+                     .apply(lambda _: high_df.map(lambda raises: 'border: 2px solid #1f2937' if raises else ''), axis=None))
+        st.dataframe(styled_df, use_container_width=True)
+        st.caption("Change in min. RV Cum from one mark change.  Outlined: becomes the profile high")
 
 
 def render_narratives_summary():
@@ -188,25 +233,32 @@ def render_rpts_list():
 
 def render_rv_overview():
     """
-    Renders the RV Lookup Table (RV vs Report Average).
+    Renders the RV Lookup Table (RV vs Report Average) for the next report added to the active profile.
 
     Wraps the long list in an expander to save UI space.
     """
-    prof = st.session_state.get('display_profile') or st.session_state.get('active_profile')
+    prof = st.session_state.get('active_profile')
     if not prof:
         return
 
-    st.write("RV Reference Table")
+    # lattice is only rebuilt when the active profile changes (i.e. a report is saved)
+    lattice = calc_eng.get_rv_lattice(prof, st.session_state.get('rv_lattice'))
+    st.session_state.rv_lattice = lattice
 
-    rv_dict = prof.calc_scores_for_rv()
+    with st.expander("RV Reference Table"):
+        # Slicing for reasonable range (100 down to 80)
+        rv_dict = lattice.required_avgs(range(100, 79, -1))
+        if not rv_dict:
+            st.caption("RV is 0 until the profile has 3 reports.")
+            return
 
-    # Convert dictionary to DataFrame for cleaner display
-    # Slicing for reasonable range (100 down to 80)
-    data = [{"RV": k, "Req. Avg": v} for k, v in rv_dict.items() if 100 >= k >= 80]
-    df = pd.DataFrame(data)
-    df.set_index('RV', inplace=True)
+        # Convert dictionary to DataFrame for cleaner display
+        data = [{"RV": k, "Req. Avg": v} for k, v in rv_dict.items()]
+        df = pd.DataFrame(data)
+        df.set_index('RV', inplace=True)
 
-    st.table(df)
+        st.table(df.style.format("{:.2f}"))
+        st.caption("Lowest report average that reaches each min. RV")
 
 
 def render_sidebar():
@@ -231,10 +283,8 @@ def render_sidebar():
         #st.divider()
 
         render_rpts_list()
+        render_rv_overview()
         st.divider()
 
         render_feedback_button()
         render_about_section()
-
-        # TODO: Add calc_rv_table to cacl_eng so we can display the projected RV table
-        # render_rv_overview()
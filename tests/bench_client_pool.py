@@ -0,0 +1,120 @@
+"""
+Per-call latency of a pooled OpenAIClient vs one built per request, against a local stand-in for the
+Responses API.  Not collected by pytest - run it directly:
+
+    python -m tests.bench_client_pool [--calls 200]
+
+The stand-in speaks plain HTTP on localhost, so the saving shown is building the SDK client plus the TCP
+connect.  Against api.openai.com each new client also pays a TLS handshake over the network.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import src.app.client_pool as client_pool
+import src.app.constants as constants
+import src.app.llm_clients as llm_clients
+from src.app.llm_base import LLMRequest
+
+MODEL_ID = constants.FRONTIER_MODELS[constants.DEFAULT_FRONTIER_MODEL]["model_id"]
+
+_RESPONSE = json.dumps({
+    "id": "resp_bench", "object": "response", "created_at": 0, "status": "completed", "model": MODEL_ID,
+    "output": [{"type": "message", "id": "msg_bench", "status": "completed", "role": "assistant",
+                "content": [{"type": "output_text", "text": "Sets the standard.", "annotations": []}]}],
+    "usage": {"input_tokens": 30, "output_tokens": 4, "total_tokens": 34,
+              "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}},
+    "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+}).encode()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers every POST with the same Responses API result.  HTTP/1.1, so connections are kept alive."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # headers and body go out in two writes - without this, Nagle + delayed ACK add ~40 ms per reply
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.connections.add(self.client_address)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(_RESPONSE)
+
+
+def start_stand_in():
+    """Stand-in server on a free localhost port.  Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.connections = set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def _time_calls(get_client, num_calls, request):
+    times = []
+    for _ in range(num_calls):
+        start = time.perf_counter()
+        client = get_client()
+        client.generate(request)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+fresh_clients = []
+
+
+def _fresh_client():
+    """What query_foundation did before the pool: a new client (and connection pool) per request."""
+    client = llm_clients.OpenAIClient(model=MODEL_ID)
+    fresh_clients.append(client)
+    return client
+
+
+def run(num_calls):
+    server, base_url = start_stand_in()
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "bench-key")
+    request = LLMRequest("sys", "Write Section I", max_tokens=100, temperature=0.7)
+
+    try:
+        _time_calls(_fresh_client, 5, request)      # warm up imports / the server
+        server.connections.clear()
+        fresh = _time_calls(_fresh_client, num_calls, request)
+        fresh_conns = len(server.connections)
+
+        client_pool.get_client("foundation", MODEL_ID).generate(request)
+        server.connections.clear()
+        pooled = _time_calls(lambda: client_pool.get_client("foundation", MODEL_ID), num_calls, request)
+        pooled_conns = len(server.connections)
+    finally:
+        for client in fresh_clients:
+            client.close()
+        client_pool.POOL.close_all()
+        server.shutdown()
+        server.server_close()
+
+    print(f"{num_calls} calls against {base_url}")
+    for label, times, conns in (("new client per call", fresh, fresh_conns), ("pooled client", pooled, pooled_conns)):
+        print(f"  {label:<20} median {statistics.median(times) * 1e3:7.3f} ms   "
+              f"mean {statistics.mean(times) * 1e3:7.3f} ms   connections {conns}")
+    saved = statistics.median(fresh) - statistics.median(pooled)
+    print(f"  saved per call       median {saved * 1e3:7.3f} ms ({saved / statistics.median(fresh):.0%})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    run(parser.parse_args().calls)
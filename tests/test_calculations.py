@@ -141,6 +141,32 @@ def test_shadow_state_isolation():
     assert profile.high == 5.0
 
 
+def test_shadow_db_calcs_leave_saved_db_alone():
+    """update_calcs on a shadow matches a deepcopy run and never touches the saved reports"""
+    import copy
+    import random
+    rng = random.Random(11)
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 10)
+    db = ReportDB()
+    for idx in range(8):
+        db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+    _update_profile(orig, RankProfile("Active", "Capt", 0, 0, 0, 0), db)
+    saved = {name: (rpt.rv_proc_min, rpt.rv_cum_min) for name, rpt in db.rpts_dict.items()}
+
+    new_scores = _random_scores(rng)
+    shadow_db, shadow_prof, _ = calc_eng.update_calcs(db.shadow(), orig, RankProfile("W", "Capt", 0, 0, 0, 0),
+                                                      "Capt", "MRO8", new_scores)
+    ref_db, ref_prof, _ = calc_eng.update_calcs(copy.deepcopy(db), orig, RankProfile("W", "Capt", 0, 0, 0, 0),
+                                                "Capt", "MRO8", new_scores)
+
+    assert {name: (rpt.rv_proc_min, rpt.rv_cum_min) for name, rpt in db.rpts_dict.items()} == saved
+    assert shadow_prof.get_state() == ref_prof.get_state()
+    for name in ref_db.name_list:
+        got, ref = shadow_db.get_report_by_name(name), ref_db.get_report_by_name(name)
+        assert (got.rv_proc_min, got.rv_proc_max, got.rv_cum_min, got.rv_cum_max) == \
+               (ref.rv_proc_min, ref.rv_proc_max, ref.rv_cum_min, ref.rv_cum_max)
+
+
 def test_welford_algorithm_accuracy():
     """Test running average calculation (Welford's algorithm)"""
     profile = RankProfile("Test", "Capt", 0, 0, 0, 0)
@@ -171,4 +197,692 @@ def test_rv_spread_calculation():
 
     # Should have min and max RV
     assert updated_rpt.rv_cum_min < updated_rpt.rv_cum_max
-    assert updated_rpt.rv_cum_max - updated_rpt.rv_cum_min < 5.0
\ No newline at end of file
+    assert updated_rpt.rv_cum_max - updated_rpt.rv_cum_min < 5.0
+
+####################################################################################
+########################  Incremental Engine Tests  ################################
+####################################################################################
+def _random_scores(rng):
+    import src.app.constants as constants
+    return {cat: rng.choice("ABCDEFGH" if i % 5 else "ABCDEFG") for i, cat in enumerate(constants.USMC_CATEGORIES)}
+
+
+def _assert_engines_match(orig, db, engine_prof):
+    """Runs the full replay on a copy and checks the engine produced identical floats."""
+    import copy
+    ref_db = copy.deepcopy(db)
+    ref_prof = RankProfile("Ref", orig.rank, 0, 0, 0, 0)
+    _update_profile(orig, ref_prof, ref_db)
+
+    assert engine_prof.get_state() == ref_prof.get_state()
+    for name in db.name_list:
+        got, ref = db.rpts_dict[name], ref_db.rpts_dict[name]
+        assert (got.rv_proc_min, got.rv_proc_max, got.rv_cum_min, got.rv_cum_max) == \
+               (ref.rv_proc_min, ref.rv_proc_max, ref.rv_cum_min, ref.rv_cum_max)
+
+
+def test_incremental_engine_matches_full_replay():
+    """Differential test: random appends and edits must match _update_profile bit-for-bit"""
+    import random
+    rng = random.Random(1234)
+    orig = RankProfile("Original", "Capt", 4.38, 2.79, 3.61, 25)
+    working = RankProfile("Active", "Capt", 4.38, 2.79, 3.61, 25)
+    engine = calc_eng.RVEngine()
+    db = ReportDB()
+
+    for step in range(60):
+        if db.get_num_reports() and rng.random() < 0.5:
+            name = rng.choice(db.name_list)     # edit an existing report
+        else:
+            name = f"MRO{step}"                 # append a new report
+        calc_eng.update_calcs(db, orig, working, "Capt", name, _random_scores(rng), engine=engine)
+        _assert_engines_match(orig, db, working)
+
+
+def test_incremental_engine_start_hint():
+    """Position returned by a db change can replace the engine's scan"""
+    import random
+    rng = random.Random(13)
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 10)
+    db = ReportDB()
+    for idx in range(12):
+        db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+    engine, prof = calc_eng.RVEngine(), RankProfile("Active", "Capt", 0, 0, 0, 0)
+    calc_eng.recalc_db(db, orig, prof, engine)
+
+    for step in range(20):
+        if rng.random() < 0.5:
+            start = db.move_report(rng.choice(db.name_list), rng.randrange(db.get_num_reports()))
+        else:
+            # replace a report with a new one somewhere else
+            removed_at = db.delete_report(rng.choice(db.name_list))
+            added_at = db.insert_report(rng.randrange(db.get_num_reports() + 1),
+                                        Report("Capt", f"NEW{step}", _random_scores(rng)))
+            start = min(removed_at, added_at)
+        calc_eng.recalc_db(db, orig, prof, engine, start)
+        _assert_engines_match(orig, db, prof)
+
+
+def test_incremental_engine_replays_from_edit():
+    """Editing report k should only replay k..n; appending should only replay the new report"""
+    import src.app.constants as constants
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 10)
+    working = RankProfile("Active", "Capt", 4.5, 3.0, 4.0, 10)
+    engine = calc_eng.RVEngine()
+    db = ReportDB()
+    for name in ["A", "B", "C", "D"]:
+        db.add_report(Report("Capt", name, {cat: "D" for cat in constants.USMC_CATEGORIES}))
+
+    assert engine.update(orig, working, db) == 0
+    db.add_report(Report("Capt", "E", {cat: "E" for cat in constants.USMC_CATEGORIES}))
+    assert engine.update(orig, working, db) == 4
+    db.replace_rpt(Report("Capt", "C", {cat: "F" for cat in constants.USMC_CATEGORIES}))
+    assert engine.update(orig, working, db) == 2
+    _assert_engines_match(orig, db, working)
+
+    # a new original profile invalidates every checkpoint
+    new_orig = RankProfile("Original", "Capt", 4.6, 3.0, 4.0, 10)
+    assert engine.update(new_orig, working, db) == 0
+    _assert_engines_match(new_orig, db, working)
+
+
+####################################################################################
+##########################  Batch (Columnar) Tests  ################################
+####################################################################################
+def test_rv_eq_vec_matches_scalar():
+    """Vectorized RV equation should match the scalar one element for element"""
+    import numpy as np
+    from src.app.calc_eng import _rv_eq_vec
+    cases = [(3.5, 5, 4.0, 3.0), (4.0, 5, 4.0, 3.0), (1.0, 5, 4.0, 3.0), (3.5, 2, 4.0, 3.0),
+             (4.0, 10, 4.0, 4.0), (4.0, 10, 4.0, 4.00001), (42/13, 12, 4.5, 3.61)]
+    rpt_avgs, num_rpts, highs, avgs = (np.array(col) for col in zip(*cases))
+
+    res = _rv_eq_vec(rpt_avgs, num_rpts, highs, avgs)
+
+    assert list(res) == [_rv_eq(*case) for case in cases]
+
+
+def test_batch_update_matches_full_replay():
+    """Columnar batch calc should agree with _update_profile (up to float summation order)"""
+    import random
+    import numpy as np
+    from src.app.models import ReportColumns
+    rng = random.Random(99)
+    orig = RankProfile("Original", "Capt", 4.38, 2.79, 3.61, 25)
+    db = ReportDB()
+    for idx in range(200):
+        db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+
+    cols = calc_eng.update_profile_batch(orig, RankProfile("Batch", "Capt", 0, 0, 0, 0), ReportColumns.from_db(db))
+    ref_prof = RankProfile("Ref", "Capt", 0, 0, 0, 0)
+    _update_profile(orig, ref_prof, db)
+
+    for idx, name in enumerate(cols.names):
+        rpt = db.get_report_by_name(name)
+        assert cols.rpt_avgs[idx] == rpt.rpt_avg
+        assert np.allclose([cols.rv_proc_min[idx], cols.rv_proc_max[idx], cols.rv_cum_min[idx], cols.rv_cum_max[idx]],
+                           [rpt.rv_proc_min, rpt.rv_proc_max, rpt.rv_cum_min, rpt.rv_cum_max], rtol=0, atol=1e-9)
+
+
+def test_batch_update_writes_back_and_sets_profile():
+    """write_to_db should copy RVs onto reports; the working profile ends at the final values"""
+    from src.app.models import ReportColumns
+    db = ReportDB()
+    db.add_report(Report("Capt", "One", {'Performance': 'D'}))
+    db.add_report(Report("Capt", "Two", {'Performance': 'C'}))
+    db.add_report(Report("Capt", "Three", {'Performance': 'B'}))
+    working = RankProfile("Batch", "Capt", 0, 0, 0, 0)
+
+    cols = calc_eng.update_profile_batch(RankProfile("Orig", "Capt", 0, 0, 0, 0), working, ReportColumns.from_db(db))
+    cols.write_to_db(db)
+
+    assert (working.high, working.low, working.avg, working.num_rpts) == (4.0, 2.0, 3.0, 3)
+    assert db.get_report_by_name("One").rv_cum_min == 100.0
+    assert db.get_report_by_name("Three").rv_cum_min == 80.0
+
+
+def test_unrounding_covers_fewer_observed_marks():
+    """Rpts with 'H' marks average over fewer attributes - those values should unround too"""
+    # 4.33 can't come from 13 or 14 marks, but 13/3 (three observed marks) rounds to it
+    assert calc_eng.unround_score(4.33) == 13 / 3
+    assert calc_eng.unround_candidates(4.33) == (13 / 3,)
+    # nothing rounds to 0.5 - value is returned unchanged
+    assert calc_eng.unround_score(0.5) == 0.5
+    assert calc_eng.unround_candidates(0.5) == ()
+
+
+def test_unrounding_returns_all_candidates():
+    """Ambiguous rounded values should return every possible unrounded value"""
+    # 53/13 = 4.0769 and 49/12 = 4.0833 both round to 4.08
+    assert calc_eng.unround_candidates(4.08) == (53 / 13, 49 / 12)
+    # prefer the most observed marks, same as the old 13/14 table
+    assert calc_eng.unround_score(4.08) == 53 / 13
+
+
+####################################################################################
+################################  RV Lattice Tests  ################################
+####################################################################################
+def test_rv_lattice_matches_update_calcs():
+    """Lattice lookup for a new report should match a full update_calcs pass exactly"""
+    import copy
+    import random
+    rng = random.Random(7)
+    orig = RankProfile("Original", "Capt", 4.38, 2.79, 3.61, 25)
+    active = copy.deepcopy(orig)
+    db = ReportDB()
+    for idx in range(5):
+        calc_eng.update_calcs(db, orig, active, "Capt", f"MRO{idx}", _random_scores(rng))
+
+    lattice = calc_eng.RVLattice(active)
+    for idx in range(30):
+        shadow_db, shadow_prof = copy.deepcopy(db), copy.deepcopy(active)
+        _, _, new_rpt = calc_eng.update_calcs(shadow_db, orig, shadow_prof, "Capt", "NEW", _random_scores(rng))
+
+        rv_min, rv_max = lattice.lookup(new_rpt.rpt_avg)
+        assert (rv_min, rv_max) == (new_rpt.rv_proc_min, new_rpt.rv_proc_max)
+        assert (rv_min, rv_max) == (new_rpt.rv_cum_min, new_rpt.rv_cum_max)
+
+
+def test_update_calcs_new_report_uses_lattice():
+    """A new report through the lattice should give the same db and profile as a replay, edits still replay"""
+    import copy
+    import random
+    rng = random.Random(11)
+    orig = RankProfile("Original", "Capt", 4.38, 2.79, 3.61, 25)
+    active = copy.deepcopy(orig)
+    db = ReportDB()
+    engine = calc_eng.RVEngine()
+    for idx in range(8):
+        db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+    calc_eng.recalc_db(db, orig, active, engine)
+
+    lattice = calc_eng.get_rv_lattice(active)
+    for name in ("NEW", "MRO3"):
+        for _ in range(10):
+            scores = _random_scores(rng)
+            replay_db, replay_prof, _ = calc_eng.update_calcs(db.shadow(), orig, copy.copy(active), "Capt", name,
+                                                              scores, engine=engine)
+            fast_db, fast_prof, _ = calc_eng.update_calcs(db.shadow(), orig, copy.copy(active), "Capt", name,
+                                                          scores, engine=engine, lattice=lattice)
+
+            assert fast_prof.get_state() == replay_prof.get_state()
+            for rpt_name in replay_db.name_list:
+                replay_rpt, fast_rpt = replay_db.rpts_dict[rpt_name], fast_db.rpts_dict[rpt_name]
+                assert (fast_rpt.rv_proc_min, fast_rpt.rv_proc_max, fast_rpt.rv_cum_min, fast_rpt.rv_cum_max) == \
+                       (replay_rpt.rv_proc_min, replay_rpt.rv_proc_max, replay_rpt.rv_cum_min, replay_rpt.rv_cum_max)
+
+    # a lattice of another profile is ignored
+    stale = calc_eng.get_rv_lattice(orig)
+    _, replay_prof, _ = calc_eng.update_calcs(db.shadow(), orig, copy.copy(active), "Capt", "NEW", scores,
+                                              engine=engine)
+    _, stale_prof, _ = calc_eng.update_calcs(db.shadow(), orig, copy.copy(active), "Capt", "NEW", scores,
+                                             engine=engine, lattice=stale)
+    assert stale_prof.get_state() == replay_prof.get_state()
+
+
+def test_rv_lattice_reference_table_and_cache():
+    """Required averages should rise with the target RV; lattice is reused until the profile changes"""
+    profile = RankProfile("Active", "Capt", 4.5, 3.0, 4.0, 10)
+    lattice = calc_eng.get_rv_lattice(profile)
+
+    req = lattice.required_avgs(range(100, 79, -1))
+    assert list(req.values()) == sorted(req.values(), reverse=True)
+    assert lattice.lookup(req[95])[0] >= 95
+
+    with pytest.raises(KeyError):
+        lattice.lookup(4.001)
+
+    assert calc_eng.get_rv_lattice(profile, lattice) is lattice
+    profile.update_with_rpt(Report("Capt", "New", {"Performance": "E"}))
+    assert calc_eng.get_rv_lattice(profile, lattice) is not lattice
+
+
+def test_rv_lattice_small_profile():
+    """No RV targets can be met until the profile has 3 reports"""
+    lattice = calc_eng.RVLattice(RankProfile("Active", "Capt", 4.0, 4.0, 0, 1))
+    assert lattice.required_avgs() == {}
+
+
+####################################################################################
+##############################  Inverse Solver Tests  ##############################
+####################################################################################
+def test_solve_for_rv_reaches_target():
+    """Every suggestion should land in the target band, sorted by fewest changes"""
+    import src.app.constants as constants
+    profile = RankProfile("Active", "Capt", 4.5, 3.0, 4.0, 20)
+    lattice = calc_eng.RVLattice(profile)
+    scores = {cat: "D" for cat in constants.USMC_CATEGORIES}
+    scores["Reports"] = "H"
+
+    results = calc_eng.solve_for_rv(lattice, scores, 93.34, keep_high=True)
+
+    assert len(results) == 10
+    costs = [(res["changes"], res["distance"]) for res in results]
+    assert costs == sorted(costs)
+    for res in results:
+        rpt = Report("Capt", "Check", res["scores"])
+        assert 93.34 <= lattice.lookup(rpt.rpt_avg)[0] == res["rv_min"]
+        assert rpt.rpt_avg <= profile.high
+        assert res["scores"]["Reports"] == "H"   # not observed stays not observed
+        assert sum(res["scores"][cat] != scores[cat] for cat in scores) == res["changes"]
+
+
+def test_solve_for_rv_current_marks_and_unreachable():
+    """Current marks come back first if already in band; impossible targets return nothing"""
+    import src.app.constants as constants
+    lattice = calc_eng.RVLattice(RankProfile("Active", "Capt", 4.5, 3.0, 4.0, 20))
+    scores = {cat: "D" for cat in constants.USMC_CATEGORIES}
+
+    assert calc_eng.solve_for_rv(lattice, scores, 80.0)[0]["changes"] == 0
+    # RV is floored at 80
+    assert calc_eng.solve_for_rv(lattice, scores, 70.0, 75.0) == []
+
+
+####################################################################################
+############################  Order Optimizer Tests  ###############################
+####################################################################################
+def _proc_scores(orig, db, order):
+    """Min RV Proc of each report when processed in this order (full replay)."""
+    import copy
+    shadow = copy.deepcopy(db)
+    shadow.reorder_reports(order)
+    _update_profile(orig, RankProfile("Working", "Capt", 0, 0, 0, 0), shadow)
+    return [shadow.get_report_by_name(name).rv_proc_min for name in order]
+
+
+def test_optimize_order_matches_brute_force():
+    """Exact DP should find the best of every permutation, without moving RV Cum"""
+    import itertools
+    import random
+    rng = random.Random(11)
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 5)
+    db = ReportDB()
+    for idx in range(5):
+        db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+    db.add_report(Report("Capt", "DUP", dict(db.get_report_by_name("MRO0").get_letter_scores())))
+
+    for objective, key in (("total", sum), ("balance", lambda rvs: (min(rvs), sum(rvs)))):
+        order, score, exact = calc_eng.optimize_order(orig, db, objective)
+        best = max(key(_proc_scores(orig, db, list(perm))) for perm in itertools.permutations(db.name_list))
+
+        assert exact
+        assert sorted(order) == sorted(db.name_list)
+        assert key(_proc_scores(orig, db, order)) == pytest.approx(best, abs=1e-9)
+        assert score == pytest.approx(best, abs=1e-9)
+
+    # RV Cum doesn't depend on order
+    _update_profile(orig, RankProfile("Working", "Capt", 0, 0, 0, 0), db)
+    cum_before = {n: db.get_report_by_name(n).rv_cum_min for n in db.name_list}
+    db.reorder_reports(order)
+    _update_profile(orig, RankProfile("Working", "Capt", 0, 0, 0, 0), db)
+    for name, rv in cum_before.items():
+        assert db.get_report_by_name(name).rv_cum_min == pytest.approx(rv, abs=1e-9)
+
+
+def test_optimize_order_balance_tie_break_is_exact():
+    """Under "balance", the sum tie-break is the best of every permutation too, not just the lowest RV"""
+    import itertools
+    import random
+    key = lambda rvs: (round(min(rvs), 9), sum(rvs))
+    for seed in range(25):
+        rng = random.Random(seed)
+        orig = RankProfile("Original", "Capt", 4.2, 3.0, 3.7, rng.randrange(5, 12))
+        db = ReportDB()
+        for idx in range(6):
+            db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+
+        order, score, exact = calc_eng.optimize_order(orig, db, "balance")
+        best = max(key(_proc_scores(orig, db, list(perm))) for perm in itertools.permutations(db.name_list))
+        assert exact
+        assert score == pytest.approx(best, abs=1e-9)
+        assert key(_proc_scores(orig, db, order)) == pytest.approx(best, abs=1e-9)
+
+
+def test_optimize_order_large_batch_uses_beam():
+    """30+ reports should come back quickly, never worse than the entered or either sorted order"""
+    import random
+    import time
+    for num, seed in ((32, 5), (40, 6)):
+        rng = random.Random(seed)
+        orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 20)
+        db = ReportDB()
+        for idx in range(num):
+            db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+        ascending = sorted(db.name_list, key=lambda name: db.get_report_by_name(name).rpt_avg)
+
+        for objective, key in (("total", sum), ("balance", lambda rvs: (round(min(rvs), 9), sum(rvs)))):
+            start = time.perf_counter()
+            order, score, _ = calc_eng.optimize_order(orig, db, objective, beam_width=500)
+            assert time.perf_counter() - start < 5
+
+            assert sorted(order) == sorted(db.name_list)
+            found = key(_proc_scores(orig, db, order))
+            for other in (db.name_list, ascending, ascending[::-1]):
+                assert found >= key(_proc_scores(orig, db, other))
+
+    with pytest.raises(ValueError):
+        calc_eng.optimize_order(orig, db, objective="fastest")
+
+
+def test_optimize_order_narrow_beam_only_claims_exact_when_it_is():
+    """A beam too narrow to hold every subset can still prove its answer - but only if it really is the best"""
+    import itertools
+    import random
+    key = lambda rvs: (round(min(rvs), 9), sum(rvs))
+    for seed in range(10):
+        rng = random.Random(seed)
+        orig = RankProfile("Original", "Capt", 4.2, 3.0, 3.7, rng.randrange(5, 12))
+        db = ReportDB()
+        for idx in range(6):
+            db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+
+        for objective, obj_key in (("total", sum), ("balance", key)):
+            order, score, exact = calc_eng.optimize_order(orig, db, objective, beam_width=3)
+            best = max(obj_key(_proc_scores(orig, db, list(perm))) for perm in itertools.permutations(db.name_list))
+            assert obj_key(_proc_scores(orig, db, order)) == pytest.approx(score, abs=1e-9)
+            if exact:
+                assert score == pytest.approx(best, abs=1e-9)
+
+
+def test_optimize_order_over_64_reports():
+    """Subsets span more than one 64 bit word past 64 reports"""
+    import random
+    rng = random.Random(8)
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 20)
+    db = ReportDB()
+    for idx in range(70):
+        db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+
+    order, score, exact = calc_eng.optimize_order(orig, db, beam_width=200)
+    assert sorted(order) == sorted(db.name_list)
+    assert score == pytest.approx(sum(_proc_scores(orig, db, order)), abs=1e-6)
+    assert score >= sum(_proc_scores(orig, db, db.name_list))
+
+
+####################################################################################
+##########################  Exact Rpt Average Tests  ###############################
+####################################################################################
+def test_avg_to_units():
+    """Every possible rpt average is a whole number of units; anything else is rejected"""
+    from src.app.models import AVG_UNITS, avg_to_units
+    assert avg_to_units(53 / 13) == 53 * (AVG_UNITS // 13)
+    assert avg_to_units(4.5) == 9 * (AVG_UNITS // 2)
+    with pytest.raises(ValueError):
+        avg_to_units(4.08)
+
+
+####################################################################################
+########################  Feasible Profile Inference Tests  ########################
+####################################################################################
+def _brute_force_sum_range(high, low, avg, num_rpts, denominators=(13, 14)):
+    """Every multiset of rpt averages (allowed mark counts) in [low, high] that includes the high and low"""
+    from fractions import Fraction
+    from itertools import combinations_with_replacement, product
+    highs = calc_eng._candidates(high, denominators)
+    lows = calc_eng._candidates(low, denominators)
+    totals = set()
+    for high_frac, low_frac in product(highs, lows):
+        vals = sorted({Fraction(s, d) for d in denominators for s in range(d, 7 * d + 1)
+                       if low_frac <= Fraction(s, d) <= high_frac})
+        totals |= {high_frac + low_frac + sum(combo) for combo in combinations_with_replacement(vals, num_rpts - 2)}
+    avg_frac = Fraction(str(avg))
+    fits = [t for t in totals if avg_frac - Fraction(1, 200) <= t / num_rpts <= avg_frac + Fraction(1, 200)]
+    return min(fits), max(fits)
+
+
+def test_feasible_sum_range_matches_brute_force():
+    """Bitset DP should find the same extreme totals as enumerating every combination"""
+    for high, low, avg, num_rpts in ((4.5, 3.0, 3.71, 4), (4.08, 3.54, 3.79, 5), (5.0, 2.0, 3.5, 3)):
+        assert calc_eng.feasible_sum_range(high, low, avg, num_rpts, (13, 14)) == \
+            _brute_force_sum_range(high, low, avg, num_rpts)
+
+    # default - every mark count from 1 to 14
+    every = tuple(range(1, 15))
+    for high, low, avg, num_rpts in ((4.5, 3.0, 3.71, 4), (4.08, 3.54, 3.79, 4), (5.0, 2.0, 3.5, 3)):
+        assert calc_eng.feasible_sum_range(high, low, avg, num_rpts) == \
+            _brute_force_sum_range(high, low, avg, num_rpts, every)
+
+
+def test_infer_avg_bounds_contains_true_avg():
+    """Small profiles with short (few observed marks) reports mixed in - the true avg is always in the bracket"""
+    import random
+    from fractions import Fraction
+    rng = random.Random(9)
+    for _ in range(100):
+        avgs = []
+        for _ in range(rng.randrange(3, 13)):
+            num_marks = rng.choice((14, 13, rng.randrange(1, 15)))
+            avgs.append(Fraction(sum(rng.randrange(2, 8) for _ in range(num_marks)), num_marks))
+        true_avg = sum(avgs) / len(avgs)
+        low_avg, high_avg = calc_eng.infer_avg_bounds(round(float(max(avgs)), 2), round(float(min(avgs)), 2),
+                                                      round(float(true_avg), 2), len(avgs))
+        assert low_avg - 1e-9 <= true_avg <= high_avg + 1e-9
+
+
+def test_infer_avg_bounds_tighter_than_rounding():
+    """Inferred bracket sits inside avg +/- 0.005, and is exact for small profiles"""
+    low_avg, high_avg = calc_eng.infer_avg_bounds(4.5, 3.0, 3.71, 4)
+    assert 3.705 <= low_avg <= high_avg <= 3.715
+    assert high_avg - low_avg < 0.01
+
+    # 2 reports: the avg is exactly (high + low) / 2
+    assert calc_eng.infer_avg_bounds(4.5, 3.0, 0, 2) == (3.75, 3.75)
+    assert calc_eng.infer_avg_bounds(0, 0, 0, 0) == (-0.005, 0.005)
+
+
+def test_infer_avg_bounds_impossible_profile_falls_back():
+    """Avg outside anything the high/low allow -> plain +/- 0.005 bracket"""
+    assert calc_eng.feasible_sum_range(4.0, 3.0, 3.01, 3) is None
+    assert calc_eng.infer_avg_bounds(4.0, 3.0, 3.01, 3) == pytest.approx((3.005, 3.015))
+
+
+def test_feasible_sum_range_large_profile():
+    """Realistic profile size stays fast and inside the rounding bracket"""
+    import time
+    calc_eng.feasible_sum_range.cache_clear()
+    start = time.perf_counter()
+    low_avg, high_avg = calc_eng.infer_avg_bounds(4.38, 2.79, 3.61, 150)
+    assert time.perf_counter() - start < 2.0
+    assert 3.605 <= low_avg <= high_avg <= 3.615
+
+    profile = RankProfile("Original", "Capt", 4.38, 2.79, 3.61, 150, low_avg=low_avg, high_avg=high_avg)
+    assert (profile.low_avg, profile.high_avg) == (low_avg, high_avg)
+
+
+def test_feasible_sum_range_very_large_profile():
+    """Stops once the reachable totals are one run that covers the avg bracket - no per-report DP for 1000s"""
+    import time
+    calc_eng.feasible_sum_range.cache_clear()
+    start = time.perf_counter()
+    for high, low, avg, num_rpts in ((4.45, 2.73, 3.81, 1000), (4.42, 2.75, 3.61, 1500)):
+        low_avg, high_avg = calc_eng.infer_avg_bounds(high, low, avg, num_rpts)
+        assert round(avg - 0.005, 3) <= low_avg <= high_avg <= round(avg + 0.005, 3)
+    assert time.perf_counter() - start < 0.5
+
+
+def test_feasible_sum_range_early_stop_is_exact():
+    """Same bounds with and without the early stop, including avgs at the edge of what the high/low allow"""
+    import inspect
+    source = inspect.getsource(calc_eng.feasible_sum_range.__wrapped__).replace("if run and run[1]", "if False and run[1]")
+    namespace = dict(vars(calc_eng))
+    exec(source, namespace)
+    full_dp = namespace["feasible_sum_range"]
+    for high, low, avg, num_rpts in ((4.42, 2.75, 3.61, 30), (4.45, 2.73, 2.76, 40), (4.45, 2.73, 4.41, 40),
+                                     (5.0, 2.0, 2.03, 25), (4.08, 3.54, 3.79, 30)):
+        assert calc_eng.feasible_sum_range(high, low, avg, num_rpts) == full_dp(high, low, avg, num_rpts)
+
+
+def test_feasible_sum_range_candidates_by_mark_count():
+    """A 4.50 high from 14 marks (63 / 14 reduces to 9 / 2) is still a 14 mark report"""
+    from fractions import Fraction
+    assert Fraction(9, 2) in calc_eng._candidates(4.5, (13, 14))
+    assert calc_eng._candidates(4.42, (13, 14)) == [Fraction(53, 12)]    # nothing from 13/14 marks -> any
+    assert calc_eng.feasible_sum_range(4.5, 3.0, 3.75, 2) == (Fraction(15, 2), Fraction(15, 2))
+
+
+def test_inferred_avg_bracket_survives_recalc():
+    """Every calc path should use the original profile's bracket, not rebuild +/- 0.005"""
+    import random
+    from src.app.models import ReportColumns
+    rng = random.Random(5)
+    low_avg, high_avg = calc_eng.infer_avg_bounds(4.5, 3.0, 3.71, 4)
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 3.71, 4, low_avg=low_avg, high_avg=high_avg)
+    db = ReportDB()
+    for idx in range(6):
+        db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+
+    working = RankProfile("Working", "Capt", 0, 0, 0, 0)
+    _update_profile(orig, working, db)
+    assert working.low_avg == pytest.approx(low_avg + sum(db.rpts_dict[n].rpt_avg - low_avg for n in db.name_list) / 10)
+
+    engine_prof = RankProfile("Engine", "Capt", 0, 0, 0, 0)
+    calc_eng.RVEngine().update(orig, engine_prof, db)
+    assert engine_prof.get_state() == working.get_state()
+
+    batch_prof = RankProfile("Batch", "Capt", 0, 0, 0, 0)
+    calc_eng.update_profile_batch(orig, batch_prof, ReportColumns.from_db(db))
+    assert batch_prof.low_avg == pytest.approx(working.low_avg)
+    assert batch_prof.high_avg == pytest.approx(working.high_avg)
+
+
+def test_withdraw_report_matches_rebuild():
+    """Withdrawing a report gives the same profile and RVs as a session that never had it"""
+    import random
+    import src.app.constants as constants
+    rng = random.Random(17)
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 10)
+    db = ReportDB()
+    for idx in range(10):
+        db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+    # make sure the withdrawn one is the profile high
+    db.replace_rpt(Report("Capt", "MRO4", {cat: "G" for cat in constants.USMC_CATEGORIES}))
+
+    active, engine = RankProfile("Active", "Capt", 0, 0, 0, 0), calc_eng.RVEngine()
+    calc_eng.recalc_db(db, orig, active, engine)
+    assert active.high == 7.0
+
+    assert calc_eng.withdraw_report(orig, active, db, "MRO4", engine) == 4
+    assert "MRO4" not in db.name_list
+    assert active.high < 7.0
+    _assert_engines_match(orig, db, active)
+
+    # without an engine every RV is refreshed too, RV Proc of the later reports included
+    no_engine = RankProfile("Active", "Capt", 0, 0, 0, 0)
+    calc_eng.recalc_db(db, orig, no_engine)
+    calc_eng.withdraw_report(orig, no_engine, db, "MRO0", None)
+    ref_db = ReportDB()
+    for name in db.name_list:
+        ref_db.add_report(Report("Capt", name, dict(db.rpts_dict[name].scores_dict)))
+    ref = RankProfile("Ref", "Capt", 0, 0, 0, 0)
+    calc_eng.recalc_db(ref_db, orig, ref)
+    assert no_engine.get_state() == pytest.approx(ref.get_state())
+    for name in db.name_list:
+        rpt, ref_rpt = db.rpts_dict[name], ref_db.rpts_dict[name]
+        assert (rpt.rv_proc_min, rpt.rv_proc_max) == (ref_rpt.rv_proc_min, ref_rpt.rv_proc_max)
+        assert (rpt.rv_cum_min, rpt.rv_cum_max) == (ref_rpt.rv_cum_min, ref_rpt.rv_cum_max)
+
+
+####################################################################################
+##############################  Bulk Import Tests  #################################
+####################################################################################
+def test_validate_rpt_batch_matches_single():
+    """Each row gets the same verdict as validate_rpt_inputs, plus repeated names are flagged"""
+    import random
+    import src.app.constants as constants
+    from src.app.models import letters_to_marks
+    rng = random.Random(5)
+    rows = [("SMITH", "C" * 13 + "H"), ("", "C" * 14), ("X" * 26, "C" * 14), ("JONES", "H" * 14),
+            ("BROWN", "C" * 13), ("GREEN", "Z" * 14), ("SMITH", "D" * 14)]
+    rows += [(f"MRO{idx}", "".join(_random_scores(rng).values())) for idx in range(50)]
+
+    results = calc_eng.validate_rpt_batch([name for name, _ in rows], letters_to_marks([ltr for _, ltr in rows]))
+
+    assert [success for _, success in results[:7]] == [True, False, False, False, False, False, False]
+    assert results[6][0] == "Name appears more than once"
+    for (name, letters), (msg, success) in zip(rows[:4] + rows[7:], results[:4] + results[7:]):
+        single_msg, single_ok = calc_eng.validate_rpt_inputs(name, dict(zip(constants.USMC_CATEGORIES, letters)))
+        assert success == single_ok
+        if not success:
+            assert msg == single_msg
+
+
+def test_add_reports_batch_recalcs_once(monkeypatch):
+    """Bulk add matches adding one by one, skips bad rows, and recalculates only once"""
+    import random
+    import src.app.constants as constants
+    rng = random.Random(8)
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 10)
+    rows = [(f"MRO{idx}", " ".join(_random_scores(rng).values())) for idx in range(30)]
+    rows.insert(10, ("BAD", "CC C"))
+
+    seq_db, seq_prof = ReportDB(), RankProfile("Active", "Capt", 0, 0, 0, 0)
+    for name, letters in rows:
+        if name != "BAD":
+            calc_eng.update_calcs(seq_db, orig, seq_prof, "Capt", name, dict(zip(constants.USMC_CATEGORIES, letters.split())))
+
+    calls = []
+    real_recalc = calc_eng.recalc_db
+    monkeypatch.setattr(calc_eng, "recalc_db", lambda *args, **kwargs: calls.append(1) or real_recalc(*args, **kwargs))
+    db, prof = ReportDB(), RankProfile("Active", "Capt", 0, 0, 0, 0)
+    results = calc_eng.add_reports_batch(db, orig, prof, "Capt", rows, engine=calc_eng.RVEngine())
+
+    assert len(calls) == 1
+    assert [success for _, success in results].count(False) == 1 and not results[10][1]
+    assert db.name_list == seq_db.name_list
+    assert prof.get_state() == seq_prof.get_state()
+    for name in db.name_list:
+        assert db.get_report_by_name(name).rv_cum_min == seq_db.get_report_by_name(name).rv_cum_min
+
+
+####################################################################################
+##############################  Sensitivity Tests  #################################
+####################################################################################
+def test_sensitivity_grid_matches_recalc():
+    """Every cell of the grid matches editing that mark and recalculating the whole db"""
+    import copy
+    import random
+    import src.app.constants as constants
+    rng = random.Random(21)
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 10)
+    db = ReportDB()
+    for idx in range(6):
+        db.add_report(Report("Capt", f"MRO{idx}", _random_scores(rng)))
+    active = RankProfile("Active", "Capt", 0, 0, 0, 0)
+    calc_eng.recalc_db(db, orig, active)
+
+    for name in ("MRO2", "NEW"):
+        scores = db.get_report_by_name(name).get_letter_scores() if db.is_name_in_db(name) else _random_scores(rng)
+        grid = calc_eng.SensitivityGrid(scores, *calc_eng.get_sensitivity_lattices(orig, active, db, name))
+        assert grid.rv_cum_delta.shape == (14, 8)
+
+        for cat_idx, cat in enumerate(constants.USMC_CATEGORIES):
+            for letter_idx, letter in enumerate(constants.SCORE_LETTER_VALS):
+                if not grid.valid[cat_idx, letter_idx]:
+                    continue
+                what_if = db.shadow()
+                _, prof, rpt = calc_eng.update_calcs(what_if, orig, copy.copy(active), "Capt", name,
+                                                     {**scores, cat: letter})
+                assert grid.base_rv_cum + grid.rv_cum_delta[cat_idx, letter_idx] == pytest.approx(rpt.rv_cum_min)
+                assert grid.base_rv_proc + grid.rv_proc_delta[cat_idx, letter_idx] == pytest.approx(rpt.rv_proc_min)
+                assert grid.raises_high[cat_idx, letter_idx] == (rpt.rpt_avg == prof.high and
+                                                                 rpt.rpt_avg > max(r.rpt_avg for r in db.rpts_dict.values()
+                                                                                   if r.name != name) and
+                                                                 rpt.rpt_avg > orig.high)
+                if letter == scores[cat]:
+                    assert grid.rv_cum_delta[cat_idx, letter_idx] == pytest.approx(0.)
+
+
+def test_sensitivity_grid_best_change():
+    import src.app.constants as constants
+    prof = RankProfile("Active", "Capt", 4.1, 3.0, 3.8, 10)
+    lattice = calc_eng.RVLattice(prof)
+    scores = {cat: "D" for cat in constants.USMC_CATEGORIES}     # 4.0 - one F or G makes it the new high
+    grid = calc_eng.SensitivityGrid(scores, lattice)
+
+    cat, letter, delta = grid.best_change()
+    assert letter in ("F", "G") and delta == pytest.approx(100. - grid.base_rv_cum)    # new high is RV 100
+    assert grid.rv_proc_delta[0, 3] == 0.    # D -> D
+    assert grid.raises_high[:, 5:7].all() and not grid.raises_high[:, :5].any()
+    # all 'H' but one - changing that one to 'H' is not a valid report
+    grid = calc_eng.SensitivityGrid({constants.USMC_CATEGORIES[0]: "D"}, lattice)
+    assert not grid.valid[0, 7] and grid.valid[0, :7].all()
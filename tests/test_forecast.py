@@ -0,0 +1,98 @@
+import pytest
+import numpy as np
+
+import src.app.calc_eng as calc_eng
+import src.app.forecast as forecast
+import src.app.constants as constants
+from src.app.models import RankProfile, ReportDB
+
+
+@pytest.fixture
+def session():
+    """Profile with three saved reports, calculated the same way the reports page does."""
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 10)
+    active = RankProfile("Active", "Capt", 4.5, 3.0, 4.0, 10)
+    db = ReportDB()
+    for name, letter in (("ALPHA", "E"), ("BRAVO", "D"), ("CHARLIE", "C")):
+        calc_eng.update_calcs(db, orig, active, "Capt", name, {cat: letter for cat in constants.USMC_CATEGORIES})
+    return active, db
+
+
+####################################################################################
+##############################  Forecast Tests  ####################################
+####################################################################################
+def test_forecast_is_reproducible(session):
+    """Same seed gives the same bands, in process or on a process pool"""
+    profile, db = session
+    kwargs = dict(periods=3, rpts_per_period=2, num_trajectories=3000, chunk_size=1000, seed=42)
+
+    in_process = forecast.forecast_rv_cum(profile, db, max_workers=0, **kwargs)
+    pooled = forecast.forecast_rv_cum(profile, db, max_workers=2, **kwargs)
+    other_seed = forecast.forecast_rv_cum(profile, db, max_workers=0, **{**kwargs, "seed": 7})
+
+    assert in_process.bands.shape == (3, 3, 5)
+    assert np.array_equal(in_process.bands, pooled.bands)
+    assert not np.array_equal(in_process.bands, other_seed.bands)
+
+
+def test_forecast_pool_started_once(session):
+    """Small runs stay in this process; pooled runs share one pool across calls"""
+    profile, db = session
+    forecast.shutdown_pool()
+    forecast.forecast_rv_cum(profile, db, num_trajectories=1000)
+    assert forecast._pool is None
+
+    forecast.forecast_rv_cum(profile, db, num_trajectories=1000, max_workers=2)
+    pool = forecast._pool
+    forecast.forecast_rv_cum(profile, db, num_trajectories=1000, max_workers=2)
+    assert forecast._pool is pool
+    forecast.shutdown_pool()
+
+
+def test_forecast_large_run_uses_pool_by_default(session, monkeypatch):
+    """Runs the UI can start (20 periods of 50 reports) cross the pool threshold"""
+    assert 20000 * 20 * 50 >= forecast.PARALLEL_MIN_DRAWS
+    profile, db = session
+    forecast.shutdown_pool()
+    monkeypatch.setattr(forecast, "PARALLEL_MIN_DRAWS", 1000)
+    forecast.forecast_rv_cum(profile, db, periods=1, rpts_per_period=1, num_trajectories=999)
+    assert forecast._pool is None
+    forecast.forecast_rv_cum(profile, db, periods=1, rpts_per_period=1, num_trajectories=1000)
+    assert forecast._pool is not None
+    forecast.shutdown_pool()
+
+
+def test_forecast_bands_by_report_block(session, monkeypatch):
+    """Reducing the RVs to percentiles one report at a time gives the same bands as all at once"""
+    profile, db = session
+    kwargs = dict(periods=3, rpts_per_period=2, num_trajectories=3000, max_workers=0)
+    at_once = forecast.forecast_rv_cum(profile, db, **kwargs)
+    monkeypatch.setattr(forecast, "BAND_BLOCK_CELLS", 1)
+    one_by_one = forecast.forecast_rv_cum(profile, db, **kwargs)
+    assert np.array_equal(at_once.bands, one_by_one.bands)
+
+
+def test_forecast_bands_are_ordered(session):
+    """Percentiles should be non-decreasing, and better reports should keep higher RVs"""
+    profile, db = session
+    res = forecast.forecast_rv_cum(profile, db, num_trajectories=2000, max_workers=0)
+
+    assert np.all(np.diff(res.bands, axis=2) >= 0)
+    assert res.band("ALPHA")[50] > res.band("BRAVO")[50] > res.band("CHARLIE")[50]
+
+
+def test_forecast_fixed_future_matches_profile_math(session):
+    """A zero-spread distribution should give the exact RV Cum of adding those reports"""
+    profile, db = session
+    res = forecast.forecast_rv_cum(profile, db, periods=1, rpts_per_period=2, num_trajectories=10,
+                                   params=(5.0, 0.0), max_workers=0)
+
+    new_avg = (profile.high_avg * profile.num_rpts + 10.0) / (profile.num_rpts + 2)
+    expected = calc_eng._rv_eq(db.get_report_by_name("BRAVO").rpt_avg, profile.num_rpts + 2, 5.0, new_avg)
+    assert res.band("BRAVO")[50] == pytest.approx(expected)
+
+
+def test_forecast_rejects_unknown_distribution(session):
+    profile, db = session
+    with pytest.raises(ValueError):
+        forecast.forecast_rv_cum(profile, db, dist="poisson", max_workers=0)
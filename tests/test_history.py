@@ -0,0 +1,122 @@
+import random
+
+import pytest
+
+import src.app.calc_eng as calc_eng
+import src.app.constants as constants
+from src.app.history import SessionHistory
+from src.app.models import RankProfile, Report, ReportDB
+
+
+def _scores(letter):
+    return {cat: letter for cat in constants.USMC_CATEGORIES}
+
+
+@pytest.fixture
+def session():
+    """Original profile and a saved db with three reports."""
+    orig = RankProfile("Original", "Capt", 4.5, 3.0, 4.0, 10)
+    db = ReportDB()
+    for name, letter in (("ALPHA", "E"), ("BRAVO", "D"), ("CHARLIE", "C")):
+        db.add_report(Report("Capt", name, _scores(letter)))
+    calc_eng.recalc_db(db, orig, RankProfile("Active", "Capt", 0, 0, 0, 0))
+    return orig, db
+
+
+####################################################################################
+###############################  History Tests  ####################################
+####################################################################################
+def test_history_stores_only_deltas(session):
+    """A version holds just the changed report and appended names"""
+    orig, db = session
+    hist = SessionHistory(orig)
+    base = hist.commit(db, "Base")
+
+    what_if = db.shadow()
+    what_if.replace_rpt(Report("Capt", "BRAVO", _scores("F")))
+    what_if.add_report(Report("Capt", "DELTA", _scores("B")))
+    ver = hist.commit(what_if, "BRAVO gets F's")
+
+    delta = hist.versions[ver]
+    assert delta.parent == base
+    assert set(delta.changed) == {"BRAVO", "DELTA"}
+    assert delta.appended == ("DELTA",) and delta.order is None
+
+    # unchanged reports are shared with the base version, not copied
+    order, rpts = hist._resolve(ver)
+    assert order == ("ALPHA", "BRAVO", "CHARLIE", "DELTA")
+    assert rpts["ALPHA"] is hist.versions[base].changed["ALPHA"]
+
+
+def test_history_checkout_matches_fresh_calc(session):
+    """Rolling back rebuilds the db and RVs of that version; editing it leaves the history alone"""
+    orig, db = session
+    hist = SessionHistory(orig)
+    base = hist.commit(db, "Base")
+
+    swapped = db.shadow()
+    swapped.reorder_reports(["CHARLIE", "BRAVO", "ALPHA"])
+    ver = hist.commit(swapped, "Swap")
+    assert hist.versions[ver].order == ("CHARLIE", "BRAVO", "ALPHA")
+
+    old_db, old_prof = hist.checkout(base)
+    assert old_db.name_list == db.name_list
+    for name in db.name_list:
+        assert old_db.get_report_by_name(name).rv_proc_min == db.get_report_by_name(name).rv_proc_min
+        assert old_db.get_report_by_name(name).rv_cum_min == db.get_report_by_name(name).rv_cum_min
+    assert old_prof.num_rpts == 13
+
+    old_db.replace_rpt(Report("Capt", "ALPHA", _scores("A")))
+    assert hist.checkout(base)[0].get_report_by_name("ALPHA").rpt_avg == 5.0
+
+
+def test_history_diff(session):
+    """Diff lists each report whose RVs moved, with None for reports missing from one side"""
+    orig, db = session
+    hist = SessionHistory(orig)
+    base = hist.commit(db, "Base")
+
+    what_if = db.shadow()
+    what_if.add_report(Report("Capt", "DELTA", _scores("G")))    # new high and avg - every RV Cum moves
+    ver = hist.commit(what_if, "Add DELTA")
+
+    changes = hist.diff(base, ver)
+    assert changes["DELTA"]["rv_cum_min"][0] is None
+    assert changes["DELTA"]["rv_cum_min"][1] == pytest.approx(100.)
+    for name in db.name_list:
+        before, after = changes[name]["rv_cum_min"]
+        assert after != before
+        assert changes[name]["rv_proc_min"][0] == changes[name]["rv_proc_min"][1]  # processed before DELTA
+
+    assert hist.diff(ver, ver) == {}
+    assert set(hist.diff(ver, ver, include_unchanged=True)) == {"ALPHA", "BRAVO", "CHARLIE", "DELTA"}
+
+
+def test_history_branches_and_snapshots(session):
+    """Hundreds of random versions on several branches rebuild exactly, with bounded delta chains"""
+    orig, db = session
+    rng = random.Random(3)
+    hist = SessionHistory(orig, snapshot_every=8)
+    expected = [(list(db.name_list), {n: db.rpts_dict[n].packed_marks for n in db.name_list})]
+    hist.commit(db)
+
+    for _ in range(200):
+        parent = rng.randrange(len(hist))
+        cur = hist.checkout(parent)[0]
+        action = rng.random()
+        if action < 0.4:
+            cur.add_report(Report("Capt", f"MRO{len(hist)}", _scores(rng.choice("BCDEF"))))
+        elif action < 0.8:
+            cur.replace_rpt(Report("Capt", rng.choice(cur.name_list), _scores(rng.choice("BCDEF"))))
+        else:
+            order = list(cur.name_list)
+            rng.shuffle(order)
+            cur.reorder_reports(order)
+        hist.commit(cur, parent=parent)
+        expected.append((list(cur.name_list), {n: cur.rpts_dict[n].packed_marks for n in cur.name_list}))
+
+    assert max(ver.depth for ver in hist.versions) < 8
+    for ver_id, (order, marks) in enumerate(expected):
+        got = hist.checkout(ver_id)[0]
+        assert got.name_list == order
+        assert {n: got.rpts_dict[n].packed_marks for n in order} == marks
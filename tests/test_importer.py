@@ -0,0 +1,142 @@
+import io
+import json
+import random
+import tracemalloc
+
+import pytest
+
+import src.app.calc_eng as calc_eng
+import src.app.constants as constants
+import src.app.importer as importer
+from src.app.models import AVG_UNITS, RankProfile, Report, ReportDB
+
+
+def _random_letters(rng):
+    return "".join(rng.choice("BCDEFG") if idx % 6 else rng.choice("BCDEFGH") for idx in range(14))
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        f.write("rank,name,scores\n")
+        for rank, name, letters in rows:
+            f.write(f"{rank},{name},{letters}\n")
+
+
+####################################################################################
+############################  History Import Tests  ################################
+####################################################################################
+def test_import_matches_replayed_profile(tmp_path):
+    """Exact stats from the file agree with building the profile report by report"""
+    rng = random.Random(4)
+    rows = [(rng.choice(["Capt", "Maj"]), f"MRO{idx}", _random_letters(rng)) for idx in range(500)]
+    path = tmp_path / "history.csv"
+    _write_csv(path, rows)
+
+    res = importer.import_history(path, "Capt", chunk_size=64, keep_columns=True)
+
+    capt_rows = [row for row in rows if row[0] == "Capt"]
+    ref = RankProfile("Ref", "Capt", 0, 0, 0, 0)
+    for _, name, letters in capt_rows:
+        ref.update_with_rpt(Report("Capt", name, dict(zip(constants.USMC_CATEGORIES, letters))))
+
+    assert res.num_skipped == len(rows) - len(capt_rows)
+    assert res.num_errors == 0
+    assert res.profile.num_rpts == len(capt_rows)
+    assert res.profile.high == ref.high
+    assert res.profile.low == ref.low
+    assert res.profile.avg == pytest.approx(ref.avg, abs=1e-12)
+    assert res.profile.low_avg == res.profile.high_avg == res.profile.avg
+    assert res.columns.names == [name for _, name, _ in capt_rows]
+
+
+def test_import_jsonl_formats_and_errors():
+    """Marks dicts, scores strings and unrounded avgs all count; bad rows are reported, not fatal"""
+    scores = {cat: "D" for cat in constants.USMC_CATEGORIES}
+    lines = [
+        json.dumps({"rank": "Capt", "scores": scores}),                        # 4.0
+        json.dumps({"rank": "Capt", "scores": "EE EEE EEEEE EEE H"}),           # 5.0
+        json.dumps({"rank": "Capt", "avg": "53/13"}),
+        json.dumps({"rank": "Capt", "avg": "4.08"}),                            # rounded - rejected
+        json.dumps({"rank": "Capt", "scores": "ZZ ZZZ ZZZZZ ZZZ Z"}),
+        json.dumps({"rank": "Capt", "scores": "HH HHH HHHHH HHH H"}),
+        json.dumps({"rank": "Capt", "scores": "CC C"}),
+        "not json",
+        json.dumps({"rank": "Capt"}),
+    ]
+    upload = io.BytesIO("\n".join(lines).encode())
+    upload.name = "history.jsonl"
+
+    res = importer.import_history(upload, "Capt")
+
+    assert res.profile.num_rpts == 3
+    assert (res.profile.high, res.profile.low) == (5.0, 4.0)
+    assert res.profile.avg == (9 * AVG_UNITS + 53 * (AVG_UNITS // 13)) / (3 * AVG_UNITS)
+    assert res.num_errors == 6
+    assert sorted(line for line, _ in res.errors) == [4, 5, 6, 7, 8, 9]
+
+
+def test_import_jsonl_non_text_rank_and_name():
+    """Numbers are taken as text; arrays / objects are bad rows with their line number, not a crash"""
+    lines = [
+        json.dumps({"rank": "Capt", "name": 12345, "scores": "DD DDD DDDDD DDD D"}),
+        json.dumps({"rank": ["Capt"], "scores": "DD DDD DDDDD DDD D"}),
+        json.dumps({"rank": "Capt", "name": {"last": "SMITH"}, "scores": "DD DDD DDDDD DDD D"}),
+        json.dumps({"rank": 7, "scores": "DD DDD DDDDD DDD D"}),                # not this rank
+    ]
+    upload = io.BytesIO("\n".join(lines).encode())
+    upload.name = "history.jsonl"
+
+    res = importer.import_history(upload, "Capt", keep_columns=True)
+
+    assert res.columns.names == ["12345"]
+    assert res.num_skipped == 1
+    assert [line for line, _ in res.errors] == [2, 3]
+    assert "'rank' must be text" in res.errors[0][1]
+
+
+def test_import_memory_is_constant(tmp_path):
+    """Peak memory while importing doesn't depend on the number of reports"""
+    rng = random.Random(9)
+    peaks = []
+    for num_rows in (2000, 20000):
+        path = tmp_path / f"history_{num_rows}.csv"
+        _write_csv(path, [("Capt", f"MRO{idx}", _random_letters(rng)) for idx in range(num_rows)])
+        tracemalloc.start()
+        res = importer.import_history(path, "Capt", chunk_size=512)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert res.profile.num_rpts == num_rows
+
+    assert peaks[1] < peaks[0] * 1.5
+
+
+def test_imported_profile_has_tight_rvs():
+    """Exact profile gives single-valued RVs (min == max)"""
+    upload = io.StringIO("rank,avg\nCapt,4\nCapt,3\nCapt,5\nCapt,4\n")
+    profile = importer.import_history(upload, "Capt").profile
+    assert (profile.high, profile.low, profile.avg) == (5.0, 3.0, 4.0)
+
+    db = ReportDB()
+    _, working, rpt = calc_eng.update_calcs(db, profile, RankProfile("Active", "Capt", 0, 0, 0, 0), "Capt", "New",
+                                            {cat: "E" for cat in constants.USMC_CATEGORIES})
+    assert rpt.rv_cum_min == rpt.rv_cum_max
+
+
+####################################################################################
+#############################  Bulk Report Rows Tests  #############################
+####################################################################################
+def test_read_report_rows_pasted_and_csv():
+    pasted = "SMITH, CC CCC CCCCC CCC H\n\nJONES\tDD DDD DDDDD DDD H\nBROWN EE EEE EEEEE EEE H\n"
+    assert importer.read_report_rows(pasted) == [("SMITH", "CC CCC CCCCC CCC H"), ("JONES", "DD DDD DDDDD DDD H"),
+                                                 ("BROWN", "EE EEE EEEEE EEE H")]
+
+    # marks come off the end, so names may have spaces, commas or mark letters of their own
+    pasted = "DE LA CRUZ DD DDD DDDDD DDD H\nCRUZ, JUAN\tCCCCCCCCCCCCCH\nBEA, DD DDD DDDDD DDD H\nSHORT D D\n"
+    assert importer.read_report_rows(pasted) == [("DE LA CRUZ", "DD DDD DDDDD DDD H"), ("CRUZ, JUAN", "CCCCCCCCCCCCCH"),
+                                                 ("BEA", "DD DDD DDDDD DDD H"), ("SHORT", "D D")]
+
+    upload = io.BytesIO(b"Name,Scores\nSMITH,CC CCC CCCCC CCC H\nJONES,\n")
+    assert importer.read_report_rows(upload) == [("SMITH", "CCCCCCCCCCCCCH"), ("JONES", "")]
+
+    header = "name," + ",".join(constants.USMC_CATEGORIES)
+    assert importer.read_report_rows(f"{header}\nSMITH," + ",".join("D" * 14)) == [("SMITH", "D" * 14)]
@@ -0,0 +1,150 @@
+import threading
+
+import pytest
+
+import src.app.calc_eng as calc_eng
+import src.app.client_pool as client_pool
+import src.app.constants as constants
+from src.app.llm_base import BaseLLMClient, LLMRequest, LLMResponse
+from src.app.llm_cache import CachedLLMClient, LLMCache, make_key
+from src.app.models import Report
+
+
+class FakeClient(BaseLLMClient):
+    """Counts calls and answers with a numbered response."""
+    def __init__(self, model="fake-model"):
+        self.model = model
+        self.calls = 0
+
+    def generate(self, request):
+        self.calls += 1
+        return LLMResponse(text=f"response {self.calls}: {request.user_prompt[:20]}", model=self.model,
+                           prompt_tokens=100, completion_tokens=50)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(tmp_path / "cache" / "llm.sqlite3", max_bytes=10_000, max_age_days=1, clock=FakeClock())
+
+
+####################################################################################
+###############################  LLM Cache Tests  ##################################
+####################################################################################
+def test_cache_keys_on_prompt_model_and_sampling():
+    req = LLMRequest(system_prompt="sys", user_prompt="user")
+    assert make_key("m", req) == make_key("m", LLMRequest(system_prompt="sys", user_prompt="user"))
+    assert make_key("m", req) != make_key("other", req)
+    assert make_key("m", req) != make_key("m", LLMRequest(system_prompt="sys", user_prompt="user", temperature=1.0))
+    assert make_key("m", req) != make_key("m", LLMRequest(system_prompt="sys", user_prompt="user!"))
+
+
+def test_cached_client_hits_and_refresh(cache):
+    """Second call is served from the cache with no token cost; refresh calls the client again"""
+    client = FakeClient()
+    req = LLMRequest(system_prompt="sys", user_prompt="Write Section I")
+
+    first = CachedLLMClient(client, cache).generate(req)
+    wrapped = CachedLLMClient(client, cache)
+    second = wrapped.generate(req)
+    assert client.calls == 1 and wrapped.last_hit
+    assert second.text == first.text and second.model == first.model
+    assert second.prompt_tokens is None and second.completion_tokens is None
+    assert second.cached and not first.cached
+
+    third = CachedLLMClient(client, cache, refresh=True).generate(req)
+    assert client.calls == 2 and third.text != first.text
+    assert CachedLLMClient(client, cache).generate(req).text == third.text    # refresh replaced the entry
+
+    # a second cache object on the same file (e.g. another streamlit worker) sees the same entries
+    assert LLMCache(cache.path, clock=cache.clock).get(make_key(client.model, req)).text == third.text
+
+
+def test_cache_evicts_by_age_and_lru(tmp_path):
+    clock = FakeClock()
+    cache = LLMCache(tmp_path / "llm.sqlite3", max_bytes=100, max_age_days=1, clock=clock)    # 3 x 30 bytes
+    for key in "abc":
+        cache.put(key, LLMResponse(text=key * 30, model="m"))
+        clock.now += 1
+    assert cache.get("a").text == "a" * 30     # a is now the most recently used
+    clock.now += 1
+
+    cache.put("d", LLMResponse(text="d" * 30, model="m"))
+    assert cache.get("b") is None
+    assert all(cache.get(key) for key in "acd") and len(cache) == 3
+
+    clock.now += 2 * 24 * 3600
+    assert cache.get("a") is None       # expired, even though it was used
+    cache.put("e", LLMResponse(text="e", model="m"))
+    assert len(cache) == 1
+
+
+def test_cache_concurrent_writers(cache):
+    """Separate connections from many threads don't lose or corrupt entries"""
+    def worker(idx):
+        own = LLMCache(cache.path, clock=cache.clock)
+        for num in range(20):
+            own.put(f"{idx}-{num}", LLMResponse(text=f"text {idx} {num}", model="m"))
+
+    threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 120
+    assert cache.get("3-7").text == "text 3 7"
+
+
+def test_query_uses_cache_with_seeded_prompt(cache, monkeypatch):
+    """Same report inputs give the same rendered prompt, so the second query is a cache hit"""
+    class MockData:
+        examples = {"middle_third": [{"section_i": f"Example {idx}"} for idx in range(1000)]}
+        recs = {"middle_third": {"promotion": [f"Promo {idx}" for idx in range(20)], "assignment": ["Command"]}}
+
+    client = FakeClient(constants.LOCAL_MODELS[constants.DEFAULT_LOCAL_MODEL]["model_id"])
+    monkeypatch.setattr(client_pool.llm_clients, "make_local_client", lambda *args: client)
+
+    rpt = Report("Capt", "Jones", {cat: "E" for cat in constants.USMC_CATEGORIES})
+    rpt.rv_cum_min = 92.0
+    rpt.accomplishments = "- Led the company through an IG inspection"
+
+    first = calc_eng.query_local(rpt, MockData(), cache=cache)
+    second = calc_eng.query_local(rpt, MockData(), cache=cache)
+    assert client.calls == 1
+    assert second[0] == first[0] and second[2] is None
+
+    rpt.accomplishments += " with zero findings"
+    calc_eng.query_local(rpt, MockData(), cache=cache)
+    assert client.calls == 2
+    calc_eng.query_local(rpt, MockData(), cache=cache, refresh=True)
+    assert client.calls == 3
+
+    # a regeneration with the same inputs builds a new prompt, so it misses the cache
+    rpt.secti_gens += 1
+    calc_eng.query_local(rpt, MockData(), cache=cache)
+    assert client.calls == 4
+
+
+def test_cached_client_stream(cache):
+    """A streamed miss is stored once read; the hit comes back as one chunk with no tokens"""
+    client = FakeClient()
+    cached = CachedLLMClient(client, cache)
+    request = LLMRequest("sys", "Write Section I")
+
+    first = cached.stream(request)
+    assert len(cache) == 0                  # nothing stored until the stream is read
+    text = "".join(first)
+    assert first.response.prompt_tokens == 100 and len(cache) == 1
+
+    second = cached.stream(request)
+    assert list(second) == [text]
+    assert cached.last_hit and client.calls == 1
+    assert second.response.prompt_tokens is None
+    assert second.response.cached and not first.response.cached
@@ -1,3 +1,5 @@
+import re
+
 import pytest
 from unittest.mock import MagicMock, patch
 from src.app.llm_clients import LocalModelClient
@@ -158,4 +160,455 @@ def test_llm_response_dataclass():
     assert resp.text == "Generated text"
     assert resp.model == "gpt-4o-mini"
     assert resp.prompt_tokens == 100
-    assert resp.completion_tokens == 50
\ No newline at end of file
+    assert resp.completion_tokens == 50
+
+####################################################################################
+###########################  Batch Generation Tests  ###############################
+####################################################################################
+class _MockData:
+    examples = {"top_third": [{"section_i": f"Example {idx}"} for idx in range(20)]}
+    recs = {"top_third": {"promotion": [f"Promo {idx}" for idx in range(20)], "assignment": ["Command"]}}
+
+
+def _batch_rpts(num):
+    from src.app.models import Report
+    import src.app.constants as constants
+
+    rpts = []
+    for idx in range(num):
+        rpt = Report("Capt", f"MRO{idx}", {cat: "E" for cat in constants.USMC_CATEGORIES})
+        rpt.rv_cum_min = 90.0
+        rpt.accomplishments = f"- Accomplishment of MRO{idx}"
+        rpts.append(rpt)
+    return rpts
+
+
+class FakeAsyncClient:
+    """Async client that records how many requests are in flight.  Later reports answer sooner."""
+    def __init__(self, model="fake-open", fail_on="MRO2"):
+        self.model = model
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.closes = 0
+
+    async def aclose(self):
+        self.closes += 1
+
+    async def agenerate(self, request):
+        import asyncio
+        from src.app.llm_base import LLMResponse
+
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            name = re.search(r"MRO\d+", request.user_prompt).group()
+            await asyncio.sleep(0.01 * (10 - int(name[3:])))
+            if name == self.fail_on:
+                raise RuntimeError("rate limited")
+            return LLMResponse(text=f"Sect I for {name}", model=self.model, prompt_tokens=10, completion_tokens=5)
+        finally:
+            self.in_flight -= 1
+
+
+def test_generate_batch_caps_concurrency_and_streams(monkeypatch):
+    """At most max_concurrency requests in flight; results arrive as they finish; one failure doesn't stop the rest"""
+    import src.app.calc_eng as calc_eng
+    import src.app.client_pool as client_pool
+    import src.app.constants as constants
+
+    client = FakeAsyncClient()
+    monkeypatch.setattr(client_pool.llm_clients, "HuggingFaceClient", lambda model_id: client)
+    seen = []
+
+    results = calc_eng.generate_batch(_batch_rpts(8), _MockData(), "open",
+                                      constants.OPEN_WEIGHT_MODELS[constants.DEFAULT_OPEN_MODEL], max_concurrency=3,
+                                      on_result=lambda name, res: seen.append(name))
+
+    assert client.max_in_flight == 3
+    assert sorted(seen) == sorted(results) == [f"MRO{idx}" for idx in range(8)]
+    assert seen != sorted(seen)      # completion order, not report order
+    assert results["MRO5"] == ("Sect I for MRO5", "fake-open", 10, 5)
+    assert results["MRO2"] == ("HuggingFace Error: rate limited", "Error", None, None)
+    assert client.closes == 1       # the loop's async connections are released before asyncio.run returns
+
+
+def test_generate_batch_config_error_and_cache(monkeypatch, tmp_path):
+    """A client that can't be built fails every report; cached responses aren't requested again"""
+    import src.app.calc_eng as calc_eng
+    import src.app.client_pool as client_pool
+    import src.app.constants as constants
+    from src.app.llm_cache import LLMCache
+
+    model = constants.FRONTIER_MODELS[constants.DEFAULT_FRONTIER_MODEL]
+
+    def _no_key(model):
+        raise ValueError("OpenAI API Key not found")
+    monkeypatch.setattr(client_pool.llm_clients, "OpenAIClient", _no_key)
+    results = calc_eng.generate_batch(_batch_rpts(2), _MockData(), "foundation", model)
+    assert all(res[0].startswith("Configuration Error") for res in results.values())
+
+    client = FakeAsyncClient(model["model_id"], fail_on=None)
+    monkeypatch.setattr(client_pool.llm_clients, "OpenAIClient", lambda model: client)
+    cache = LLMCache(tmp_path / "llm.sqlite3")
+    first = calc_eng.generate_batch(_batch_rpts(4), _MockData(), "foundation", model, cache=cache)
+    second = calc_eng.generate_batch(_batch_rpts(4), _MockData(), "foundation", model, cache=cache)
+    assert client.calls == 4 and client.closes == 2     # through the cache wrapper too
+    assert {name: res[0] for name, res in first.items()} == {name: res[0] for name, res in second.items()}
+    assert all(res[2] is None for res in second.values())
+
+    with pytest.raises(ValueError):
+        calc_eng.generate_batch([], _MockData(), "remote", model)
+
+
+####################################################################################
+##############################  Streaming Tests  ###################################
+####################################################################################
+class FakeClock:
+    """Advances a second every call."""
+    def __init__(self):
+        self.now = 0.
+
+    def __call__(self):
+        self.now += 1.
+        return self.now
+
+
+def test_llm_stream_metrics():
+    """Chunks pass through; TTFT and tokens/sec are measured from the first chunk"""
+    from src.app.llm_base import LLMStream
+
+    def _chunks(out):
+        yield from ["Led ", "", "the ", "company."]
+        out.completion_tokens = 9
+
+    stream = LLMStream("fake", _chunks, clock=FakeClock())
+    with pytest.raises(RuntimeError):
+        stream.response
+    assert list(stream) == ["Led ", "the ", "company."]
+
+    resp = stream.response
+    assert resp.text == "Led the company."
+    assert resp.ttft == 1.
+    assert resp.tokens_per_sec == pytest.approx(9.)     # start t=1, first chunk t=2, done t=3
+
+    single = LLMStream("fake", lambda out: iter(["All at once"]), clock=FakeClock())
+    assert "".join(single) == "All at once"
+    assert single.response.tokens_per_sec is None
+
+
+def test_local_client_streams_stdout(tmp_path):
+    """stdout is streamed as it's written, token counts come from the --verbose stats"""
+    script = tmp_path / "ollama"
+    script.write_text("#!/bin/sh\n"
+                      "cat > /dev/null\n"
+                      "printf 'Hello '\n"
+                      "printf 'world\\n'\n"
+                      "echo 'prompt eval count:    12 token(s)' >&2\n"
+                      "echo 'eval count:           7 token(s)' >&2\n")
+    script.chmod(0o755)
+
+    stream = LocalModelClient(local_path=str(script), model="llama3").stream(LLMRequest("sys", "Hi"))
+    assert "".join(stream) == "Hello world\n"
+    assert (stream.response.prompt_tokens, stream.response.completion_tokens) == (12, 7)
+
+    script.write_text("#!/bin/sh\ncat > /dev/null\necho 'model not found' >&2\nexit 1\n")
+    with pytest.raises(RuntimeError) as excinfo:
+        list(LocalModelClient(local_path=str(script)).stream(LLMRequest("sys", "Hi")))
+    assert "Ollama CLI Error" in str(excinfo.value) and "model not found" in str(excinfo.value)
+
+
+def test_api_clients_stream(monkeypatch):
+    """OpenAI delta events and HF chunks are streamed; usage comes from the final event / chunk"""
+    from types import SimpleNamespace as NS
+    from src.app.llm_clients import HuggingFaceClient, OpenAIClient
+    import src.app.constants as constants
+
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("HF_API_TOKEN", "test-token")
+    request = LLMRequest("sys", "Hi")
+
+    client = OpenAIClient()
+    events = [NS(type="response.created"),
+              NS(type="response.output_text.delta", delta="Sets "),
+              NS(type="response.output_text.delta", delta="the standard."),
+              NS(type="response.completed", response=NS(output_text="Sets the standard.", model="gpt-x",
+                                                        usage=NS(input_tokens=30, output_tokens=4)))]
+    client.client = MagicMock()
+    client.client.responses.create.return_value = iter(events)
+    stream = client.stream(request)
+    assert list(stream) == ["Sets ", "the standard."]
+    assert stream.response.model == "gpt-x" and stream.response.completion_tokens == 4
+    assert client.client.responses.create.call_args.kwargs["stream"] is True
+
+    client = HuggingFaceClient(constants.OPEN_WEIGHT_MODELS[constants.DEFAULT_OPEN_MODEL]["model_id"])
+    chunks = [NS(choices=[NS(delta=NS(content="Top "))], usage=None),
+              NS(choices=[NS(delta=NS(content="performer."))], usage=None),
+              NS(choices=[], usage=NS(prompt_tokens=20, completion_tokens=3))]
+    client.client = MagicMock()
+    client.client.chat.completions.create.return_value = iter(chunks)
+    stream = client.stream(request)
+    assert "".join(stream) == "Top performer."
+    assert (stream.response.prompt_tokens, stream.response.completion_tokens) == (20, 3)
+
+    assert client.client.chat.completions.create.call_args.kwargs["stream_options"] == {"include_usage": True}
+
+    # a huggingface_hub without stream_options: no usage, but the text and TTFT still come through
+    import src.app.llm_clients as llm_clients
+    monkeypatch.setattr(llm_clients, "_HF_STREAM_OPTIONS", False)
+    client.client.chat.completions.create.return_value = iter(chunks[:2])
+    stream = client.stream(request)
+    assert "".join(stream) == "Top performer."
+    assert "stream_options" not in client.client.chat.completions.create.call_args.kwargs
+    assert stream.response.completion_tokens is None and stream.ttft is not None
+
+    client.client.chat.completions.create.side_effect = ConnectionError("down")
+    with pytest.raises(RuntimeError) as excinfo:
+        list(client.stream(request))
+    assert "HuggingFace API Error: down" in str(excinfo.value)
+
+
+####################################################################################
+##########################  Ollama HTTP Client Tests  ##############################
+####################################################################################
+@pytest.fixture
+def ollama_server():
+    """Fake Ollama server on a free port.  Records each request's payload and client port."""
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"     # keep-alive, so connection reuse can be seen
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            server.payloads.append(payload)
+            server.client_ports.append(self.client_address[1])
+            if payload["model"] != "llama3":
+                return self._send(404, json.dumps({"error": f"model '{payload['model']}' not found"}).encode())
+
+            words = ["Sets ", "the ", "standard."]
+            final = {"model": "llama3", "done": True, "prompt_eval_count": 21, "eval_count": 3}
+            if payload["stream"]:
+                lines = [{"model": "llama3", "message": {"content": word}, "done": False} for word in words]
+                lines.append({**final, "message": {"content": ""}})
+                body = "".join(json.dumps(line) + "\n" for line in lines).encode()
+            else:
+                body = json.dumps({**final, "message": {"content": "".join(words)}}).encode()
+            self._send(200, body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.payloads, server.client_ports = [], []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_ollama_http_generate_and_stream(ollama_server):
+    """Token counts from the server, keep_alive sent, one pooled connection for several requests"""
+    from src.app.llm_clients import OllamaHTTPClient
+
+    host = f"127.0.0.1:{ollama_server.server_address[1]}"
+    client = OllamaHTTPClient("llama3", host=host, keep_alive="10m")
+    request = LLMRequest("sys", "Hi", max_tokens=200, temperature=0.5)
+
+    resp = client.generate(request)
+    assert resp.text == "Sets the standard."
+    assert (resp.prompt_tokens, resp.completion_tokens) == (21, 3)
+    payload = ollama_server.payloads[0]
+    assert payload["keep_alive"] == "10m" and payload["stream"] is False
+    assert payload["options"] == {"num_predict": 200, "temperature": 0.5}
+    assert payload["messages"][0] == {"role": "system", "content": "sys"}
+
+    stream = client.stream(request)
+    assert list(stream) == ["Sets ", "the ", "standard."]
+    assert stream.response.completion_tokens == 3
+    client.generate(request)
+    assert len(set(ollama_server.client_ports)) == 1
+
+    with pytest.raises(RuntimeError) as excinfo:
+        OllamaHTTPClient("missing", host=host).generate(request)
+    assert "Ollama API Error (404): model 'missing' not found" in str(excinfo.value)
+
+
+def test_ollama_http_falls_back_to_cli():
+    """With no server listening, requests go to the fallback client - or fail clearly without one"""
+    import socket
+    from src.app.llm_base import LLMResponse
+    from src.app.llm_clients import OllamaHTTPClient
+
+    with socket.socket() as sock:      # a port nothing listens on
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    fallback = MagicMock()
+    fallback.generate.return_value = LLMResponse(text="From the CLI", model="llama3")
+    client = OllamaHTTPClient("llama3", host=f"http://127.0.0.1:{port}", fallback=fallback)
+    assert client.generate(LLMRequest("sys", "Hi")).text == "From the CLI"
+
+    with pytest.raises(RuntimeError) as excinfo:
+        OllamaHTTPClient("llama3", host=f"127.0.0.1:{port}").generate(LLMRequest("sys", "Hi"))
+    assert "not running" in str(excinfo.value)
+
+
+####################################################################################
+#############################  Client Pool Tests  ##################################
+####################################################################################
+def test_client_pool_reuses_clients(monkeypatch):
+    """One client per provider/model/credentials, even when many threads ask at once"""
+    import threading
+    import src.app.client_pool as client_pool
+    import src.app.llm_clients as llm_clients
+
+    built = []
+
+    class FakeOpenAIClient:
+        def __init__(self, model):
+            built.append(model)
+            self.model = model
+            self.closed = False
+
+        def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(llm_clients, "OpenAIClient", FakeOpenAIClient)
+    monkeypatch.setenv("OPENAI_API_KEY", "key-1")
+    pool = client_pool.ClientPool()
+
+    got = []
+    threads = [threading.Thread(target=lambda: got.append(pool.get("foundation", "gpt-4o-mini"))) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1 and all(client is got[0] for client in got)
+
+    other_model = pool.get("foundation", "gpt-4.1-mini")
+    assert other_model is not got[0]
+
+    # new credentials: a new client, and the one built with the old key is closed and dropped
+    monkeypatch.setenv("OPENAI_API_KEY", "key-2")
+    new_key = pool.get("foundation", "gpt-4o-mini")
+    assert new_key is not got[0] and got[0].closed
+    assert not other_model.closed and len(pool) == 2
+
+    pool.close_all()
+    assert new_key.closed and other_model.closed and len(pool) == 0
+    with pytest.raises(ValueError):
+        pool.get("remote", "gpt-4o-mini")
+
+
+def test_client_pool_config_errors_not_stored(monkeypatch):
+    """A client that can't be built raises every time instead of being cached"""
+    import src.app.client_pool as client_pool
+
+    monkeypatch.delenv("HF_API_TOKEN", raising=False)
+    pool = client_pool.ClientPool()
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            pool.get("open", "some/model")
+    assert len(pool) == 0
+
+
+def test_client_pool_keeps_connections_open(monkeypatch):
+    """A pooled client sends every request over one kept-alive connection; close_all closes its async clients too"""
+    import asyncio
+    import src.app.client_pool as client_pool
+    import src.app.llm_clients as llm_clients
+    from tests.bench_client_pool import MODEL_ID, start_stand_in
+
+    server, base_url = start_stand_in()
+    monkeypatch.setenv("OPENAI_BASE_URL", base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    request = LLMRequest("sys", "Write Section I")
+    try:
+        for _ in range(5):
+            client = llm_clients.OpenAIClient(model=MODEL_ID)
+            client.generate(request)
+            client.close()
+        assert len(server.connections) == 5      # a client per request connects every time
+
+        server.connections.clear()
+        for _ in range(5):
+            assert client_pool.get_client("foundation", MODEL_ID).generate(request).text == "Sets the standard."
+        assert len(server.connections) == 1
+
+        # an async client left on a loop that is still alive
+        pooled = client_pool.get_client("foundation", MODEL_ID)
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(pooled.agenerate(request))
+            async_client = next(iter(pooled._async_clients.clients.values()))
+            client_pool.POOL.close_all()
+            assert async_client.is_closed() and pooled.client.is_closed()
+        finally:
+            loop.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_pooled_client_async_per_event_loop(monkeypatch):
+    """A long-lived client makes one async client per event loop, so it survives several batches"""
+    import asyncio
+    from src.app.llm_clients import _PerLoop
+
+    class FakeAsyncHttp:
+        def __init__(self):
+            self.closed = False
+
+        async def close(self):
+            self.closed = True
+
+    per_loop = _PerLoop(FakeAsyncHttp)
+
+    async def _twice():
+        return per_loop.get(), per_loop.get()
+
+    first_a, first_b = asyncio.run(_twice())
+    second_a, _ = asyncio.run(_twice())
+    assert first_a is first_b
+    assert second_a is not first_a
+
+    # closing the running loop's client, as agenerate_batch does before its loop ends
+    async def _use_and_close():
+        client = per_loop.get()
+        await per_loop.aclose_current()
+        return client
+
+    closed = asyncio.run(_use_and_close())
+    assert closed.closed
+
+    # close() gets clients on loops that are still alive
+    loop = asyncio.new_event_loop()
+    try:
+        left_open = loop.run_until_complete(_twice())[0]
+        per_loop.close()
+        assert left_open.closed and not per_loop.clients
+    finally:
+        loop.close()
+
+    # batches on several sessions' threads at once - one client per loop, each closed by its own loop
+    import threading
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(asyncio.run(_use_and_close()))) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(client) for client in results}) == 16 and all(client.closed for client in results)
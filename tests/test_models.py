@@ -42,6 +42,45 @@ def test_report_average_ignore_H():
     assert rpt.rpt_avg == 1.0
 
 
+def test_report_invalid_letter_rejected():
+    with pytest.raises(ValueError):
+        Report("Capt", "Test", {"Performance": "Z"})
+
+
+def test_report_marks_packed():
+    """All 14 marks fit in one int, 3 bits each"""
+    from src.app import constants
+    scores = {cat: "ABCDEFGH"[idx % 8] for idx, cat in enumerate(constants.USMC_CATEGORIES)}
+    rpt = Report("Capt", "Test", scores)
+
+    assert isinstance(rpt.packed_marks, int)
+    assert rpt.packed_marks < 1 << 42
+    assert list(rpt.scores) == [1, 2, 3, 4, 5, 6, 7, 0, 1, 2, 3, 4, 5, 6]
+    assert (rpt.mark_sum, rpt.num_observed) == (49, 13)
+    assert not hasattr(rpt, "__dict__")
+
+
+def test_report_deepcopy_shares_narrative():
+    """Shadow copies copy the calc state only - narrative edits show up in both"""
+    import copy
+    rpt = Report("Capt", "Smith", {"Performance": "C"})
+    rpt.accomplishments = "x" * 5000
+
+    shadow = copy.deepcopy(rpt)
+    assert shadow.narrative is rpt.narrative
+    assert shadow.scores_dict is not rpt.scores_dict
+
+    shadow.rv_cum_min = 95.0
+    assert rpt.rv_cum_min == 0
+    rpt.secti = "Sect I text"
+    assert shadow.secti == "Sect I text"
+
+    # an independent narrative when one is needed
+    other = Report("Capt", "Jones", {"Performance": "C"}, narrative=rpt.narrative.copy())
+    other.prompt["user"] = "changed"
+    assert rpt.prompt["user"] != "changed"
+
+
 ####################################################################################
 ###############################  Database Tests  ###################################
 ####################################################################################
@@ -55,6 +94,121 @@ def test_db_add_retrieve():
     assert db.get_report_by_name("Doe") == rpt
 
 
+def test_db_shadow_copy_on_write():
+    """Shadow shares reports until it changes one"""
+    db = ReportDB()
+    db.add_report(Report("Capt", "Smith", {"Performance": "C"}))
+    db.add_report(Report("Capt", "Jones", {"Performance": "D"}))
+
+    shadow = db.shadow()
+    assert shadow.is_shadow() and not db.is_shadow()
+    assert shadow.get_report_by_name("Smith") is db.get_report_by_name("Smith")
+
+    # unchanged value -> nothing copied
+    shadow.set_rvs("Smith", rv_cum=(0, 0))
+    assert shadow.get_report_by_name("Smith") is db.get_report_by_name("Smith")
+
+    shadow.set_rvs("Smith", rv_cum=(91.0, 92.0))
+    assert db.get_report_by_name("Smith").rv_cum_min == 0
+    assert shadow.get_report_by_name("Smith").rv_cum_min == 91.0
+    assert shadow.get_report_by_name("Jones") is db.get_report_by_name("Jones")
+
+    # new reports live only in the shadow
+    shadow.add_report(Report("Capt", "Brown", {"Performance": "E"}))
+    assert db.name_list == ["Smith", "Jones"]
+    assert shadow.name_list == ["Smith", "Jones", "Brown"]
+
+    assert shadow.commit() is shadow
+    assert not shadow.is_shadow()
+
+
+def test_db_order_index_matches_list():
+    """Random inserts, deletes and moves against a plain list; each returns the lowest changed position"""
+    import random
+    rng = random.Random(8)
+    db, ref = ReportDB(), []
+    for step in range(2000):
+        action = rng.random()
+        if action < 0.4 or not ref:
+            name, pos = f"MRO{step}", rng.randrange(len(ref) + 1)
+            assert db.insert_report(pos, Report("Capt", name)) == pos
+            ref.insert(pos, name)
+        elif action < 0.6:
+            name = rng.choice(ref)
+            assert db.delete_report(name) == ref.index(name)
+            ref.remove(name)
+        else:
+            name, new_pos = rng.choice(ref), rng.randrange(len(ref))
+            old_pos = ref.index(name)
+            assert db.move_report(name, new_pos) == min(old_pos, new_pos)
+            ref.remove(name)
+            ref.insert(new_pos, name)
+        if step % 100 == 0:
+            assert db.name_list == ref
+            assert all(db.get_position(name) == idx for idx, name in enumerate(ref))
+
+    assert db.name_list == ref
+    assert db.get_num_reports() == len(ref) == len(db.rpts_dict)
+    assert db.is_name_in_db(ref[0]) and not db.is_name_in_db("MRO-1")
+
+
+def test_db_shadow_shares_order_index():
+    """shadow() shares the tree; random changes on both sides afterwards never show up on the other"""
+    import random
+    rng = random.Random(13)
+    db = ReportDB()
+    for idx in range(300):
+        db.add_report(Report("Capt", f"MRO{idx}"))
+
+    names = db.name_list
+    shadow = db.shadow()
+    assert shadow._order.root is db._order.root and shadow.name_list is names
+
+    refs = {id(db): list(db.name_list), id(shadow): list(db.name_list)}
+    for step in range(1500):
+        target = rng.choice((db, shadow))
+        ref = refs[id(target)]
+        action = rng.random()
+        if action < 0.4:
+            name, pos = f"New{step}", rng.randrange(len(ref) + 1)
+            target.insert_report(pos, Report("Capt", name))
+            ref.insert(pos, name)
+        elif action < 0.6:
+            name = rng.choice(ref)
+            target.delete_report(name)
+            ref.remove(name)
+        else:
+            name, new_pos = rng.choice(ref), rng.randrange(len(ref))
+            target.move_report(name, new_pos)
+            ref.remove(name)
+            ref.insert(new_pos, name)
+        if step % 100 == 0:
+            for check in (db, shadow):
+                assert check.name_list == refs[id(check)]
+                assert all(check.get_position(name) == idx for idx, name in enumerate(refs[id(check)]))
+
+    assert db.name_list == refs[id(db)] and shadow.name_list == refs[id(shadow)]
+
+
+def test_db_mutations_return_position():
+    db = ReportDB()
+    for name in ("Alpha", "Bravo", "Charlie"):
+        db.add_report(Report("Capt", name))
+
+    assert db.add_report(Report("Capt", "Delta")) == 3
+    assert db.replace_rpt(Report("Capt", "Bravo")) == 1
+    assert db.reorder_reports(["Alpha", "Bravo", "Delta", "Charlie"]) == 2
+    assert db.reorder_reports(["Alpha", "Bravo", "Delta", "Charlie"]) == 4
+    with pytest.raises(ValueError):
+        db.insert_report(0, Report("Capt", "Alpha"))
+
+    # shadows get their own order
+    shadow = db.shadow()
+    shadow.delete_report("Alpha")
+    assert shadow.name_list == ["Bravo", "Delta", "Charlie"]
+    assert db.name_list == ["Alpha", "Bravo", "Delta", "Charlie"]
+
+
 ####################################################################################
 ########################  NEW TESTS: Business Logic  ################################
 ####################################################################################
@@ -109,4 +263,110 @@ def test_narrative_input_editing():
     assert updated.billet == "Test Billet"
     assert updated.accomplishments == "New accomplishments"
     assert updated.context == "New context"
-    assert updated.prompt["system"] == "sys"
\ No newline at end of file
+    assert updated.prompt["system"] == "sys"
+
+####################################################################################
+############################  Report Columns Tests  ################################
+####################################################################################
+def test_report_columns_from_db():
+    """Columns should hold int8 marks and match each report's average ('H' ignored)"""
+    from src.app.models import ReportColumns
+    db = ReportDB()
+    db.add_report(Report("Capt", "Smith", {"Performance": "A", "Proficiency": "B", "Courage": "H"}))
+    db.add_report(Report("Capt", "Jones", {"Performance": "G"}))
+
+    cols = ReportColumns.from_db(db)
+
+    assert cols.marks.shape == (2, 14)
+    assert cols.marks.dtype == np.int8
+    assert cols.names == ["Smith", "Jones"]
+    assert list(cols.num_observed) == [2, 1]
+    assert list(cols.rpt_avgs) == [1.5, 7.0]
+
+
+####################################################################################
+###########################  Profile Removal Tests  ################################
+####################################################################################
+def test_avg_multiset_matches_sorted_list():
+    """Lazy heaps give the same max/min as a sorted list through random adds and removes"""
+    import random
+    from src.app.models import AvgMultiset
+    rng = random.Random(2)
+    ref = [rng.randint(13, 91) / 13 for _ in range(20)]
+    ms = AvgMultiset(ref)
+    for _ in range(500):
+        if rng.random() < 0.5 and len(ref) > 1:
+            val = rng.choice(ref)
+            ref.remove(val)
+            ms.remove(val)
+        else:
+            val = rng.choice(ref + [rng.randint(13, 91) / 13])
+            ref.append(val)
+            ms.add(val)
+        assert (ms.max(), ms.min(), len(ms)) == (max(ref), min(ref), len(ref))
+
+    with pytest.raises(ValueError):
+        ms.remove(100.0)
+
+
+def test_profile_remove_rpt_restores_previous_values():
+    """Removing the last report undoes update_with_rpt, including a high it had raised"""
+    from src.app.models import AvgMultiset
+    prof = RankProfile("Active", "Capt", 4.5, 3.0, 4.0, 10)
+    ms = AvgMultiset.from_profile(prof, ReportDB())
+    before = prof.get_state()
+
+    rpt = Report("Capt", "High", {"Performance": "F", "Proficiency": "E"})   # 5.5
+    prof.update_with_rpt(rpt)
+    ms.add(rpt.rpt_avg)
+    assert prof.high == 5.5
+
+    prof.remove_rpt(rpt, ms)
+    assert prof.get_state() == pytest.approx(before)
+
+
+def test_parse_scores_str_round_trip():
+    """parse_scores_str is the inverse of scores_as_str"""
+    from src.app import constants
+    from src.app.models import parse_scores_str, letters_to_marks
+    scores = {cat: "ABCDEFGH"[idx % 8] for idx, cat in enumerate(constants.USMC_CATEGORIES)}
+    rpt = Report("Capt", "Test", scores)
+
+    assert parse_scores_str(rpt.scores_as_str()) == scores
+    assert parse_scores_str(rpt.scores_as_str().lower()) == scores
+    with pytest.raises(ValueError):
+        parse_scores_str("CC CCC CCCCC CCC")
+    with pytest.raises(ValueError):
+        parse_scores_str("CC CCC CCCCC CCC Z")
+
+    marks = letters_to_marks(["".join(scores.values()), "C" * 13, "Z" * 14])
+    assert list(marks[0]) == list(rpt.scores)
+    assert (marks[1] < 0).all() and (marks[2] < 0).all()
+
+
+####################################################################################
+##############################  Mark Codec Tests  ##################################
+####################################################################################
+def test_mark_codec_round_trip():
+    """Scalar and vectorized codecs agree with each other and with Report.packed_marks"""
+    import random
+    from src.app import constants
+    from src.app import models
+    rng = random.Random(2)
+    marks = np.array([[rng.randrange(8) for _ in range(14)] for _ in range(200)], dtype=np.int8)
+    marks[0] = 7    # every bit set
+
+    codes = models.encode_marks_array(marks)
+    assert codes.dtype == np.uint64
+    assert int(codes[0]) == (1 << models.MARKS_CODE_BITS) - 1
+    assert (models.decode_marks_array(codes) == marks).all()
+    for row, code in zip(marks, codes):
+        assert models.encode_marks(row) == int(code)
+        assert models.decode_marks(int(code)) == list(row)
+
+    scores = models.decode_scores(int(codes[5]))
+    assert models.encode_scores(scores) == int(codes[5])
+    assert Report("Capt", "Test", scores).packed_marks == int(codes[5])
+    assert models.encode_scores({}) == 0    # all 'H'
+    with pytest.raises(ValueError):
+        models.encode_scores({constants.USMC_CATEGORIES[0]: "Z"})
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+import src.app.calc_eng as calc_eng
+import src.app.constants as constants
+from src.app.models import RankProfile, Report
+from src.app.multi_rank import MultiRankSession
+
+
+def _random_scores(rng):
+    return {cat: rng.choice("BCDEFG") for cat in constants.USMC_CATEGORIES}
+
+
+@pytest.fixture
+def session():
+    """Session with Sgt, SSgt and GySgt profiles and a few reports each, recalculated the way the pages do"""
+    rng = random.Random(6)
+    sess = MultiRankSession()
+    for rank, high in (("Sgt", 5.0), ("SSgt", 4.6), ("GySgt", 4.4)):
+        state = sess.set_profile(RankProfile("Original", rank, high, 3.0, 4.0, 12))
+        for idx in range(8):
+            state.rpt_db.add_report(Report(rank, f"{rank}{idx}", _random_scores(rng)))
+        calc_eng.recalc_db(state.rpt_db, state.original_profile, state.active_profile, state.engine)
+    return sess
+
+
+def _reference(state):
+    """RVs of a rank from a plain full recalc."""
+    db = state.rpt_db.shadow()
+    prof = RankProfile("Ref", state.original_profile.rank, 0, 0, 0, 0)
+    calc_eng.recalc_db(db, state.original_profile, prof)
+    return prof.get_state(), [(db.rpts_dict[n].rv_proc_min, db.rpts_dict[n].rv_cum_min) for n in db.name_list]
+
+
+def _rvs(state):
+    return [(state.rpt_db.rpts_dict[n].rv_proc_min, state.rpt_db.rpts_dict[n].rv_cum_min)
+            for n in state.rpt_db.name_list]
+
+
+####################################################################################
+#############################  Multi-Rank Tests  ###################################
+####################################################################################
+def test_set_state_keeps_ranks_separate(session):
+    """Storing one rank's new db / profile / engine leaves the others as they were - and still up to date"""
+    before = {rank: _rvs(session.get(rank)) for rank in session.rank_list}
+
+    sgt = session.get("Sgt")
+    new_db = sgt.rpt_db.shadow()
+    new_db.add_report(Report("Sgt", "NEW", {cat: "G" for cat in constants.USMC_CATEGORIES}))
+    new_prof = RankProfile("Active", "Sgt", 0, 0, 0, 0)
+    engine = calc_eng.RVEngine()
+    calc_eng.recalc_db(new_db, sgt.original_profile, new_prof, engine)
+    session.set_state("Sgt", new_db, new_prof, engine)
+
+    assert session.get("Sgt").rpt_db is new_db and session.get("Sgt").engine is engine
+    assert session.get("Sgt").active_profile.high == 7.0
+    for rank in session.rank_list:
+        state = session.get(rank)
+        ref_state, ref_rvs = _reference(state)
+        assert state.active_profile.get_state() == ref_state
+        assert _rvs(state) == ref_rvs
+        if rank != "Sgt":
+            assert _rvs(state) == before[rank]
+
+
+def test_set_profile_restarts_rank(session):
+    session.set_profile(RankProfile("Original", "Sgt", 4.0, 3.0, 3.5, 5))
+    assert session.get("Sgt").rpt_db.get_num_reports() == 0
+    assert session.get("Sgt").active_profile.label == "Active"
+    assert session.get("Sgt").active_profile.get_state() == session.get("Sgt").original_profile.get_state()
+    with pytest.raises(ValueError):
+        session.set_profile(RankProfile("Original", "Gen", 4.0, 3.0, 3.5, 5))
+    session.remove("GySgt")
+    assert session.rank_list == ["Sgt", "SSgt"] and len(session) == 2
+    assert "GySgt" not in session and session.get("GySgt") is None
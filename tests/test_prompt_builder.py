@@ -111,4 +111,25 @@ def test_missing_yaml_graceful_handling():
     example_data = ExampleData()
 
     assert isinstance(example_data.examples, dict)
-    assert isinstance(example_data.recs, dict)
\ No newline at end of file
+    assert isinstance(example_data.recs, dict)
+
+def test_seeded_prompt_is_repeatable():
+    """prompt_rng gives the same prompt for the same inputs, so cached responses can be reused"""
+    from src.app.prompt_builder import build_foundation_prompt, prompt_rng
+
+    class ManyExamples:
+        examples = {'top_third': [{'section_i': f'Example {idx}'} for idx in range(50)]}
+        recs = {'top_third': {'promotion': [f'Promo {idx}' for idx in range(50)], 'assignment': ['Command']}}
+
+    rpt = Report("Capt", "Jones", {cat: "E" for cat in c.USMC_CATEGORIES})
+    rpt.rv_cum_min = 92.0
+    rpt.accomplishments = "- Led the company"
+
+    prompts = {build_foundation_prompt(ManyExamples(), rpt, prompt_rng(rpt)) for _ in range(5)}
+    assert len(prompts) == 1
+    assert prompt_rng(rpt).random() != prompt_rng(Report("Capt", "Smith")).random()
+
+    # a regeneration (one more generation counted) gets a different prompt
+    first = prompt_rng(rpt).random()
+    rpt.secti_gens += 1
+    assert prompt_rng(rpt).random() != first